@@ -0,0 +1,178 @@
+"""City x Year x Month x AQI Level aggregate cube.
+
+Every chart and summary that used to run its own groupby over the raw rows
+reads from this cube instead. Each cell holds the row count plus the
+non-null count, sum, min and max of every pollutant and of AQI, so means and
+extremes for any coarser grouping are derived from the cells alone. Missing
+readings are skipped, as pandas' groupby mean/min/max would.
+
+    python analytics_cube.py        # build or incrementally update aqi_cube.pkl
+"""
+import os
+import threading
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from data_store import ensure_store, load_columns
+from settings import BASE_DIR, DATA_PATH, FEATURES, TARGET
+
+CUBE_PATH = os.path.join(BASE_DIR, "aqi_cube.pkl")
+KEYS = ["City", "Year", "Month", "AQI Level"]
+MEASURES = FEATURES + [TARGET]
+# Bumped when the cell layout changes so an older aqi_cube.pkl is rebuilt
+CUBE_FORMAT = 2
+
+
+# --------------- Building ---------------
+def build_cube(df):
+    """Aggregate raw rows into cube cells in one pass over the data."""
+    keys = pd.DataFrame({
+        "City": df["City"].astype(str),
+        "Year": df["Date"].dt.year.astype(np.int16),
+        "Month": df["Date"].dt.month.astype(np.int8),
+        "AQI Level": df["AQI Level"].astype(str),
+    })
+    # Cells are numbered in order of first appearance, matching drop_duplicates below
+    codes = keys.groupby(KEYS, sort=False).ngroup().to_numpy()
+    uniques = keys.drop_duplicates(ignore_index=True)
+    n_cells = len(uniques)
+
+    # Sort once by cell so min/max are contiguous reduceat slices
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]) if len(codes) else np.array([], int)
+
+    cube = uniques
+    cube["count"] = np.bincount(codes, minlength=n_cells)
+    values = df[MEASURES].to_numpy(dtype=np.float64)[order]
+    present = ~np.isnan(values)
+    empty = np.zeros((0, len(MEASURES)))
+    # NaN readings add nothing to a sum or count; fmin/fmax ignore them unless a whole cell is NaN
+    sums = np.add.reduceat(np.where(present, values, 0.0), starts, axis=0) if len(starts) else empty
+    counts = np.add.reduceat(present.astype(np.int64), starts, axis=0) if len(starts) else empty
+    mins = np.fmin.reduceat(values, starts, axis=0) if len(starts) else empty
+    maxs = np.fmax.reduceat(values, starts, axis=0) if len(starts) else empty
+    # reduceat runs follow sorted cell order, which is 0..n_cells-1 since every code occurs
+    for i, col in enumerate(MEASURES):
+        cube[f"{col}_n"] = counts[:, i].astype(np.int64)
+        cube[f"{col}_sum"] = sums[:, i]
+        cube[f"{col}_min"] = mins[:, i]
+        cube[f"{col}_max"] = maxs[:, i]
+    return cube
+
+
+def merge_cubes(*cubes):
+    """Combine cubes built from disjoint row sets into one."""
+    combined = pd.concat(cubes, ignore_index=True)
+    agg = {"count": "sum"}
+    for col in MEASURES:
+        agg[f"{col}_n"] = "sum"
+        agg[f"{col}_sum"] = "sum"
+        agg[f"{col}_min"] = "min"
+        agg[f"{col}_max"] = "max"
+    return combined.groupby(KEYS, as_index=False, sort=False).agg(agg)
+
+
+# --------------- Persistence & Incremental Updates ---------------
+def _row_fingerprint(df, rows):
+    # Cheap check that the rows already in the cube are still the file's first rows
+    if rows == 0:
+        return None
+    probe = df.iloc[[0, rows - 1]][["City", "Date", TARGET]]
+    return int(pd.util.hash_pandas_object(probe.astype(str), index=False).sum())
+
+
+def update_cube(csv_path=DATA_PATH, cube_path=CUBE_PATH):
+    """Load the persisted cube and fold in rows appended since it was built.
+
+    Falls back to a full rebuild when the existing rows were edited rather
+    than appended to.
+    """
+    meta = ensure_store(csv_path)
+    df = load_columns(["City", "Date", "AQI Level"] + MEASURES, csv_path=csv_path)
+
+    state = None
+    if os.path.exists(cube_path):
+        try:
+            state = joblib.load(cube_path)
+        except Exception:
+            state = None
+    if state is not None and state.get("format") != CUBE_FORMAT:
+        state = None
+    if state is not None and state.get("source") == meta["source"]:
+        return state["cube"]
+
+    seen = state["rows"] if state is not None else 0
+    if state is None or seen > len(df) or _row_fingerprint(df, seen) != state["fingerprint"]:
+        cube, seen = build_cube(df), len(df)
+    else:
+        new_rows = df.iloc[seen:]
+        cube = merge_cubes(state["cube"], build_cube(new_rows)) if len(new_rows) else state["cube"]
+        seen = len(df)
+
+    state = {"format": CUBE_FORMAT, "cube": cube, "rows": seen, "fingerprint": _row_fingerprint(df, seen), "source": meta["source"]}
+    tmp = cube_path + ".tmp"
+    joblib.dump(state, tmp)
+    os.replace(tmp, cube_path)
+    return cube
+
+
+_cube = None
+_cube_source = None
+_cube_lock = threading.Lock()
+
+
+def get_cube():
+    """Process-wide cube, refreshed when aqi_india.csv changes."""
+    global _cube, _cube_source
+    source = ensure_store()["source"]
+    if _cube is None or _cube_source != source:
+        with _cube_lock:
+            if _cube is None or _cube_source != source:
+                _cube, _cube_source = update_cube(), source
+    return _cube
+
+
+# --------------- Queries ---------------
+def _filter(cube, city=None, year=None):
+    if city is not None:
+        cube = cube[cube["City"] == city]
+    if year is not None:
+        cube = cube[cube["Year"] == year]
+    return cube
+
+
+def mean_by(cube, by, cols=(TARGET,), city=None, year=None):
+    """Mean of ``cols`` over their non-null readings, grouped by the cube keys in ``by`` (e.g. "City")."""
+    cube = _filter(cube, city, year)
+    sums = cube.groupby(by)[[f"{c}_sum" for c in cols] + [f"{c}_n" for c in cols]].sum()
+    return pd.DataFrame({c: sums[f"{c}_sum"] / sums[f"{c}_n"].where(sums[f"{c}_n"] > 0) for c in cols})
+
+
+def city_mean(cube, col=TARGET):
+    return mean_by(cube, "City", [col])[col]
+
+
+def city_counts(cube):
+    return cube.groupby("City")["count"].sum().sort_values(ascending=False)
+
+
+def level_counts(cube, city=None, year=None):
+    """Same ordering as ``df["AQI Level"].value_counts()``."""
+    return _filter(cube, city, year).groupby("AQI Level")["count"].sum().sort_values(ascending=False)
+
+
+def city_pollutant_means(cube, city, cols=FEATURES):
+    return mean_by(cube, "City", cols, city=city).loc[city]
+
+
+def extremes(cube, col=TARGET, city=None, year=None):
+    cube = _filter(cube, city, year)
+    return float(cube[f"{col}_min"].min()), float(cube[f"{col}_max"].max())
+
+
+if __name__ == "__main__":
+    cube = update_cube()
+    print(f"{len(cube)} cells covering {int(cube['count'].sum())} rows -> {CUBE_PATH}")
@@ -1,84 +1,40 @@
-
-
+"""AQI analytics charts.
+
+    python app.py                                  # interactive: one window per chart
+    python app.py --headless --out charts/         # render every chart to PNG, in parallel
+    python app.py --headless --out . --jobs 4 --force
+
+Headless mode uses the Agg backend, renders charts on a process pool and
+skips any chart whose input data and drawing code (including the repo
+helpers it calls) are unchanged since the last run into the same directory.
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+if "--headless" in sys.argv:
+    matplotlib.use("Agg")
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-import joblib
-
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-
-df = pd.read_csv("aqi_india.csv")
+from matplotlib.lines import Line2D
+from mpl_toolkits.mplot3d import Axes3D
 
-df
+from analytics_cube import city_counts, city_mean, city_pollutant_means, get_cube, level_counts, mean_by
+from aqi_bands import classify
+from data_store import load_columns
+from settings import BASE_DIR
+from train import evaluate, fit_forest, holdout_mask
 
 features = ['PM2.5', 'PM10', 'NO', 'NO2', 'NOx', 'NH3', 'CO', 'SO2', 'O3', 'Benzene', 'Toluene', 'Xylene']
 target = 'AQI'
-X = df[features]
-y = df[target]
-
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
-
-model = RandomForestRegressor(n_estimators=100, random_state=42)
-model.fit(X_train_scaled, y_train)
-
-y_pred = model.predict(X_test_scaled)
-mse = mean_squared_error(y_test, y_pred)
-mae = mean_absolute_error(y_test, y_pred)
-r2 = r2_score(y_test, y_pred)
-
-print(f"Mean Squared Error: {mse:.2f}")
-print(f"Mean Absolute Error: {mae:.2f}")
-print(f"R2 Score: {r2:.4f}")
-
-plt.figure(figsize=(10, 6))
-sns.scatterplot(x=y_test, y=y_pred, alpha=0.5)
-plt.xlabel("Actual AQI")
-plt.ylabel("Predicted AQI")
-plt.title("Actual vs Predicted AQI")
-plt.grid(True)
-plt.savefig("aqi_prediction_plot.png")
-plt.show()
-
-##joblib.dump(model, "aqi_model.pkl")
-##joblib.dump(scaler, "aqi_scaler.pkl")##
-
-city_avg_aqi = df.groupby("City")["AQI"].mean().sort_values(ascending=False)
-
-# Plotting
-plt.figure(figsize=(12, 6))
-sns.barplot(x=city_avg_aqi.index, y=city_avg_aqi.values, palette="coolwarm")
-
-plt.title("Average AQI by City (Jan 2023 - May 2025)", fontsize=16)
-plt.xlabel("City", fontsize=12)
-plt.ylabel("Average AQI", fontsize=12)
-plt.xticks(rotation=45)
-plt.grid(axis="y", linestyle="--", alpha=0.7)
-plt.tight_layout()
-
-# Save or show the plot
-plt.savefig("average_aqi_by_city.png")  # Optional: saves the plot as an image
-plt.show()
-
-aqi_counts = df["AQI Level"].value_counts()
-
-# Plot Pie Chart
-colors = ['#66bb6a', '#cddc39', '#ffeb3b', '#ff9800', '#f44336', '#8e24aa']
-plt.figure(figsize=(8, 8))
-plt.pie(aqi_counts.values, labels=aqi_counts.index, autopct='%1.1f%%', startangle=140, colors=colors)
-plt.title("AQI Level Distribution (Jan 2023 - May 2025)", fontsize=14)
-plt.axis("equal")  # Equal aspect ratio ensures pie is a circle
-
-# Save or show the chart
-plt.savefig("aqi_level_distribution_pie.png")  # Optional
-plt.show()
 
 # Map AQI Level to colors
 color_map = {
@@ -89,164 +45,396 @@ color_map = {
     "Very Poor": "red",
     "Severe": "purple"
 }
-colors = df["AQI Level"].map(color_map)
-
-# Create a 3D scatter plot
-fig = plt.figure(figsize=(10, 7))
-ax = fig.add_subplot(111, projection='3d')
-
-sc = ax.scatter(df["PM2.5"], df["PM10"], df["AQI"],
-                c=colors, s=20, alpha=0.6)
-
-ax.set_xlabel("PM2.5 (µg/m³)")
-ax.set_ylabel("PM10 (µg/m³)")
-ax.set_zlabel("AQI")
-ax.set_title("3D Visualization of AQI vs PM2.5 & PM10", fontsize=14)
-
-# Custom legend
-from matplotlib.lines import Line2D
-legend_elements = [Line2D([0], [0], marker='o', color='w', label=level,
-                          markerfacecolor=clr, markersize=10)
-                   for level, clr in color_map.items()]
-ax.legend(handles=legend_elements, title="AQI Level", loc="best")
-
-plt.tight_layout()
-plt.show()
-
-import matplotlib.pyplot as plt
-
-# Count of each AQI Level
-aqi_counts = df["AQI Level"].value_counts()
-
-# Pie chart
-colors = ['#66bb6a', '#cddc39', '#ffeb3b', '#ff9800', '#f44336', '#8e24aa']
-explode = [0.05] * len(aqi_counts)  # Explode all segments for a "3D" effect
-
-plt.figure(figsize=(8, 8))
-plt.pie(aqi_counts.values,
-        labels=aqi_counts.index,
-        autopct='%1.1f%%',
-        startangle=140,
-        colors=colors,
-        explode=explode,
-        shadow=True)
-plt.title("AQI Level Distribution (3D-Style Pie)", fontsize=14)
-plt.axis("equal")
-plt.tight_layout()
-plt.show()
-
-from mpl_toolkits.mplot3d import Axes3D
-
-# Group by city
-city_avg = df.groupby("City")["AQI"].mean().sort_values()
-
-# Bar chart data
-cities = city_avg.index
-aqi_vals = city_avg.values
-x = np.arange(len(cities))
-y = np.zeros_like(x)
-z = np.zeros_like(x)
-dx = np.ones_like(x)
-dy = np.ones_like(x)
-dz = aqi_vals
-
-# Plot
-fig = plt.figure(figsize=(12, 7))
-ax = fig.add_subplot(111, projection='3d')
-
-ax.bar3d(x, y, z, dx, dy, dz, color='skyblue', shade=True)
-ax.set_xticks(x)
-ax.set_xticklabels(cities, rotation=45, ha='right')
-ax.set_ylabel("Y-axis (not used)")
-ax.set_zlabel("Average AQI")
-ax.set_title("Average AQI by City (3D Bar Chart)", fontsize=14)
-plt.tight_layout()
-plt.show()
-
-
-city_df = df[df["City"] == "Delhi"].copy()
-city_df["Date"] = pd.to_datetime(city_df["Date"])
-city_df.sort_values("Date", inplace=True)
-
-# Plot line chart
-plt.figure(figsize=(12, 6))
-plt.plot(city_df["Date"], city_df["AQI"], label="Delhi AQI", color="teal")
-plt.title("Delhi AQI Trend Over Time", fontsize=16)
-plt.xlabel("Date")
-plt.ylabel("AQI")
-plt.grid(True)
-plt.legend()
-plt.tight_layout()
-plt.show()
-
-city_avg = df.groupby("City")["AQI"].mean().sort_values()
-
-# Plot
-plt.figure(figsize=(12, 6))
-sns.barplot(x=city_avg.index, y=city_avg.values, palette="Blues_r")
-plt.xticks(rotation=45)
-plt.title("Average AQI by City", fontsize=16)
-plt.xlabel("City")
-plt.ylabel("Average AQI")
-plt.tight_layout()
-plt.show()
-
-
-features = ['PM2.5', 'PM10', 'NO', 'NO2', 'NOx', 'NH3', 'CO', 'SO2', 'O3']
-mumbai_avg = df[df["City"] == "Mumbai"][features].mean()
-
-# Radar chart setup
-labels = list(mumbai_avg.index)
-values = mumbai_avg.values
-angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False).tolist()
-values = np.concatenate((values, [values[0]]))
-angles += angles[:1]
-
-fig, ax = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True))
-ax.plot(angles, values, linewidth=2, linestyle='solid')
-ax.fill(angles, values, alpha=0.25)
-ax.set_thetagrids(np.degrees(angles[:-1]), labels)
-ax.set_title("Mumbai – Pollution Profile Radar Chart")
-plt.show()
-
-plt.figure(figsize=(8, 6))
-plt.scatter(df["PM2.5"], df["AQI"], alpha=0.5, c='teal')
-plt.title("Scatter Plot: AQI vs PM2.5")
-plt.xlabel("PM2.5")
-plt.ylabel("AQI")
-plt.grid(True)
-plt.tight_layout()
-plt.show()
-
-import seaborn as sns
+pie_colors = ['#66bb6a', '#cddc39', '#ffeb3b', '#ff9800', '#f44336', '#8e24aa']
 
-bubble_df = df.groupby("City")[["AQI", "PM10"]].mean().reset_index()
+# Scatter charts over every row switch to binned rendering above this many points
+DENSE_POINTS = 20000
+CACHE_FILE = ".chart_cache.json"
+# Cores for the forest in prediction_chart; pool workers use one each so they don't oversubscribe
+FOREST_JOBS = -1
+
+
+# --------------- Charts ---------------
+# Each chart is a pair: an inputs function that pulls exactly the data the chart
+# needs (this is what gets hashed), and a draw function that plots it.
+def prediction_inputs(df, cube):
+    return {"X": df[features], "y": df[target], "test": pd.Series(holdout_mask(df))}
 
-plt.figure(figsize=(10, 6))
-plt.scatter(bubble_df["City"], bubble_df["AQI"],
-            s=bubble_df["PM10"], alpha=0.6, c='skyblue')
-plt.xticks(rotation=45)
-plt.title("Bubble Chart: AQI vs City (Bubble size = PM10)")
-plt.xlabel("City")
-plt.ylabel("Average AQI")
-plt.tight_layout()
-plt.show()
 
-aqi_counts = df["AQI Level"].value_counts()
+def prediction_chart(data):
+    # Same split and forest as `python train.py`, which also saves versioned artifacts
+    X, y, test = data["X"], data["y"], data["test"].to_numpy()
+    model, scaler = fit_forest(X[~test], y[~test], n_estimators=100, n_jobs=FOREST_JOBS, random_state=42)
+    metrics, y_pred = evaluate(model, scaler, X[test], y[test])
+
+    print(f"Mean Squared Error: {metrics['mse']:.2f}")
+    print(f"Mean Absolute Error: {metrics['mae']:.2f}")
+    print(f"R2 Score: {metrics['r2']:.4f}")
 
-print("\n📊 AQI Level Distribution (Pictorial)")
-for level, count in aqi_counts.items():
-    bar = '🟩' * (count // 500)  # scale down
-    print(f"{level:<12}: {bar} ({count})")
+    plt.figure(figsize=(10, 6))
+    sns.scatterplot(x=y[test], y=y_pred, alpha=0.5, rasterized=True)
+    plt.xlabel("Actual AQI")
+    plt.ylabel("Predicted AQI")
+    plt.title("Actual vs Predicted AQI")
+    plt.grid(True)
+
+
+def city_avg_inputs(df, cube):
+    return {"city_avg": city_mean(cube).sort_values(ascending=False)}
+
+
+def city_avg_chart(data):
+    city_avg_aqi = data["city_avg"]
+    plt.figure(figsize=(12, 6))
+    sns.barplot(x=city_avg_aqi.index, y=city_avg_aqi.values, palette="coolwarm")
+
+    plt.title("Average AQI by City (Jan 2023 - May 2025)", fontsize=16)
+    plt.xlabel("City", fontsize=12)
+    plt.ylabel("Average AQI", fontsize=12)
+    plt.xticks(rotation=45)
+    plt.grid(axis="y", linestyle="--", alpha=0.7)
+    plt.tight_layout()
 
-df["Year"] = pd.to_datetime(df["Date"]).dt.year
-top_cities = df["City"].value_counts().nlargest(5).index
-grouped = df[df["City"].isin(top_cities)].groupby(["City", "Year"])["AQI"].mean().reset_index()
 
-plt.figure(figsize=(12, 6))
-sns.barplot(data=grouped, x="City", y="AQI", hue="Year", palette="Set2")
-plt.title("Grouped Column Chart: AQI by City and Year")
-plt.ylabel("Average AQI")
-plt.tight_layout()
-plt.show()
+def level_inputs(df, cube):
+    return {"counts": level_counts(cube)}
+
+
+def level_pie_chart(data):
+    aqi_counts = data["counts"]
+    plt.figure(figsize=(8, 8))
+    plt.pie(aqi_counts.values, labels=aqi_counts.index, autopct='%1.1f%%', startangle=140, colors=pie_colors)
+    plt.title("AQI Level Distribution (Jan 2023 - May 2025)", fontsize=14)
+    plt.axis("equal")  # Equal aspect ratio ensures pie is a circle
+
+
+def level_pie_3d_chart(data):
+    aqi_counts = data["counts"]
+    explode = [0.05] * len(aqi_counts)  # Explode all segments for a "3D" effect
+
+    plt.figure(figsize=(8, 8))
+    plt.pie(aqi_counts.values,
+            labels=aqi_counts.index,
+            autopct='%1.1f%%',
+            startangle=140,
+            colors=pie_colors,
+            explode=explode,
+            shadow=True)
+    plt.title("AQI Level Distribution (3D-Style Pie)", fontsize=14)
+    plt.axis("equal")
+    plt.tight_layout()
 
+
+def scatter_3d_inputs(df, cube):
+    return {"rows": df[["PM2.5", "PM10", "AQI", "AQI Level"]]}
+
+
+def scatter_3d_chart(data):
+    rows = data["rows"]
+    fig = plt.figure(figsize=(10, 7))
+    ax = fig.add_subplot(111, projection='3d')
+
+    if len(rows) <= DENSE_POINTS:
+        ax.scatter(rows["PM2.5"], rows["PM10"], rows["AQI"],
+                   c=rows["AQI Level"].astype(str).map(color_map), s=20, alpha=0.6, rasterized=True)
+    else:
+        # Too many points to draw one by one: plot occupied cells of a 3D grid, sized by row count
+        counts, edges = np.histogramdd(rows[["PM2.5", "PM10", "AQI"]].to_numpy(np.float64), bins=30)
+        ix, iy, iz = np.nonzero(counts)
+        centers = [(e[:-1] + e[1:]) / 2 for e in edges]
+        cx, cy, cz = centers[0][ix], centers[1][iy], centers[2][iz]
+        n = counts[ix, iy, iz]
+        ax.scatter(cx, cy, cz, c=pd.Series(classify(cz)).astype(str).map(color_map),
+                   s=5 + 60 * n / n.max(), alpha=0.6, rasterized=True)
+
+    ax.set_xlabel("PM2.5 (µg/m³)")
+    ax.set_ylabel("PM10 (µg/m³)")
+    ax.set_zlabel("AQI")
+    ax.set_title("3D Visualization of AQI vs PM2.5 & PM10", fontsize=14)
+
+    # Custom legend
+    legend_elements = [Line2D([0], [0], marker='o', color='w', label=level,
+                              markerfacecolor=clr, markersize=10)
+                       for level, clr in color_map.items()]
+    ax.legend(handles=legend_elements, title="AQI Level", loc="best")
+    plt.tight_layout()
+
+
+def city_avg_asc_inputs(df, cube):
+    return {"city_avg": city_mean(cube).sort_values()}
+
+
+def city_bar_3d_chart(data):
+    city_avg = data["city_avg"]
+
+    # Bar chart data
+    cities = city_avg.index
+    aqi_vals = city_avg.values
+    x = np.arange(len(cities))
+    y = np.zeros_like(x)
+    z = np.zeros_like(x)
+    dx = np.ones_like(x)
+    dy = np.ones_like(x)
+    dz = aqi_vals
+
+    fig = plt.figure(figsize=(12, 7))
+    ax = fig.add_subplot(111, projection='3d')
+
+    ax.bar3d(x, y, z, dx, dy, dz, color='skyblue', shade=True)
+    ax.set_xticks(x)
+    ax.set_xticklabels(cities, rotation=45, ha='right')
+    ax.set_ylabel("Y-axis (not used)")
+    ax.set_zlabel("Average AQI")
+    ax.set_title("Average AQI by City (3D Bar Chart)", fontsize=14)
+    plt.tight_layout()
+
+
+def delhi_inputs(df, cube):
+    return {"city_df": df.loc[df["City"] == "Delhi", ["Date", "AQI"]].sort_values("Date")}
+
+
+def delhi_trend_chart(data):
+    city_df = data["city_df"]
+    plt.figure(figsize=(12, 6))
+    plt.plot(city_df["Date"], city_df["AQI"], label="Delhi AQI", color="teal")
+    plt.title("Delhi AQI Trend Over Time", fontsize=16)
+    plt.xlabel("Date")
+    plt.ylabel("AQI")
+    plt.grid(True)
+    plt.legend()
+    plt.tight_layout()
+
+
+def city_avg_blues_chart(data):
+    city_avg = data["city_avg"]
+    plt.figure(figsize=(12, 6))
+    sns.barplot(x=city_avg.index, y=city_avg.values, palette="Blues_r")
+    plt.xticks(rotation=45)
+    plt.title("Average AQI by City", fontsize=16)
+    plt.xlabel("City")
+    plt.ylabel("Average AQI")
+    plt.tight_layout()
+
+
+def mumbai_inputs(df, cube):
+    radar_features = ['PM2.5', 'PM10', 'NO', 'NO2', 'NOx', 'NH3', 'CO', 'SO2', 'O3']
+    return {"avg": city_pollutant_means(cube, "Mumbai", radar_features)}
+
+
+def mumbai_radar_chart(data):
+    mumbai_avg = data["avg"]
+
+    # Radar chart setup
+    labels = list(mumbai_avg.index)
+    values = mumbai_avg.values
+    angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False).tolist()
+    values = np.concatenate((values, [values[0]]))
+    angles += angles[:1]
+
+    fig, ax = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True))
+    ax.plot(angles, values, linewidth=2, linestyle='solid')
+    ax.fill(angles, values, alpha=0.25)
+    ax.set_thetagrids(np.degrees(angles[:-1]), labels)
+    ax.set_title("Mumbai – Pollution Profile Radar Chart")
+
+
+def pm25_inputs(df, cube):
+    return {"rows": df[["PM2.5", "AQI"]]}
+
+
+def pm25_scatter_chart(data):
+    rows = data["rows"]
+    plt.figure(figsize=(8, 6))
+    if len(rows) <= DENSE_POINTS:
+        plt.scatter(rows["PM2.5"], rows["AQI"], alpha=0.5, c='teal', rasterized=True)
+    else:
+        plt.hexbin(rows["PM2.5"], rows["AQI"], gridsize=80, cmap="viridis", mincnt=1, rasterized=True)
+        plt.colorbar(label="Rows")
+    plt.title("Scatter Plot: AQI vs PM2.5")
+    plt.xlabel("PM2.5")
+    plt.ylabel("AQI")
+    plt.grid(True)
+    plt.tight_layout()
+
+
+def bubble_inputs(df, cube):
+    return {"bubble_df": mean_by(cube, "City", ["AQI", "PM10"]).reset_index()}
+
+
+def bubble_chart(data):
+    bubble_df = data["bubble_df"]
+    plt.figure(figsize=(10, 6))
+    plt.scatter(bubble_df["City"], bubble_df["AQI"],
+                s=bubble_df["PM10"], alpha=0.6, c='skyblue')
+    plt.xticks(rotation=45)
+    plt.title("Bubble Chart: AQI vs City (Bubble size = PM10)")
+    plt.xlabel("City")
+    plt.ylabel("Average AQI")
+    plt.tight_layout()
+
+
+def grouped_inputs(df, cube):
+    top_cities = city_counts(cube).nlargest(5).index
+    grouped = mean_by(cube, ["City", "Year"]).reset_index()
+    return {"grouped": grouped[grouped["City"].isin(top_cities)].reset_index(drop=True)}
+
+
+def grouped_chart(data):
+    plt.figure(figsize=(12, 6))
+    sns.barplot(data=data["grouped"], x="City", y="AQI", hue="Year", palette="Set2")
+    plt.title("Grouped Column Chart: AQI by City and Year")
+    plt.ylabel("Average AQI")
+    plt.tight_layout()
+
+
+# (output file, inputs, draw), in the order the charts are shown interactively
+CHARTS = [
+    ("aqi_prediction_plot.png", prediction_inputs, prediction_chart),
+    ("average_aqi_by_city.png", city_avg_inputs, city_avg_chart),
+    ("aqi_level_distribution_pie.png", level_inputs, level_pie_chart),
+    ("aqi_3d_scatter.png", scatter_3d_inputs, scatter_3d_chart),
+    ("aqi_level_distribution_pie_3d.png", level_inputs, level_pie_3d_chart),
+    ("average_aqi_by_city_3d.png", city_avg_asc_inputs, city_bar_3d_chart),
+    ("delhi_aqi_trend.png", delhi_inputs, delhi_trend_chart),
+    ("average_aqi_by_city_blues.png", city_avg_asc_inputs, city_avg_blues_chart),
+    ("mumbai_radar.png", mumbai_inputs, mumbai_radar_chart),
+    ("aqi_vs_pm25_scatter.png", pm25_inputs, pm25_scatter_chart),
+    ("aqi_bubble_by_city.png", bubble_inputs, bubble_chart),
+    ("aqi_by_city_year.png", grouped_inputs, grouped_chart),
+]
+# Charts the interactive run has always saved next to the script
+SAVED_INTERACTIVE = {"aqi_prediction_plot.png", "average_aqi_by_city.png", "aqi_level_distribution_pie.png"}
+
+
+def print_level_pictorial(cube):
+    aqi_counts = level_counts(cube)
+    print("\n📊 AQI Level Distribution (Pictorial)")
+    for level, count in aqi_counts.items():
+        bar = '🟩' * (count // 500)  # scale down
+        print(f"{level:<12}: {bar} ({count})")
+
+
+# --------------- Headless Report ---------------
+def _code_sources(draw):
+    # The draw function, the app.py helpers and constants it uses, and the whole source of
+    # any repo module it calls into (e.g. train.py for fit_forest)
+    sources, seen, codes = [inspect.getsource(draw)], set(), [draw.__code__]
+    while codes:
+        code = codes.pop()
+        codes.extend(c for c in code.co_consts if inspect.iscode(c))
+        for name in code.co_names:
+            if name in seen or name not in draw.__globals__:
+                continue
+            seen.add(name)
+            obj = draw.__globals__[name]
+            if isinstance(obj, (int, float, str, tuple, list, dict)):
+                sources.append(f"{name} = {obj!r}")
+                continue
+            module = inspect.getmodule(obj)
+            path = getattr(module, "__file__", None)
+            if path is None or os.path.dirname(os.path.abspath(path)) != BASE_DIR:
+                continue
+            if module.__name__ == draw.__module__:
+                if inspect.isfunction(obj) and obj is not draw:
+                    sources.append(inspect.getsource(obj))
+                    codes.append(obj.__code__)
+            elif module.__name__ not in seen:
+                seen.add(module.__name__)
+                sources.append(inspect.getsource(module))
+    return sources
+
+
+def input_digest(data, draw):
+    """Hash of a chart's inputs, its drawing code and the repo code that code calls."""
+    h = hashlib.sha256()
+    for source in _code_sources(draw):
+        h.update(source.encode())
+    for key in sorted(data):
+        value = data[key]
+        h.update(key.encode())
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+            h.update(repr(list(value.columns) if isinstance(value, pd.DataFrame) else value.name).encode())
+        elif isinstance(value, np.ndarray):
+            h.update(value.tobytes())
+        else:
+            h.update(repr(value).encode())
+    return h.hexdigest()
+
+
+def _init_worker():
+    global FOREST_JOBS
+    matplotlib.use("Agg")
+    FOREST_JOBS = 1
+
+
+def render_chart(draw, data, path, dpi=100):
+    start = time.perf_counter()
+    draw(data)
+    plt.savefig(path + ".tmp.png", dpi=dpi)
+    plt.close("all")
+    os.replace(path + ".tmp.png", path)
+    return time.perf_counter() - start
+
+
+def run_headless(out_dir, jobs=None, force=False):
+    os.makedirs(out_dir, exist_ok=True)
+    cache_path = os.path.join(out_dir, CACHE_FILE)
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+
+    df = load_columns()
+    cube = get_cube()
+
+    pending = []
+    for filename, inputs, draw in CHARTS:
+        data = inputs(df, cube)
+        digest = input_digest(data, draw)
+        path = os.path.join(out_dir, filename)
+        if not force and cache.get(filename) == digest and os.path.exists(path):
+            print(f"{filename:<36} unchanged, skipped")
+            continue
+        pending.append((filename, draw, data, path, digest))
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+        futures = {pool.submit(render_chart, draw, data, path): (filename, digest)
+                   for filename, draw, data, path, digest in pending}
+        for future in as_completed(futures):
+            filename, digest = futures[future]
+            print(f"{filename:<36} rendered in {future.result():.2f}s")
+            cache[filename] = digest
+
+    with open(cache_path + ".tmp", "w") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(cache_path + ".tmp", cache_path)
+    print_level_pictorial(cube)
+
+
+def run_interactive():
+    # Typed columnar copy of aqi_india.csv; dates are already parsed
+    df = load_columns()
+    # Pre-aggregated City x Year x Month x AQI Level cells; the summary charts read from here
+    cube = get_cube()
+    for filename, inputs, draw in CHARTS:
+        draw(inputs(df, cube))
+        if filename in SAVED_INTERACTIVE:
+            plt.savefig(filename)
+        plt.show()
+    print_level_pictorial(cube)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--headless", action="store_true", help="render to files with the Agg backend")
+    parser.add_argument("--out", default="charts", help="output directory for --headless")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--force", action="store_true", help="re-render charts even if inputs are unchanged")
+    args = parser.parse_args()
+
+    if args.headless:
+        run_headless(args.out, args.jobs, args.force)
+    else:
+        run_interactive()
@@ -0,0 +1,121 @@
+"""CPCB sub-index, overall AQI and AQI band classification, vectorized over whole columns.
+
+    python aqi_bands.py check        # parity with the AQI / AQI Level columns of aqi_india.csv
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+LEVELS = ["Good", "Satisfactory", "Moderate", "Poor", "Very Poor", "Severe"]
+# Upper AQI bound of every band but the last
+BAND_UPPER = np.array([50, 100, 200, 300, 400], dtype=np.float64)
+INDEX_EDGES = np.array([0, 50, 100, 200, 300, 400, 500], dtype=np.float64)
+
+# CPCB National AQI concentration breakpoints matching INDEX_EDGES
+# (µg/m³, CO in mg/m³). The last edge is the top of the Severe band; values
+# above it extrapolate along that segment.
+BREAKPOINTS = {
+    "PM2.5": [0, 30, 60, 90, 120, 250, 380],
+    "PM10": [0, 50, 100, 250, 350, 430, 510],
+    "NO2": [0, 40, 80, 180, 280, 400, 520],
+    "O3": [0, 50, 100, 168, 208, 748, 1000],
+    "CO": [0, 1.0, 2.0, 10, 17, 34, 51],
+    "SO2": [0, 40, 80, 380, 800, 1600, 2400],
+    "NH3": [0, 200, 400, 800, 1200, 1800, 2400],
+}
+
+
+# --------------- Sub-indices ---------------
+def _segments(pollutant):
+    # Per-segment slope and intercept, so each value costs one lookup and one multiply-add
+    edges = np.asarray(BREAKPOINTS[pollutant], dtype=np.float64)
+    slope = np.diff(INDEX_EDGES) / np.diff(edges)
+    return edges[1:-1], slope, INDEX_EDGES[:-1] - edges[:-1] * slope
+
+
+_SEGMENTS = {p: _segments(p) for p in BREAKPOINTS}
+
+
+def sub_index(pollutant, conc, out=None):
+    """Piecewise-linear CPCB sub-index for a whole column of concentrations."""
+    inner, slope, intercept = _SEGMENTS[pollutant]
+    conc = np.asarray(conc, dtype=np.float64)
+    seg = np.searchsorted(inner, conc, side="left")
+    out = np.multiply(conc, slope[seg], out=out)
+    out += intercept[seg]
+    out[conc < 0] = np.nan
+    return out
+
+
+def sub_indices(df):
+    """Sub-index of every pollutant in ``df`` that has CPCB breakpoints."""
+    return pd.DataFrame({p: sub_index(p, df[p]) for p in BREAKPOINTS if p in df}, index=df.index)
+
+
+def overall_aqi(df, min_pollutants=3):
+    """CPCB AQI: the worst sub-index, where at least ``min_pollutants`` are
+    available and one of them is PM2.5 or PM10; NaN otherwise."""
+    pollutants = [p for p in BREAKPOINTS if p in df]
+    values = np.empty((len(pollutants), len(df)))
+    for i, p in enumerate(pollutants):
+        sub_index(p, df[p].to_numpy(np.float64), out=values[i])
+    valid = ~np.isnan(values)
+    has_pm = valid[[i for i, p in enumerate(pollutants) if p in ("PM2.5", "PM10")]].any(axis=0)
+    aqi = np.fmax.reduce(values, axis=0)
+    aqi[(valid.sum(axis=0) < min_pollutants) | ~has_pm] = np.nan
+    return aqi
+
+
+# --------------- Bands ---------------
+def band_index(aqi):
+    """0 (Good) .. 5 (Severe) for each AQI value, -1 where it is missing; band upper bounds are inclusive."""
+    aqi = np.asarray(aqi, dtype=np.float64)
+    # searchsorted sorts NaN after every edge, which would read as Severe
+    return np.where(np.isnan(aqi), -1, np.searchsorted(BAND_UPPER, aqi, side="left"))
+
+
+def classify(aqi):
+    """AQI Level labels for a column of AQI values, as a Categorical in band order (NaN stays missing)."""
+    return pd.Categorical.from_codes(np.atleast_1d(band_index(aqi)), categories=LEVELS, ordered=True)
+
+
+def level_of(aqi):
+    """Band label for a single AQI value, or None if it is missing."""
+    band = int(band_index(aqi))
+    return LEVELS[band] if band >= 0 else None
+
+
+# --------------- Parity & Throughput ---------------
+def check(csv_path=None):
+    from data_store import load_columns
+    from settings import DATA_PATH
+
+    df = load_columns(csv_path=csv_path or DATA_PATH)
+    levels = classify(df["AQI"])
+    print(f"AQI Level from dataset AQI: {np.mean(levels.astype(str) == df['AQI Level'].astype(str)) * 100:.2f}% match")
+
+    computed = overall_aqi(df)
+    diff = np.abs(computed - df["AQI"].to_numpy(np.float64))
+    print(f"AQI from CPCB sub-indices: {np.mean(diff < 1) * 100:.2f}% within 1 point, "
+          f"median |diff| {np.nanmedian(diff):.1f}")
+    print(f"AQI Level from CPCB AQI: "
+          f"{np.mean(classify(computed).astype(str) == df['AQI Level'].astype(str)) * 100:.2f}% match")
+
+    big = pd.concat([df[list(BREAKPOINTS)]] * max(1, 2_000_000 // len(df)), ignore_index=True)
+    start = time.perf_counter()
+    aqi = overall_aqi(big)
+    mid = time.perf_counter()
+    classify(aqi)
+    end = time.perf_counter()
+    print(f"{len(big):,} rows: sub-indices + AQI {len(big) / (mid - start) / 1e6:.1f}M rows/s, "
+          f"classification {len(big) / (end - mid) / 1e6:.1f}M rows/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("action", choices=["check"])
+    parser.add_argument("--csv", default=None)
+    args = parser.parse_args()
+    check(args.csv)
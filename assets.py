@@ -0,0 +1,107 @@
+import base64
+import functools
+import hashlib
+import os
+
+from settings import BASE_DIR
+
+# Streamlit serves ./static at app/static/ when server.enableStaticServing is on
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+STATIC_URL = "app/static"
+
+BACKGROUND_IMAGES = ["Pollution.png", "pollution_bg.png"]
+MAX_WIDTH = 1280
+JPEG_QUALITY = 78
+
+
+def web_variant_name(image_file):
+    # Pollution.png -> Pollution.web.jpg
+    stem = os.path.splitext(os.path.basename(image_file))[0]
+    return f"{stem}.web.jpg"
+
+
+# --------------- One-off Image Shrinking ---------------
+def build_web_variant(image_file, static_dir=STATIC_DIR, max_width=MAX_WIDTH, quality=JPEG_QUALITY):
+    """Write a resized, progressive JPEG of ``image_file`` into ``static_dir`` if it is missing or stale."""
+    from PIL import Image
+
+    src = os.path.join(BASE_DIR, image_file)
+    dst = os.path.join(static_dir, web_variant_name(image_file))
+    if os.path.exists(dst) and os.path.getmtime(dst) >= os.path.getmtime(src):
+        return dst
+
+    os.makedirs(static_dir, exist_ok=True)
+    with Image.open(src) as img:
+        img = img.convert("RGB")
+        if img.width > max_width:
+            img = img.resize((max_width, round(img.height * max_width / img.width)), Image.LANCZOS)
+        tmp = dst + ".tmp"
+        img.save(tmp, "JPEG", quality=quality, optimize=True, progressive=True)
+    os.replace(tmp, dst)
+    return dst
+
+
+def build_assets(static_dir=STATIC_DIR):
+    return [build_web_variant(name, static_dir) for name in BACKGROUND_IMAGES]
+
+
+# --------------- Background CSS ---------------
+def _static_serving_enabled():
+    try:
+        import streamlit as st
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+
+def _image_url(image_file):
+    variant = os.path.join(STATIC_DIR, web_variant_name(image_file))
+    if not os.path.exists(variant):
+        try:
+            build_web_variant(image_file)
+        except (ImportError, OSError):
+            variant = os.path.join(BASE_DIR, image_file)
+
+    with open(variant, "rb") as f:
+        data = f.read()
+    if _static_serving_enabled() and os.path.dirname(variant) == STATIC_DIR:
+        # The content hash busts browser caches whenever the image is regenerated
+        digest = hashlib.sha1(data).hexdigest()[:10]
+        return f"{STATIC_URL}/{os.path.basename(variant)}?v={digest}"
+    mime = "image/jpeg" if variant.endswith(".jpg") else "image/png"
+    return f"data:{mime};base64,{base64.b64encode(data).decode()}"
+
+
+@functools.lru_cache(maxsize=None)
+def background_css(image_file):
+    """Page CSS for the background, built once per process and image."""
+    url = _image_url(image_file)
+    return f"""
+        <style>
+        .stApp {{
+            background-image: url("{url}");
+            background-size: cover;
+            background-attachment: fixed;
+            background-repeat: no-repeat;
+            background-position: center;
+            color: black !important;
+            font-weight: bold !important;
+        }}
+        .block-container {{
+            background: rgba(255, 255, 255, 0.85);
+            padding: 2rem;
+            border-radius: 12px;
+            box-shadow: 0 8px 32px 0 rgba(31, 38, 135, 0.37);
+        }}
+        /* Bold and black for all text */
+        h1, h2, h3, h4, h5, h6, p, span, label, div, input, button, .css-1cpxqw2 {{
+            color: black !important;
+            font-weight: bold !important;
+        }}
+        </style>
+        """
+
+
+if __name__ == "__main__":
+    for path in build_assets():
+        print(f"{path}: {os.path.getsize(path) / 1024:.0f} KiB")
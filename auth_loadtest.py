@@ -0,0 +1,108 @@
+"""Login latency as the user table grows.
+
+Builds a scratch database (never users.db), grows it in steps up to
+``--max-users`` accounts and times logins against it, both through the
+indexed AuthStore and through the old unindexed per-call-connection query.
+Accounts are hashed with ``--hash-iterations`` PBKDF2 rounds, far fewer than
+AUTH_HASH_ITERATIONS, so the timings show the lookup rather than the hash.
+
+    python auth_loadtest.py --max-users 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from auth_store import AuthStore, hash_password, legacy_hash
+
+
+def _grow(db_path, hashed, start, stop, batch=50_000):
+    # Every synthetic account shares one stored hash, so hashing is done once
+    conn = sqlite3.connect(db_path)
+    for lo in range(start, stop, batch):
+        hi = min(lo + batch, stop)
+        with conn:
+            conn.executemany('INSERT INTO userstable (username, password) VALUES (?, ?)',
+                             ((f"user{i}@example.com", hashed) for i in range(lo, hi)))
+    conn.close()
+
+
+def _legacy_login(db_path, username, hashed):
+    # The pre-pool code path: a fresh connection and a full scan per call
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    data = conn.execute('SELECT * FROM userstable WHERE username = ? AND password = ?',
+                        (username, hashed)).fetchone()
+    conn.close()
+    return data
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "p50_ms": statistics.median(samples) * 1000,
+        "p99_ms": samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000,
+    }
+
+
+def run(max_users, logins, concurrency, legacy_limit, hash_iterations=1):
+    steps = [n for n in (1_000, 10_000, 100_000, 1_000_000, 10_000_000) if n < max_users] + [max_users]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "users.db")
+        store = AuthStore(db_path)
+        legacy_db = os.path.join(tmp, "legacy.db")
+        conn = sqlite3.connect(legacy_db)
+        conn.execute("CREATE TABLE userstable (username TEXT, password TEXT)")
+        conn.close()
+
+        size = 0
+        for target in steps:
+            _grow(db_path, hash_password("secret", hash_iterations), size, target)
+            if target <= legacy_limit:
+                _grow(legacy_db, legacy_hash("secret"), size, target)
+            size = target
+
+            names = [f"user{random.randrange(size)}@example.com" for _ in range(logins)]
+
+            def timed(name):
+                start = time.perf_counter()
+                assert store.login_user(name, "secret") is not None
+                return time.perf_counter() - start
+
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                pooled = list(pool.map(timed, names))
+            row = {"users": size, "pooled": _percentiles(pooled)}
+
+            if size <= legacy_limit:
+                hashed = legacy_hash("secret")
+                legacy = []
+                for name in names[:max(1, logins // 10)]:
+                    start = time.perf_counter()
+                    _legacy_login(legacy_db, name, hashed)
+                    legacy.append(time.perf_counter() - start)
+                row["legacy"] = _percentiles(legacy)
+            results.append(row)
+
+            legacy_txt = (f"  legacy p50 {row['legacy']['p50_ms']:8.3f} ms  p99 {row['legacy']['p99_ms']:8.3f} ms"
+                          if "legacy" in row else "")
+            print(f"{size:>10,} users  pooled p50 {row['pooled']['p50_ms']:7.3f} ms  "
+                  f"p99 {row['pooled']['p99_ms']:7.3f} ms{legacy_txt}")
+        store.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-users", type=int, default=1_000_000)
+    parser.add_argument("--logins", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--legacy-limit", type=int, default=1_000_000,
+                        help="skip the unindexed baseline above this many users")
+    parser.add_argument("--hash-iterations", type=int, default=1,
+                        help="PBKDF2 rounds of the synthetic accounts' passwords")
+    args = parser.parse_args()
+    run(args.max_users, args.logins, args.concurrency, args.legacy_limit, args.hash_iterations)
@@ -0,0 +1,156 @@
+import hashlib
+import hmac
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from settings import AUTH_HASH_ITERATIONS, AUTH_HASH_WORKERS, AUTH_POOL_SIZE, USERS_DB_PATH
+
+SCHEMA_VERSION = 1
+
+
+class MigrationError(RuntimeError):
+    """The users database cannot be migrated without losing accounts."""
+
+
+# --------------- Password Hashing ---------------
+def hash_password(password, iterations=AUTH_HASH_ITERATIONS):
+    """Salted PBKDF2-SHA256, stored as ``pbkdf2_sha256$<iterations>$<salt>$<digest>``."""
+    salt = os.urandom(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return f"pbkdf2_sha256${iterations}${salt.hex()}${digest.hex()}"
+
+
+def legacy_hash(password):
+    # Unsalted SHA-256 as stored by the original app; still accepted, and replaced on the next login
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def verify_password(password, stored):
+    if not stored.startswith("pbkdf2_sha256$"):
+        return hmac.compare_digest(stored, legacy_hash(password))
+    _, iterations, salt, digest = stored.split("$")
+    candidate = hashlib.pbkdf2_hmac("sha256", password.encode(), bytes.fromhex(salt), int(iterations))
+    return hmac.compare_digest(candidate.hex(), digest)
+
+
+# --------------- Schema Migrations ---------------
+def _migrate(conn):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+    with conn:
+        conn.execute('''CREATE TABLE IF NOT EXISTS userstable (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            username TEXT NOT NULL,
+                            password TEXT NOT NULL
+                        )''')
+        # Older databases allowed repeated sign-ups. Rows with different passwords for one
+        # username cannot be merged without locking someone out, so refuse and report them.
+        conflicts = [row[0] for row in conn.execute(
+            "SELECT username FROM userstable GROUP BY username HAVING COUNT(DISTINCT password) > 1 ORDER BY username")]
+        if conflicts:
+            raise MigrationError("Users database has usernames registered with different passwords, "
+                                 "resolve them before upgrading: " + ", ".join(conflicts))
+        # Identical repeats carry no information; keep the first
+        conn.execute('''DELETE FROM userstable
+                        WHERE rowid NOT IN (SELECT MIN(rowid) FROM userstable GROUP BY username)''')
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_userstable_username ON userstable (username)")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+# --------------- Auth Store ---------------
+class AuthStore:
+    """Pooled SQLite access for sign-up and login.
+
+    Connections are opened once per process in WAL mode, so readers never
+    wait on a writer. Hashing is slow on purpose and runs on a small worker
+    pool: the dashboard submits a login and polls the returned Future, so
+    its script thread never waits on a hash, and a burst of logins cannot
+    take more than ``hash_workers`` cores.
+    """
+
+    def __init__(self, db_path=USERS_DB_PATH, pool_size=AUTH_POOL_SIZE, hash_workers=AUTH_HASH_WORKERS):
+        self.db_path = db_path
+        self._hasher = ThreadPoolExecutor(max_workers=hash_workers, thread_name_prefix="aqi-auth")
+        self._pool = queue.LifoQueue()
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+        try:
+            with self.connection() as conn:
+                _migrate(conn)
+        except Exception:
+            self.close()
+            raise
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def _add(self, username, password):
+        hashed = hash_password(password)
+        try:
+            with self.connection() as conn, conn:
+                conn.execute('INSERT INTO userstable (username, password) VALUES (?, ?)', (username, hashed))
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def _verify(self, username, password):
+        with self.connection() as conn:
+            row = conn.execute('SELECT username, password FROM userstable WHERE username = ?',
+                               (username,)).fetchone()
+        if row is None or not verify_password(password, row[1]):
+            return None
+        if not row[1].startswith("pbkdf2_sha256$"):
+            with self.connection() as conn, conn:
+                conn.execute('UPDATE userstable SET password = ? WHERE username = ?',
+                             (hash_password(password), username))
+        return row
+
+    def signup_async(self, username, password):
+        """Create an account on the worker pool. Returns a Future of False if the username is taken."""
+        return self._hasher.submit(self._add, username, password)
+
+    def login_async(self, username, password):
+        """Verify credentials on the worker pool. Returns a Future of the user row or None."""
+        return self._hasher.submit(self._verify, username, password)
+
+    def add_user(self, username, password):
+        """Create an account. Returns False if the username is already taken."""
+        return self.signup_async(username, password).result()
+
+    def login_user(self, username, password):
+        """Return the user row for valid credentials, else None."""
+        return self.login_async(username, password).result()
+
+    def close(self):
+        self._hasher.shutdown(wait=True)
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_auth_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = AuthStore()
+    return _store
@@ -0,0 +1,498 @@
+"""Offline benchmarks for the dashboard and analytics hot paths.
+
+    python benchmark.py generate --rows 1000000           # synthetic CSV under bench_data/
+    python benchmark.py run --rows 8820,1000000           # time every case at each size
+    python benchmark.py run --cases filter_mask,filter_index --rows 8820
+    python benchmark.py compare bench_results/a.json bench_results/b.json
+    python benchmark.py memory --rows 1000000 --workers 1,2,4,8   # RSS/PSS as workers are added
+
+Each run writes bench_results/<timestamp>.json. Cases that need an artifact
+that is missing (e.g. aqi_model.pkl) are recorded as skipped, not failed.
+"""
+import argparse
+import base64
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from settings import BASE_DIR, DATA_PATH, FEATURES, MODEL_PATH, SCALER_PATH
+
+BENCH_DATA_DIR = os.path.join(BASE_DIR, "bench_data")
+RESULTS_DIR = os.path.join(BASE_DIR, "bench_results")
+POLLUTANTS = FEATURES + ["AQI"]
+
+
+class Skip(Exception):
+    pass
+
+
+# --------------- Synthetic Data ---------------
+def synthetic_path(n_rows):
+    return DATA_PATH if n_rows is None else os.path.join(BENCH_DATA_DIR, f"aqi_synthetic_{n_rows}.csv")
+
+
+def generate_synthetic(n_rows, path=None, seed=0, chunk_rows=1_000_000):
+    """Scale aqi_india.csv up to ``n_rows`` rows in the same CSV layout.
+
+    Rows are resampled from the real data with +/-10% multiplicative noise.
+    The original date span is kept, so extra rows are spread over numbered
+    copies of each city ("Delhi-0001", ...) and (City, Date) stays unique.
+    Written in chunks so 10M rows never sit in memory at once.
+    """
+    path = path or synthetic_path(n_rows)
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rng = np.random.default_rng(seed)
+    src = pd.read_csv(DATA_PATH)
+    dates = pd.Index(pd.to_datetime(src["Date"], format="%m/%d/%Y").unique()).sort_values()
+    # Same non-ISO m/d/Y layout as the real file
+    date_strs = np.array([f"{d.month}/{d.day}/{d.year}" for d in dates], dtype=object)
+    city_names = np.array(sorted(src["City"].unique()), dtype=object)
+    per_copy = len(dates) * len(city_names)
+
+    tmp = path + ".tmp"
+    written = 0
+    with open(tmp, "w", newline="") as f:
+        while written < n_rows:
+            n = min(chunk_rows, n_rows - written)
+            idx = np.arange(written, written + n)
+            copy, rest = np.divmod(idx, per_copy)
+            city_idx, date_idx = np.divmod(rest, len(dates))
+            sample = src.iloc[rng.integers(0, len(src), n)]
+            suffix = np.where(copy > 0, "-" + pd.Series(copy).astype(str).str.zfill(4), "")
+            chunk = pd.DataFrame({
+                "Date": date_strs[date_idx],
+                "Year": dates.year[date_idx],
+                "City": pd.Series(city_names[city_idx]) + suffix,
+            })
+            noise = rng.uniform(0.9, 1.1, (n, len(POLLUTANTS)))
+            values = np.round(sample[POLLUTANTS].to_numpy() * noise, 2)
+            for i, col in enumerate(POLLUTANTS):
+                chunk[col] = values[:, i]
+            chunk["AQI Level"] = sample["AQI Level"].to_numpy()
+            chunk.to_csv(f, header=written == 0, index=False)
+            written += n
+    os.replace(tmp, path)
+    return path
+
+
+# --------------- Timing ---------------
+def timeit(fn, repeats=5, min_seconds=0.2):
+    """Run ``fn`` at least ``repeats`` times (more for very fast calls). Returns timing stats."""
+    fn()  # warm-up
+    samples = []
+    start = time.perf_counter()
+    while len(samples) < repeats or (time.perf_counter() - start < min_seconds and len(samples) < 10_000):
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+    return {"median_s": statistics.median(samples), "min_s": min(samples), "repeats": len(samples)}
+
+
+# --------------- Cases ---------------
+# Each case takes a context dict (csv path, row count, cached frames) and returns
+# (callable, items_per_call). Heavy setup happens outside the timed callable.
+def _legacy_frame(ctx):
+    if "legacy_df" not in ctx:
+        df = pd.read_csv(ctx["csv"])
+        df["Date"] = pd.to_datetime(df["Date"], format="%m/%d/%Y")
+        df["Year"] = df["Date"].dt.year
+        ctx["legacy_df"] = df
+    return ctx["legacy_df"]
+
+
+def _model(ctx):
+    if not os.path.exists(MODEL_PATH):
+        raise Skip("aqi_model.pkl not found (python train.py --publish)")
+    if "model" not in ctx:
+        import joblib
+        ctx["model"], ctx["scaler"] = joblib.load(MODEL_PATH), joblib.load(SCALER_PATH)
+    return ctx["model"], ctx["scaler"]
+
+
+def case_csv_parse(ctx):
+    # main.py load_data() before the columnar store
+    def run():
+        df = pd.read_csv(ctx["csv"])
+        df["Date"] = pd.to_datetime(df["Date"])
+        df["Year"] = df["Date"].dt.year
+    return run, ctx["rows"]
+
+
+def case_store_load(ctx):
+    from data_store import ensure_store, load_columns
+    ensure_store(ctx["csv"])
+    return (lambda: load_columns(csv_path=ctx["csv"])), ctx["rows"]
+
+
+def case_filter_mask(ctx):
+    # The three boolean masks main.py used to run on every rerun
+    df = _legacy_frame(ctx)
+    row = df.iloc[len(df) // 2]
+    year, date, city = row["Year"], row["Date"], row["City"]
+    return (lambda: df[(df["Year"] == year) & (df["Date"] == date) & (df["City"] == city)]), 1
+
+
+def case_filter_index(ctx):
+    from prediction_table import PredictionTable
+    df = _legacy_frame(ctx)
+    frame = df.sort_values(["City", "Date"], kind="mergesort").reset_index(drop=True)
+    frame["Predicted AQI"] = 0.0
+    table = PredictionTable(frame)
+    row = df.iloc[len(df) // 2]
+    return (lambda: table.lookup(row["City"], row["Date"])), 1
+
+
+def case_predict_single(ctx):
+    model, scaler = _model(ctx)
+    row = np.array([_legacy_frame(ctx)[FEATURES].iloc[0]])
+    return (lambda: model.predict(scaler.transform(row))), 1
+
+
+def case_predict_batch(ctx):
+    model, scaler = _model(ctx)
+    X = _legacy_frame(ctx)[FEATURES]
+    return (lambda: model.predict(scaler.transform(X))), len(X)
+
+
+def case_predict_service(ctx):
+    # 64 concurrent single-row clients against one micro-batching service
+    from concurrent.futures import ThreadPoolExecutor
+    from predict_service import PredictClient, start_service
+    _model(ctx)
+    if "service" not in ctx:
+        ctx["service"] = start_service()
+    client = PredictClient(ctx["service"].url)
+    rows = _legacy_frame(ctx)[FEATURES].to_numpy()[:64]
+    pool = ThreadPoolExecutor(max_workers=64)
+    return (lambda: list(pool.map(lambda i: client.predict(rows[i:i + 1]), range(64)))), 64
+
+
+def case_set_background_legacy(ctx):
+    def run():
+        with open(os.path.join(BASE_DIR, "Pollution.png"), "rb") as img:
+            base64.b64encode(img.read()).decode()
+    return run, 1
+
+
+def case_set_background(ctx):
+    from assets import background_css
+    return (lambda: background_css("Pollution.png")), 1
+
+
+def case_login_user(ctx):
+    from auth_store import AuthStore
+    tmp = tempfile.mkdtemp()
+    store = AuthStore(os.path.join(tmp, "users.db"))
+    store.add_user("bench@example.com", "secret")
+    return (lambda: store.login_user("bench@example.com", "secret")), 1
+
+
+def case_pdf_report(ctx):
+    from reports import live_report_pdf
+    pollutants = {"pm25": 153, "pm10": 88, "no2": 12, "o3": 20, "so2": 4, "co": 6}
+    return (lambda: live_report_pdf("delhi", "2025-06-01 10:00:00", 153, pollutants)), 1
+
+
+def case_city_report(ctx):
+    # Full-period report for one city, rendered cold (no cache)
+    from reports import city_rows, render_city_report
+    df = _legacy_frame(ctx)
+    city = df["City"].iloc[0]
+    rows = city_rows(city, df["Date"].min(), df["Date"].max())
+    path = os.path.join(tempfile.mkdtemp(), "report.pdf")
+    return (lambda: render_city_report(city, df["Date"].min(), df["Date"].max(), rows, path)), len(rows)
+
+
+def case_groupby_city(ctx):
+    # The City aggregations app.py recomputes for its charts
+    df = _legacy_frame(ctx)
+
+    def run():
+        df.groupby("City")["AQI"].mean()
+        df.groupby(["City", "Year"])["AQI"].mean()
+        df.groupby("City")[["AQI", "PM10"]].mean()
+        df["AQI Level"].value_counts()
+    return run, ctx["rows"]
+
+
+def case_cube_queries(ctx):
+    # The same aggregates served from the pre-built cube
+    from analytics_cube import build_cube, city_mean, level_counts, mean_by
+    from data_store import load_columns
+    cube = build_cube(load_columns(csv_path=ctx["csv"]))
+
+    def run():
+        city_mean(cube)
+        mean_by(cube, ["City", "Year"])
+        mean_by(cube, "City", ["AQI", "PM10"])
+        level_counts(cube)
+    return run, ctx["rows"]
+
+
+def case_cube_build(ctx):
+    from analytics_cube import build_cube
+    from data_store import load_columns
+    df = load_columns(csv_path=ctx["csv"])
+    return (lambda: build_cube(df)), ctx["rows"]
+
+
+def case_band_chain_legacy(ctx):
+    # The per-value if/elif chain main.py ran for each advisory, applied to every row
+    values = _legacy_frame(ctx)["AQI"].tolist()
+
+    def level(aqi):
+        if aqi <= 50:
+            return "Good"
+        elif aqi <= 100:
+            return "Satisfactory"
+        elif aqi <= 200:
+            return "Moderate"
+        elif aqi <= 300:
+            return "Poor"
+        elif aqi <= 400:
+            return "Very Poor"
+        return "Severe"
+    return (lambda: [level(v) for v in values]), ctx["rows"]
+
+
+def case_band_classify(ctx):
+    from aqi_bands import classify
+    values = _legacy_frame(ctx)["AQI"].to_numpy()
+    return (lambda: classify(values)), ctx["rows"]
+
+
+def case_cpcb_aqi(ctx):
+    # Sub-indices for every pollutant, worst one per row, then the band
+    from aqi_bands import classify, overall_aqi
+    df = _legacy_frame(ctx)
+    return (lambda: classify(overall_aqi(df))), ctx["rows"]
+
+
+def case_live_range_query(ctx):
+    # 30 days of hourly readings for one city, out of two years for every live city
+    from live_store import LiveStore, normalize
+    from settings import LIVE_CITIES
+    store = LiveStore(os.path.join(tempfile.mkdtemp(), "live.db"))
+    hours = pd.date_range("2025-06-01", periods=2 * 365 * 24, freq="h")
+    for city in LIVE_CITIES:
+        store.append([normalize(city, {"aqi": 100 + i % 300, "time": {"s": str(ts)},
+                                       "iaqi": {"pm25": {"v": 50}, "pm10": {"v": 80}}})
+                      for i, ts in enumerate(hours)])
+    return (lambda: store.query("delhi", "2026-01-01", "2026-01-30")), 30 * 24
+
+
+def case_forecast_features(ctx):
+    # Lag and rolling-window features for every City x Day cell, whole grid at once
+    from forecast import daily_grid, grid_features
+    _, days, Y = daily_grid(ctx["csv"], live_db=None)
+    return (lambda: grid_features(Y, days)), Y.size
+
+
+def case_forecast_features_pandas(ctx):
+    # The same lags and windows with groupby shift/rolling, for comparison
+    from forecast import LAGS, WINDOWS
+    df = _legacy_frame(ctx).sort_values(["City", "Date"], kind="mergesort")
+
+    def run():
+        by_city = df.groupby("City")["AQI"]
+        out = {f"lag_{k}": by_city.shift(k) for k in LAGS}
+        prev = by_city.shift(1).groupby(df["City"])
+        for w in WINDOWS:
+            window = prev.rolling(w, min_periods=1)
+            out[f"mean_{w}"] = window.mean().reset_index(level=0, drop=True)
+            out[f"std_{w}"] = window.std(ddof=0).reset_index(level=0, drop=True)
+        return pd.DataFrame(out)
+    return run, len(df)
+
+
+def case_forecast_retrain(ctx):
+    # End to end: grid, features, one model per city on the pool, forecasts, cache write
+    from forecast import update_forecasts
+    cache = os.path.join(tempfile.mkdtemp(), "forecast.pkl")
+    state = update_forecasts(ctx["csv"], None, cache, force=True)
+    return (lambda: update_forecasts(ctx["csv"], None, cache, force=True)), len(state["cities"])
+
+CASES = {name[len("case_"):]: fn for name, fn in sorted(globals().items()) if name.startswith("case_")}
+
+
+# --------------- Runner ---------------
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, cases, repeats=5):
+    results = []
+    for size in sizes:
+        csv = generate_synthetic(size) if size else DATA_PATH
+        ctx = {"csv": csv, "rows": size or len(pd.read_csv(DATA_PATH, usecols=["City"]))}
+        for name in cases:
+            entry = {"case": name, "rows": ctx["rows"]}
+            try:
+                fn, items = CASES[name](ctx)
+                entry.update(timeit(fn, repeats))
+                entry["items_per_s"] = items / entry["median_s"] if entry["median_s"] else None
+                print(f"{name:<24} {ctx['rows']:>10,} rows  {entry['median_s'] * 1e3:10.3f} ms")
+            except Skip as e:
+                entry["skipped"] = str(e)
+                print(f"{name:<24} {ctx['rows']:>10,} rows  skipped: {e}")
+            results.append(entry)
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git": _git_rev(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def save(report, out_dir=RESULTS_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, report["meta"]["timestamp"].replace(":", "") + ".json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = {(r["case"], r["rows"]): r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+    for r in new:
+        before = old.get((r["case"], r["rows"]))
+        if not before or "median_s" not in r or "median_s" not in before:
+            continue
+        ratio = r["median_s"] / before["median_s"]
+        print(f"{r['case']:<24} {r['rows']:>10,} rows  {before['median_s'] * 1e3:10.3f} -> "
+              f"{r['median_s'] * 1e3:10.3f} ms  ({ratio:.2f}x)")
+
+
+# --------------- Memory ---------------
+# How much memory N dashboard processes need for the dataset and the model.
+# "copy" is each process parsing the CSV, keeping st.cache_data's pickled entry
+# plus the copy it returns, and unpickling the sklearn forest; "shared" is the
+# memory-mapped columnar store and the exported flat forest (aqi_forest.bin).
+def _smaps_rollup(pid):
+    # RSS counts shared pages once per process; PSS splits them between the processes mapping them
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return {"rss": fields.get("Rss", 0), "pss": fields.get("Pss", 0)}
+
+
+def _memory_worker(mode, csv, ready, done):
+    import pickle
+    if mode == "copy":
+        df = pd.read_csv(csv)
+        df["Date"] = pd.to_datetime(df["Date"], format="%m/%d/%Y")
+        df["Year"] = df["Date"].dt.year
+        cached = pickle.dumps(df)
+        df = pickle.loads(cached)
+        model = None
+        if os.path.exists(MODEL_PATH):
+            import joblib
+            model, scaler = joblib.load(MODEL_PATH), joblib.load(SCALER_PATH)
+    else:
+        from data_store import load_columns
+        from settings import FOREST_PATH
+        df = load_columns(csv_path=csv)
+        model = None
+        if os.path.exists(FOREST_PATH):
+            from forest_engine import load_forest
+            model, scaler = load_forest(FOREST_PATH).as_model_pair()
+    # Touch every column and run a batch so the pages a dashboard would use are resident
+    df[POLLUTANTS].sum()
+    if model is not None:
+        model.predict(scaler.transform(df[FEATURES].iloc[:20_000]))
+    ready.put(os.getpid())
+    done.wait()
+
+
+def measure_memory(csv, mode, n_workers):
+    import multiprocessing
+    ctx = multiprocessing.get_context("spawn")
+    ready, done = ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=_memory_worker, args=(mode, csv, ready, done)) for _ in range(n_workers)]
+    for proc in procs:
+        proc.start()
+    try:
+        pids = [ready.get(timeout=600) for _ in procs]
+        usage = [_smaps_rollup(pid) for pid in pids]
+    finally:
+        done.set()
+        for proc in procs:
+            proc.join()
+    return {
+        "mode": mode,
+        "workers": n_workers,
+        "rss_total": sum(u["rss"] for u in usage),
+        "pss_total": sum(u["pss"] for u in usage),
+        "pss_per_worker": sum(u["pss"] for u in usage) / n_workers,
+    }
+
+
+def memory(size, worker_counts, modes=("copy", "shared")):
+    """Total RSS/PSS of 1..N concurrent worker processes for each loading mode."""
+    csv = generate_synthetic(size) if size else DATA_PATH
+    if "shared" in modes:
+        from data_store import ensure_store
+        ensure_store(csv)
+    results = []
+    for mode in modes:
+        for n in worker_counts:
+            r = measure_memory(csv, mode, n)
+            r["csv"] = os.path.basename(csv)
+            print(f"{mode:<7} {n:>3} workers  RSS {r['rss_total'] / 2**20:9.1f} MiB  "
+                  f"PSS {r['pss_total'] / 2**20:9.1f} MiB  ({r['pss_per_worker'] / 2**20:7.1f} MiB/worker)")
+            results.append(r)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="action", required=True)
+    gen = sub.add_parser("generate")
+    gen.add_argument("--rows", type=int, required=True)
+    runp = sub.add_parser("run")
+    runp.add_argument("--rows", default="0", help="comma-separated sizes; 0 means aqi_india.csv itself")
+    runp.add_argument("--cases", default=",".join(CASES))
+    runp.add_argument("--repeats", type=int, default=5)
+    cmp = sub.add_parser("compare")
+    cmp.add_argument("old")
+    cmp.add_argument("new")
+    memp = sub.add_parser("memory")
+    memp.add_argument("--rows", type=int, default=0, help="0 means aqi_india.csv itself")
+    memp.add_argument("--workers", default="1,2,4,8", help="comma-separated worker counts")
+    memp.add_argument("--modes", default="copy,shared")
+    args = parser.parse_args()
+
+    if args.action == "generate":
+        print(generate_synthetic(args.rows))
+    elif args.action == "run":
+        sizes = [int(s) or None for s in args.rows.split(",")]
+        report = run(sizes, [c for c in args.cases.split(",") if c], args.repeats)
+        print(f"Saved {save(report)}")
+    elif args.action == "memory":
+        memory(args.rows or None, [int(n) for n in args.workers.split(",")], args.modes.split(","))
+    else:
+        compare(args.old, args.new)
@@ -0,0 +1,202 @@
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from settings import DATA_PATH
+
+STORE_FORMAT = 1
+# Names the current version inside a store directory where symlinks can't be created (see swap_dir)
+POINTER_FILE = "CURRENT"
+
+CATEGORICAL_COLUMNS = ["City", "AQI Level"]
+FLOAT_COLUMNS = ['PM2.5', 'PM10', 'NO', 'NO2', 'NOx', 'NH3', 'CO', 'SO2', 'O3', 'Benzene', 'Toluene', 'Xylene', 'AQI']
+
+
+def store_dir_for(csv_path):
+    # aqi_india.csv -> aqi_india_store/, next to the CSV it mirrors
+    return os.path.splitext(csv_path)[0] + "_store"
+
+
+STORE_DIR = store_dir_for(DATA_PATH)
+
+
+def _csv_stamp(csv_path):
+    st = os.stat(csv_path)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def _column_file(store_dir, column):
+    # Column names such as "PM2.5" and "AQI Level" are not all filename-safe
+    safe = "".join(ch if ch.isalnum() else "_" for ch in column)
+    return os.path.join(store_dir, f"{safe}.npy")
+
+
+def resolve_dir(path):
+    """The version directory ``path`` currently names: a symlink's target or a pointer file's entry."""
+    try:
+        with open(os.path.join(path, POINTER_FILE)) as f:
+            return os.path.join(os.path.dirname(os.path.realpath(path)), f.read().strip())
+    except OSError:
+        return os.path.realpath(path)
+
+
+def _read_meta(store_dir):
+    try:
+        with open(os.path.join(resolve_dir(store_dir), "meta.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_fresh(csv_path=DATA_PATH, store_dir=None):
+    store_dir = store_dir or store_dir_for(csv_path)
+    meta = _read_meta(store_dir)
+    return (meta is not None and meta.get("format") == STORE_FORMAT
+            and meta.get("source") == _csv_stamp(csv_path))
+
+
+# --------------- CSV -> Columnar Store ---------------
+def convert(csv_path=DATA_PATH, store_dir=None):
+    """Parse the CSV once and write one typed .npy file per column."""
+    store_dir = store_dir or store_dir_for(csv_path)
+    stamp = _csv_stamp(csv_path)
+    df = pd.read_csv(csv_path, dtype={c: np.float32 for c in FLOAT_COLUMNS})
+    df["Date"] = pd.to_datetime(df["Date"], format="%m/%d/%Y")
+
+    tmp_dir = f"{store_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    meta = {"format": STORE_FORMAT, "source": stamp, "rows": len(df), "columns": {}}
+    np.save(_column_file(tmp_dir, "Date"), df["Date"].values.astype("datetime64[ns]"))
+    meta["columns"]["Date"] = {"kind": "datetime"}
+    np.save(_column_file(tmp_dir, "Year"), df["Date"].dt.year.values.astype(np.int16))
+    meta["columns"]["Year"] = {"kind": "int"}
+    for col in CATEGORICAL_COLUMNS:
+        cat = df[col].astype("category")
+        np.save(_column_file(tmp_dir, col), cat.cat.codes.values.astype(np.int16))
+        meta["columns"][col] = {"kind": "category", "categories": [str(c) for c in cat.cat.categories]}
+    for col in FLOAT_COLUMNS:
+        np.save(_column_file(tmp_dir, col), df[col].values.astype(np.float32))
+        meta["columns"][col] = {"kind": "float"}
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    version_dir = f"{store_dir}.v{stamp['mtime_ns']}-{os.getpid()}"
+    os.rename(tmp_dir, version_dir)
+    swap_dir(version_dir, store_dir)
+    return meta
+
+
+def swap_dir(version_dir, path, keep_seconds=60):
+    """Point the symlink ``path`` at ``version_dir`` in one atomic rename.
+
+    Readers always find either the old or the new version at ``path``. The
+    version it replaced, and anything written in the last ``keep_seconds``,
+    stay on disk for readers still loading them; older versions are removed.
+
+    Where symlinks need privileges (Windows without Developer Mode), ``path``
+    is a plain directory instead and its POINTER_FILE names the version,
+    replaced just as atomically. Readers go through resolve_dir either way.
+    """
+    previous = resolve_dir(path) if os.path.lexists(path) else None
+    link = f"{path}.link-{os.getpid()}"
+    if os.path.lexists(link):
+        os.remove(link)
+    try:
+        os.symlink(os.path.basename(version_dir), link)
+    except OSError:
+        _write_pointer(version_dir, path)
+    else:
+        if os.path.isdir(path) and not os.path.islink(path):
+            # A directory from before versioned stores, or a pointer directory: moved aside once,
+            # the only time path is missing
+            stale_dir = f"{path}.stale-{os.getpid()}"
+            try:
+                os.rename(path, stale_dir)
+            except OSError:
+                pass
+            shutil.rmtree(stale_dir, ignore_errors=True)
+        os.replace(link, path)
+
+    parent, prefix = os.path.dirname(path) or ".", os.path.basename(path) + ".v"
+    keep = {os.path.realpath(version_dir), previous, resolve_dir(path)}
+    for name in os.listdir(parent):
+        old = os.path.realpath(os.path.join(parent, name))
+        if not name.startswith(prefix) or old in keep:
+            continue
+        try:
+            if time.time() - os.path.getmtime(old) > keep_seconds:
+                shutil.rmtree(old, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def _write_pointer(version_dir, path):
+    if os.path.islink(path):
+        os.remove(path)
+    os.makedirs(path, exist_ok=True)
+    tmp = os.path.join(path, f"{POINTER_FILE}.tmp-{os.getpid()}")
+    with open(tmp, "w") as f:
+        f.write(os.path.basename(version_dir))
+    os.replace(tmp, os.path.join(path, POINTER_FILE))
+
+
+def ensure_store(csv_path=DATA_PATH, store_dir=None):
+    """Rebuild the columnar store only when the CSV has changed."""
+    store_dir = store_dir or store_dir_for(csv_path)
+    if not is_fresh(csv_path, store_dir):
+        convert(csv_path, store_dir)
+    return _read_meta(store_dir)
+
+
+# --------------- Loader ---------------
+def open_columns(columns=None, csv_path=DATA_PATH, store_dir=None, mmap=True):
+    """Raw column arrays (category columns as their int codes) and the store's meta.
+
+    Callers that read the store piece by piece map it once here and build
+    frames from slices with ``columns_frame``.
+    """
+    store_dir = store_dir or store_dir_for(csv_path)
+    ensure_store(csv_path, store_dir)
+    # Resolve the store's symlink or pointer once, so every column comes from the same version
+    store_dir = resolve_dir(store_dir)
+    meta = _read_meta(store_dir)
+    if columns is None:
+        columns = list(meta["columns"])
+    mmap_mode = "r" if mmap else None
+    arrays = {col: np.load(_column_file(store_dir, col), mmap_mode=mmap_mode) for col in columns}
+    return arrays, meta
+
+
+def columns_frame(arrays, meta, rows=slice(None), copy=False):
+    """DataFrame over ``rows`` of arrays from ``open_columns``; categoricals are decoded for those rows only."""
+    data = {}
+    for col, arr in arrays.items():
+        part = arr[rows]
+        if copy:
+            part = np.array(part)
+        info = meta["columns"][col]
+        if info["kind"] == "category":
+            data[col] = pd.Categorical.from_codes(part, categories=info["categories"])
+        else:
+            data[col] = part
+    return pd.DataFrame(data, copy=False)
+
+
+def load_columns(columns=None, csv_path=DATA_PATH, store_dir=None, mmap=True):
+    """Load a DataFrame with only the requested columns.
+
+    Numeric columns are memory-mapped read-only, so untouched pages are
+    never read from disk and are shared between processes by the OS.
+    """
+    return columns_frame(*open_columns(columns, csv_path, store_dir, mmap))
+
+
+if __name__ == "__main__":
+    meta = convert()
+    print(f"Wrote {meta['rows']} rows x {len(meta['columns'])} columns to {STORE_DIR}")
@@ -0,0 +1,378 @@
+"""Next-days AQI forecasts, one model per city.
+
+    python forecast.py                          # build or update aqi_forecast.pkl and print every city
+    python forecast.py --city Delhi --days 7
+    python forecast.py --model forest           # per-city forests instead of FORECAST_MODEL
+    python forecast.py check                    # incremental-update parity and a backtest
+
+Each city's daily AQI (aqi_india.csv, then recorded live days after it
+ends) is laid out on one City x Day grid. Lag and rolling-window features
+for every cell come from whole-grid shifts and cumulative sums. A day's
+features depend only on the LOOKBACK days before it, so new days are
+featurized from the tail of the series and appended to the cached matrix.
+City models are retrained on a process pool once FORECAST_RETRAIN_DAYS new
+days have arrived; forecasts are refreshed whenever any day arrives.
+
+FORECAST_MODEL picks each city's model. The default is Baseline, the
+trailing 30-day mean: these series carry no day-to-day signal, and a
+per-city forest forecasts them worse than it does (see `check`).
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from data_store import ensure_store, load_columns
+from settings import (BASE_DIR, DATA_PATH, FORECAST_CHECK_INTERVAL, FORECAST_HORIZON, FORECAST_MODEL,
+                      FORECAST_RETRAIN_DAYS, FORECAST_WORKERS, LIVE_DB_PATH, TARGET)
+
+log = logging.getLogger("aqi.forecast")
+
+FORECAST_PATH = os.path.join(BASE_DIR, "aqi_forecast.pkl")
+STATE_FORMAT = 2
+MODEL_NAMES = {"mean": "trailing 30-day mean", "forest": "random forest"}
+
+LAGS = (1, 2, 3, 7, 14, 28)
+WINDOWS = (7, 30)
+LOOKBACK = max(LAGS + WINDOWS)
+FEATURE_NAMES = ([f"lag_{k}" for k in LAGS] + [f"{stat}_{w}" for w in WINDOWS for stat in ("mean", "std")]
+                 + ["dayofweek", "month"])
+
+
+# --------------- Daily Series ---------------
+def daily_grid(data_path=DATA_PATH, live_db=LIVE_DB_PATH):
+    """``(cities, days, Y)`` with Y[c, d] the AQI of city c on day d, NaN where there is none.
+
+    Recorded live readings are averaged per day and appended after the
+    dataset's last date, as reports.city_rows does for city reports.
+    """
+    df = load_columns(["City", "Date", TARGET], csv_path=data_path)
+    frames = [pd.DataFrame({"City": df["City"].astype(str), "Date": df["Date"],
+                            TARGET: df[TARGET].to_numpy(np.float64)})]
+    if live_db and os.path.exists(live_db):
+        from live_store import LiveStore
+        store = LiveStore(live_db, pool_size=1)
+        live = store.query(start=df["Date"].max() + pd.Timedelta(days=1))
+        store.close()
+        if not live.empty:
+            frames.append(live.groupby(["City", "Date"], as_index=False)[TARGET].mean())
+    rows = pd.concat(frames, ignore_index=True)
+
+    cities = sorted(rows["City"].unique())
+    days = pd.date_range(rows["Date"].min(), rows["Date"].max(), freq="D")
+    Y = np.full((len(cities), len(days)), np.nan)
+    city_idx = pd.Categorical(rows["City"], categories=cities).codes
+    day_idx = ((rows["Date"] - days[0]) // pd.Timedelta(days=1)).to_numpy()
+    Y[city_idx, day_idx] = rows[TARGET].to_numpy()
+    return cities, days, Y
+
+
+# --------------- Features ---------------
+def grid_features(Y, days):
+    """Features for every cell of ``Y`` (cities x days), shape (cities, days, len(FEATURE_NAMES)).
+
+    Day t sees only days before t: lags are shifted copies of the grid and
+    window means/stds are differences of prefix sums, ignoring missing days.
+    """
+    Y = np.asarray(Y, dtype=np.float64)
+    n_cities, n_days = Y.shape
+    X = np.full((n_cities, n_days, len(FEATURE_NAMES)), np.nan, dtype=np.float32)
+    for i, k in enumerate(LAGS):
+        if k < n_days:
+            X[:, k:, i] = Y[:, :-k]
+
+    valid = ~np.isnan(Y)
+    filled = np.where(valid, Y, 0.0)
+    # Leading zero column so the window [t - w, t) is prefix[t] - prefix[t - w]
+    pad = np.zeros((n_cities, 1))
+    count = np.concatenate([pad, np.cumsum(valid, axis=1)], axis=1)
+    total = np.concatenate([pad, np.cumsum(filled, axis=1)], axis=1)
+    squares = np.concatenate([pad, np.cumsum(filled * filled, axis=1)], axis=1)
+    t = np.arange(n_days)
+    col = len(LAGS)
+    for w in WINDOWS:
+        lo = np.maximum(t - w, 0)
+        n = count[:, t] - count[:, lo]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = (total[:, t] - total[:, lo]) / n
+            var = (squares[:, t] - squares[:, lo]) / n - mean * mean
+        X[:, :, col] = mean
+        X[:, :, col + 1] = np.sqrt(np.maximum(var, 0.0))
+        col += 2
+    X[:, :, col] = days.dayofweek.to_numpy()
+    X[:, :, col + 1] = days.month.to_numpy()
+    return X
+
+
+def series_features(y, days):
+    return grid_features(np.asarray(y)[None, :], days)[0]
+
+
+# --------------- Models ---------------
+class Baseline:
+    """Predicts each day's trailing 30-day mean."""
+
+    column = FEATURE_NAMES.index("mean_30")
+
+    def predict(self, X):
+        return np.asarray(X, dtype=np.float64)[:, self.column]
+
+
+def fit_city(X, y, method=FORECAST_MODEL, n_estimators=50, random_state=42):
+    """The city's model for ``method`` (see MODEL_NAMES), trained on its feature rows X and AQI y."""
+    if method == "mean":
+        return Baseline()
+    from sklearn.ensemble import RandomForestRegressor
+    # Every day with a recorded AQI and at least one earlier day is a training row;
+    # the forest routes missing lag/window values itself
+    rows = ~np.isnan(y)
+    rows[0] = False
+    model = RandomForestRegressor(n_estimators=n_estimators, min_samples_leaf=3, n_jobs=1,
+                                  random_state=random_state)
+    model.fit(X[rows], y[rows])
+    return model
+
+
+def forecast_city(model, y, last_day, horizon=FORECAST_HORIZON):
+    """Recursive forecast: each predicted day is the lag-1 input of the next."""
+    history = np.concatenate([np.asarray(y, dtype=np.float64)[-LOOKBACK:], np.full(horizon, np.nan)])
+    days = pd.date_range(end=last_day + pd.Timedelta(days=horizon), periods=len(history), freq="D")
+    start = len(history) - horizon
+    for t in range(start, len(history)):
+        features = series_features(history[:t + 1], days[:t + 1])[t]
+        history[t] = model.predict(features[None, :])[0]
+    return pd.Series(history[start:], index=days[start:], name="Forecast AQI")
+
+
+def _fit_and_forecast(X, y, last_day, horizon, method):
+    # Runs in a pool worker; only the city's own matrix and series are sent over
+    model = fit_city(X, y, method)
+    return model, forecast_city(model, y, last_day, horizon)
+
+
+# --------------- Cache & Incremental Updates ---------------
+def _load_state(cache_path):
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        state = joblib.load(cache_path)
+    except Exception:
+        return None
+    return state if state.get("format") == STATE_FORMAT else None
+
+
+def update_forecasts(data_path=DATA_PATH, live_db=LIVE_DB_PATH, cache_path=FORECAST_PATH,
+                     horizon=FORECAST_HORIZON, retrain_days=FORECAST_RETRAIN_DAYS,
+                     method=FORECAST_MODEL, workers=FORECAST_WORKERS, force=False):
+    """Bring the cached features, models and forecasts up to date with the data.
+
+    A city whose series only grew gets features for its new days alone; the
+    last day already cached is recomputed too, since a live day's mean
+    changes until the day is over. A city whose older days changed is
+    rebuilt from scratch.
+    """
+    if method not in MODEL_NAMES:
+        raise ValueError(f"Unknown forecast model {method!r}; expected one of {sorted(MODEL_NAMES)}")
+    # Taken before the data is read, so a day recorded meanwhile shows up as a change next time
+    source = _source_key(data_path, live_db)
+    cities, days, Y = daily_grid(data_path, live_db)
+    state = _load_state(cache_path)
+    if state is None or (state["first_day"], state["horizon"], state["method"]) != (days[0], horizon, method):
+        state = {"format": STATE_FORMAT, "first_day": days[0], "horizon": horizon, "method": method, "cities": {}}
+    last_day = days[-1]
+
+    to_fit, to_forecast = [], []
+    for c, city in enumerate(cities):
+        y = Y[c]
+        entry = state["cities"].get(city)
+        keep = 0 if entry is None else len(entry["y"]) - 1
+        if entry is not None and (keep > len(y) or not np.array_equal(entry["y"][:keep], y[:keep], equal_nan=True)):
+            entry, keep = None, 0
+        if entry is None:
+            entry = {"y": y, "X": series_features(y, days), "model": None, "trained_days": 0, "forecast": None}
+        elif keep < len(y) - 1 or not np.array_equal(entry["y"], y, equal_nan=True):
+            start = max(0, keep - LOOKBACK)
+            new = series_features(y[start:], days[start:])[keep - start:]
+            entry.update(y=y, X=np.concatenate([entry["X"][:keep], new]), forecast=None)
+        state["cities"][city] = entry
+        if force or entry["model"] is None or len(y) - entry["trained_days"] >= retrain_days:
+            to_fit.append(city)
+        elif entry["forecast"] is None:
+            to_forecast.append(city)
+
+    if to_fit:
+        args = [(state["cities"][city]["X"], state["cities"][city]["y"], last_day, horizon, method)
+                for city in to_fit]
+        if workers > 1 and len(to_fit) > 1 and method == "forest":
+            # spawn: the dashboard never calls this in its own process (see get_forecasts), and
+            # fresh workers inherit no threads or locks from whoever did
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                results = list(pool.map(_fit_and_forecast, *zip(*args)))
+        else:
+            results = [_fit_and_forecast(*a) for a in args]
+        for city, (model, forecast) in zip(to_fit, results):
+            entry = state["cities"][city]
+            entry.update(model=model, forecast=forecast, trained_days=len(entry["y"]))
+    for city in to_forecast:
+        entry = state["cities"][city]
+        entry["forecast"] = forecast_city(entry["model"], entry["y"], last_day, horizon)
+
+    if to_fit or to_forecast or state.get("source") != source:
+        state.update(source=source, last_day=last_day)
+        tmp = cache_path + ".tmp"
+        joblib.dump(state, tmp)
+        os.replace(tmp, cache_path)
+    state["updated"] = {"retrained": len(to_fit), "reforecast": len(to_forecast)}
+    return state
+
+
+def city_forecast(state, city, days=FORECAST_HORIZON, history_days=60):
+    """``(recent, forecast)`` Series for one city, or None if it has no forecast."""
+    entry = state["cities"].get(city)
+    if entry is None or entry["forecast"] is None:
+        return None
+    y = entry["y"]
+    index = pd.date_range(state["first_day"], periods=len(y), freq="D")
+    recent = pd.Series(y, index=index, name="Recorded AQI").iloc[-history_days:]
+    return recent, entry["forecast"].iloc[:days]
+
+
+# --------------- Process-wide Forecasts ---------------
+status = {"state": "idle", "checked": None, "error": None}
+_state = None
+_lock = threading.Lock()
+
+
+def _source_key(data_path=DATA_PATH, live_db=LIVE_DB_PATH):
+    """The CSV's stamp and the last recorded live day: what a forecast update depends on."""
+    last_live = None
+    if live_db and os.path.exists(live_db):
+        from live_store import LiveStore, get_live_store
+        if live_db == LIVE_DB_PATH:
+            coverage = get_live_store().coverage()
+        else:
+            store = LiveStore(live_db, pool_size=1)
+            coverage = store.coverage()
+            store.close()
+        if coverage is not None:
+            last_live = coverage[1].normalize()
+    return tuple(ensure_store(data_path)["source"].values()), last_live
+
+
+def _run_update():
+    # A separate process, like reports.ReportEngine._run_child: the retraining pool must not
+    # start inside the Streamlit server. The result is read back from the cache file.
+    global _state
+    cmd = [sys.executable, os.path.abspath(__file__), "update"]
+    try:
+        child = subprocess.run(cmd, cwd=BASE_DIR, capture_output=True, text=True)
+        if child.returncode != 0:
+            stderr = child.stderr.strip()
+            raise RuntimeError(f"Forecast update failed: {stderr.splitlines()[-1] if stderr else cmd}")
+        _state = _load_state(FORECAST_PATH)
+        status.update(state="done", error=None)
+    except Exception as e:
+        log.exception("Forecast update failed")
+        status.update(state="failed", error=repr(e))
+
+
+def get_forecasts(check_interval=FORECAST_CHECK_INTERVAL):
+    """Shared forecasts from aqi_forecast.pkl, returned at once; None until one has been built.
+
+    At most every ``check_interval`` seconds the CSV's stamp and the last
+    recorded live day are compared with those of the cached forecasts, and
+    `python forecast.py update` is started in the background if they differ.
+    Readings added to a day that is already cached wait for the next day.
+    """
+    global _state
+    with _lock:
+        if _state is None:
+            _state = _load_state(FORECAST_PATH)
+        now = time.monotonic()
+        if status["state"] != "running" and (status["checked"] is None or now - status["checked"] >= check_interval):
+            status["checked"] = now
+            if _state is None or _state.get("source") != _source_key():
+                status["state"] = "running"
+                threading.Thread(target=_run_update, name="aqi-forecast", daemon=True).start()
+    return _state
+
+
+# --------------- Checks ---------------
+def check(data_path=DATA_PATH, holdout=FORECAST_HORIZON, method=FORECAST_MODEL, workers=FORECAST_WORKERS):
+    import tempfile
+    cities, days, Y = daily_grid(data_path, live_db=None)
+    print(f"{len(cities)} cities x {len(days)} days")
+
+    # Incremental features equal a full rebuild, including a revised last day
+    full = grid_features(Y, days)
+    worst = 0.0
+    for c in range(len(cities)):
+        cut = len(days) - 10
+        X = series_features(Y[c, :cut], days[:cut])
+        keep = cut - 1
+        start = keep - LOOKBACK
+        X = np.concatenate([X[:keep], series_features(Y[c, start:], days[start:])[keep - start:]])
+        worst = max(worst, float(np.nanmax(np.abs(X - full[c]))))
+    print(f"incremental features: max |diff| vs full build {worst:.2e}")
+
+    # Backtest: hold out the last `holdout` days of every city
+    with tempfile.TemporaryDirectory() as tmp:
+        train_days = len(days) - holdout
+        errors = {"random forest": [], "30-day mean": [], "last value": []}
+        for candidate, name in (("forest", "random forest"), ("mean", "30-day mean")):
+            start = time.perf_counter()
+            for c in range(len(cities)):
+                _, predicted = _fit_and_forecast(full[c, :train_days], Y[c, :train_days], days[train_days - 1],
+                                                 holdout, candidate)
+                errors[name].append(np.abs(predicted.to_numpy() - Y[c, train_days:]))
+            print(f"{name}: retrain + forecast {len(cities)} cities serially: {time.perf_counter() - start:.1f}s")
+        for c in range(len(cities)):
+            history = Y[c, :train_days]
+            errors["last value"].append(np.abs(history[~np.isnan(history)][-1] - Y[c, train_days:]))
+        for name, errs in errors.items():
+            print(f"{holdout}-day MAE, {name:<14} {np.nanmean(np.concatenate(errs)):7.2f}")
+
+        cache = os.path.join(tmp, "forecast.pkl")
+        start = time.perf_counter()
+        update_forecasts(data_path, None, cache, method=method, workers=workers)
+        print(f"update_forecasts, {MODEL_NAMES[method]}, cold cache, {workers} workers: "
+              f"{time.perf_counter() - start:.1f}s")
+        start = time.perf_counter()
+        state = update_forecasts(data_path, None, cache, method=method, workers=workers)
+        print(f"update_forecasts, no new days: {time.perf_counter() - start:.2f}s ({state['updated']})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("action", nargs="?", choices=["update", "check"], default="update")
+    parser.add_argument("--city", default=None)
+    parser.add_argument("--days", type=int, default=FORECAST_HORIZON)
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--model", choices=sorted(MODEL_NAMES), default=FORECAST_MODEL)
+    parser.add_argument("--workers", type=int, default=FORECAST_WORKERS)
+    parser.add_argument("--force", action="store_true", help="retrain every city")
+    args = parser.parse_args()
+    # The importable module's functions, so the cache pickles forecast.Baseline, which the
+    # dashboard can load, rather than __main__.Baseline
+    from forecast import check, city_forecast, update_forecasts
+
+    if args.action == "check":
+        check(args.data, method=args.model, workers=args.workers)
+    else:
+        start = time.perf_counter()
+        state = update_forecasts(args.data, method=args.model, workers=args.workers, force=args.force)
+        print(f"Updated in {time.perf_counter() - start:.1f}s: {state['updated']['retrained']} retrained, "
+              f"{state['updated']['reforecast']} re-forecast")
+        for city in ([args.city] if args.city else sorted(state["cities"])):
+            result = city_forecast(state, city, args.days)
+            if result is not None:
+                print(f"{city}: " + ", ".join(f"{d:%d %b} {v:.0f}" for d, v in result[1].items()))
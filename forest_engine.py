@@ -0,0 +1,227 @@
+"""Flat-array RandomForest inference without scikit-learn.
+
+    python forest_engine.py export        # aqi_model.pkl + aqi_scaler.pkl -> aqi_forest.bin
+    python forest_engine.py check         # parity with model.predict and timings
+
+The exported file holds every tree's nodes in a handful of flat arrays with
+the StandardScaler folded into the split thresholds, so raw pollutant
+readings go straight in. Missing readings (NaN) take each node's recorded
+missing-value branch, as in sklearn; infinite ones are refused like there. It is memory-mapped on load: startup does not
+unpickle anything and the pages are shared between worker processes.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from settings import BASE_DIR, DATA_PATH, FEATURES, FOREST_PATH, MODEL_PATH, SCALER_PATH
+
+MAGIC = b"AQIFOREST2\n"
+ALIGN = 64
+
+
+# --------------- Export ---------------
+def export_forest(model, scaler, path=FOREST_PATH):
+    """Flatten a fitted RandomForestRegressor and StandardScaler into one file."""
+    mean = np.asarray(scaler.mean_, dtype=np.float64)
+    scale = np.asarray(scaler.scale_, dtype=np.float64)
+
+    features, thresholds, lefts, rights, missing_lefts, values, roots = [], [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for est in model.estimators_:
+        tree = est.tree_
+        n = tree.node_count
+        feat = tree.feature.astype(np.int32)
+        leaf = tree.children_left == -1
+        # sklearn tests float32((x - mean) / scale) <= t. With t32 the largest float32 not
+        # above t, a scaled value passes iff it rounds to t32 or below, i.e. lies under the
+        # midpoint to the next float32. Fold that midpoint back into raw units:
+        # x <= mid * scale + mean, since scale > 0.
+        t32 = tree.threshold.astype(np.float32)
+        t32 = np.where(t32.astype(np.float64) > tree.threshold, np.nextafter(t32, np.float32(-np.inf)), t32)
+        mid = (t32.astype(np.float64) + np.nextafter(t32, np.float32(np.inf)).astype(np.float64)) / 2
+        idx = np.maximum(feat, 0)
+        thr = np.where(leaf, np.inf, mid * scale[idx] + mean[idx])
+        own = np.arange(offset, offset + n, dtype=np.int32)
+        # Leaves point at themselves, so every row can take the same number of steps
+        features.append(np.where(leaf, 0, feat).astype(np.int32))
+        thresholds.append(thr)
+        lefts.append(np.where(leaf, own, tree.children_left + offset).astype(np.int32))
+        rights.append(np.where(leaf, own, tree.children_right + offset).astype(np.int32))
+        missing_lefts.append(tree.missing_go_to_left.astype(np.bool_))
+        values.append(tree.value[:, 0, 0].astype(np.float64))
+        roots.append(offset)
+        offset += n
+        max_depth = max(max_depth, tree.max_depth)
+
+    arrays = {
+        "feature": np.concatenate(features),
+        "threshold": np.concatenate(thresholds),
+        "left": np.concatenate(lefts),
+        "right": np.concatenate(rights),
+        "missing_left": np.concatenate(missing_lefts),
+        "value": np.concatenate(values),
+        "roots": np.asarray(roots, dtype=np.int32),
+    }
+    _write(path, arrays, {"features": list(FEATURES), "max_depth": int(max_depth), "n_trees": len(roots)})
+    return path
+
+
+def is_current(path):
+    """True if ``path`` is a forest export in this version's format."""
+    if not os.path.exists(path):
+        return False
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def _write(path, arrays, meta):
+    layout = {}
+    pos = 0
+    for name, arr in arrays.items():
+        layout[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": pos}
+        pos += -(-arr.nbytes // ALIGN) * ALIGN
+    header = json.dumps(dict(meta, arrays=layout)).encode()
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header)).tobytes())
+        f.write(header)
+        for name, arr in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(np.ascontiguousarray(arr).tobytes())
+        f.truncate(data_start + pos)
+    os.replace(tmp, path)
+
+
+# --------------- Inference ---------------
+class _FoldedScaler:
+    # The scaler lives inside the thresholds; this keeps the (model, scaler) call shape
+    def transform(self, X):
+        return X
+
+
+class CompactForest:
+    def __init__(self, path=FOREST_PATH):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not an exported AQI forest in the current format; "
+                                 "re-export it with `python forest_engine.py export`")
+            header_len = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            meta = json.loads(f.read(header_len))
+        data_start = -(-(len(MAGIC) + 8 + header_len) // ALIGN) * ALIGN
+        for name, info in meta.pop("arrays").items():
+            arr = np.memmap(path, dtype=np.dtype(info["dtype"]), mode="r",
+                            offset=data_start + info["offset"], shape=tuple(info["shape"]))
+            setattr(self, name, arr)
+        self.path = path
+        self.features = meta["features"]
+        self.max_depth = meta["max_depth"]
+        self.n_estimators = meta["n_trees"]
+
+    def predict(self, X, chunk_rows=16384):
+        """Mean of the trees' leaf values for raw (unscaled) feature rows."""
+        X = np.asarray(X.values if hasattr(X, "values") else X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        if np.isinf(X).any():
+            raise ValueError("Input X contains infinity")
+        out = np.empty(len(X))
+        for lo in range(0, len(X), chunk_rows):
+            out[lo:lo + chunk_rows] = self._predict_chunk(X[lo:lo + chunk_rows])
+        return out
+
+    def _predict_chunk(self, X):
+        # Walk every (row, tree) pair one level per step, using flat takes instead of 2-D fancy indexing
+        flat = np.ascontiguousarray(X).ravel()
+        base = (np.arange(len(X), dtype=np.int64) * X.shape[1])[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        has_nan = np.isnan(flat).any()
+        for depth in range(self.max_depth):
+            x = flat.take(base + self.feature.take(node))
+            go_left = x <= self.threshold.take(node)
+            if has_nan:
+                go_left = np.where(np.isnan(x), self.missing_left.take(node), go_left)
+            node = np.where(go_left, self.left.take(node), self.right.take(node))
+            # Most paths are far shorter than the deepest one; stop once all rows sit on leaves
+            if depth % 4 == 3 and np.array_equal(self.left.take(node), node):
+                break
+        return self.value.take(node).mean(axis=1)
+
+    def as_model_pair(self):
+        return self, _FoldedScaler()
+
+
+def load_forest(path=FOREST_PATH):
+    return CompactForest(path)
+
+
+# --------------- Parity & Timings ---------------
+def _startup_seconds(code):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=BASE_DIR, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def check(path=FOREST_PATH, repeats=200):
+    import joblib
+    import pandas as pd
+
+    model, scaler = joblib.load(MODEL_PATH), joblib.load(SCALER_PATH)
+    forest = load_forest(path)
+    df = pd.read_csv(DATA_PATH)
+    X = df[FEATURES]
+
+    expected = model.predict(scaler.transform(X))
+    got = forest.predict(X)
+    diff = np.abs(expected - got)
+    print(f"Parity on {len(X)} rows: max |diff| {diff.max():.3g}, "
+          f"{np.mean(diff < 1e-6) * 100:.2f}% identical, mean |diff| {diff.mean():.3g}")
+
+    sk_start = _startup_seconds("import joblib; joblib.load('aqi_model.pkl'); joblib.load('aqi_scaler.pkl')")
+    compact_start = _startup_seconds("import forest_engine; forest_engine.load_forest()")
+    print(f"Startup (python + load): sklearn pickle {sk_start:.2f}s, compact {compact_start:.2f}s")
+
+    row = X.iloc[[0]]
+    raw = row.values
+    start = time.perf_counter()
+    for _ in range(repeats):
+        model.predict(scaler.transform(row))
+    sk_row = (time.perf_counter() - start) / repeats
+    start = time.perf_counter()
+    for _ in range(repeats):
+        forest.predict(raw)
+    compact_row = (time.perf_counter() - start) / repeats
+    print(f"Single row: sklearn {sk_row * 1e3:.2f} ms, compact {compact_row * 1e3:.2f} ms")
+
+    start = time.perf_counter()
+    model.predict(scaler.transform(X))
+    sk_batch = time.perf_counter() - start
+    start = time.perf_counter()
+    forest.predict(X)
+    compact_batch = time.perf_counter() - start
+    print(f"Batch ({len(X)} rows): sklearn {len(X) / sk_batch:,.0f} rows/s, "
+          f"compact {len(X) / compact_batch:,.0f} rows/s")
+    return diff
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("action", choices=["export", "check"])
+    parser.add_argument("--path", default=FOREST_PATH)
+    args = parser.parse_args()
+
+    if args.action == "export":
+        import joblib
+        export_forest(joblib.load(MODEL_PATH), joblib.load(SCALER_PATH), args.path)
+        print(f"Wrote {args.path} ({os.path.getsize(args.path) / 1e6:.1f} MB)")
+    else:
+        check(args.path)
@@ -0,0 +1,63 @@
+"""Import-time profile of the dashboard's first, unauthenticated run.
+
+    python import_profile.py                      # main.py, up to the login form
+    python import_profile.py --main old_main.py   # e.g. a previous revision, for comparison
+    python import_profile.py --repeats 5 --top 20
+
+Runs the page once in a fresh interpreter under ``-X importtime`` (Streamlit
+bare mode, not logged in), reports the wall time to the end of the script,
+i.e. to the login form, and the slowest top-level imports.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from settings import BASE_DIR
+
+RUNNER = """
+import logging, runpy, sys, time, warnings
+start = time.perf_counter()
+warnings.filterwarnings("ignore")
+logging.disable(logging.WARNING)
+sys.path.insert(0, {base!r})
+runpy.run_path({main!r}, run_name="__main__")
+print(f"LOGIN_FORM_S {{time.perf_counter() - start:.4f}}")
+"""
+
+
+def profile_once(main_path):
+    code = RUNNER.format(base=BASE_DIR, main=main_path)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=BASE_DIR,
+                          capture_output=True, text=True, check=True)
+    seconds = float(next(line.split()[1] for line in proc.stdout.splitlines() if line.startswith("LOGIN_FORM_S")))
+    # "import time:  self [us] | cumulative | imported package"; top-level imports have no indent
+    top = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):
+            top[name.strip()] = int(cumulative) / 1e6
+    return seconds, top
+
+
+def profile(main_path, repeats=3, top_n=15):
+    runs = [profile_once(main_path) for _ in range(repeats)]
+    seconds = statistics.median(r[0] for r in runs)
+    tops = runs[-1][1]
+    print(f"{os.path.basename(main_path)}: login form after {seconds:.2f}s "
+          f"(median of {repeats}; {len(tops)} top-level imports, {sum(tops.values()):.2f}s importing)")
+    for name, s in sorted(tops.items(), key=lambda kv: -kv[1])[:top_n]:
+        print(f"  {s:7.3f}s  {name}")
+    return seconds, tops
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--main", default=os.path.join(BASE_DIR, "main.py"))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    profile(os.path.abspath(args.main), args.repeats, args.top)
@@ -0,0 +1,113 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from settings import LIVE_CACHE_TTL, LIVE_CITIES, WAQI_BASE_URL, WAQI_TOKEN
+
+
+# --------------- Live AQI Client ---------------
+class LiveAQIClient:
+    """Pooled, cached client for the WAQI city feed.
+
+    One keep-alive session is shared by every caller. Results are cached per
+    city for ``ttl`` seconds, and concurrent lookups for the same city wait
+    on a single upstream request instead of each making their own.
+    """
+
+    def __init__(self, base_url=WAQI_BASE_URL, token=WAQI_TOKEN, ttl=LIVE_CACHE_TTL,
+                 timeout=(3.05, 10), retries=2, backoff=0.5, max_workers=len(LIVE_CITIES)):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.ttl = ttl
+        self.timeout = timeout
+        self.max_workers = max_workers
+
+        retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._cache = {}      # city -> (expires_at, data)
+        self._inflight = {}   # city -> Future shared by concurrent callers
+        self._pool = None
+
+    def _request(self, city):
+        url = f"{self.base_url}/feed/{city}/"
+        try:
+            response = self.session.get(url, params={"token": self.token}, timeout=self.timeout)
+        except requests.RequestException:
+            return None
+        if response.status_code != 200:
+            return None
+        try:
+            data = response.json()
+        except ValueError:
+            return None
+        if data.get("status") == "ok":
+            return data["data"]
+        return None
+
+    def fetch(self, city):
+        """Return the feed ``data`` dict for a city, or None if the feed is unavailable."""
+        city = city.lower()
+        with self._lock:
+            cached = self._cache.get(city)
+            if cached is not None and cached[0] > time.monotonic():
+                return cached[1]
+            future = self._inflight.get(city)
+            leader = future is None
+            if leader:
+                future = self._inflight[city] = Future()
+
+        if not leader:
+            return future.result()
+
+        data = None
+        try:
+            data = self._request(city)
+        finally:
+            with self._lock:
+                # Failures are not cached so the next click retries upstream
+                if data is not None:
+                    self._cache[city] = (time.monotonic() + self.ttl, data)
+                del self._inflight[city]
+            future.set_result(data)
+        return data
+
+    def fetch_all(self, cities=LIVE_CITIES):
+        """Fetch several cities in parallel. Returns ``{city: data or None}``."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="aqi-live")
+        cities = [c.lower() for c in cities]
+        return dict(zip(cities, self._pool.map(self.fetch, cities)))
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_live_client():
+    """Process-wide client so every Streamlit session shares the pool and cache."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LiveAQIClient()
+    return _client
@@ -0,0 +1,320 @@
+"""Append-only store of live WAQI readings, filled by a background poller.
+
+    python live_store.py run                    # poll LIVE_CITIES every AQI_INGEST_INTERVAL seconds
+    python live_store.py once                   # one poll, then exit
+    python live_store.py query delhi --start 2025-06-01 --end 2025-06-30
+
+Point the poller at a replay server (see waqi_replay.py) with --base-url or
+AQI_WAQI_URL. Readings land in live_readings.db (SQLite, WAL) in the same
+columns as aqi_india.csv, keyed and clustered by (City, ts) so range scans
+for one city read contiguous pages. Note that WAQI's per-pollutant ``iaqi``
+values are US EPA sub-indices rather than concentrations.
+"""
+import argparse
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from aqi_bands import classify
+from live_client import LiveAQIClient, get_live_client
+from settings import FEATURES, INGEST_INTERVAL, LIVE_CITIES, LIVE_DB_PATH, TARGET
+
+log = logging.getLogger("aqi.live")
+
+SCHEMA_VERSION = 1
+# WAQI iaqi keys -> aqi_india.csv columns
+IAQI_COLUMNS = {"pm25": "PM2.5", "pm10": "PM10", "no": "NO", "no2": "NO2", "nox": "NOx", "nh3": "NH3",
+                "co": "CO", "so2": "SO2", "o3": "O3"}
+# Live feed city slugs whose dataset name is not just the title-cased slug
+CITY_NAMES = {"bangalore": "Bengaluru"}
+COLUMNS = ["City", "ts", "Date", "Year"] + FEATURES + [TARGET, "AQI Level", "fetched_at"]
+
+
+def city_name(slug):
+    return CITY_NAMES.get(slug.lower(), slug.title())
+
+
+# --------------- Normalization ---------------
+def normalize(city, data, fetched_at=None):
+    """One feed ``data`` payload -> a row dict in COLUMNS order, or None if it has no usable AQI."""
+    try:
+        aqi = float(data.get("aqi"))
+        ts = pd.Timestamp(data["time"]["s"])
+    except (TypeError, ValueError, KeyError):
+        return None
+    row = {col: None for col in FEATURES}
+    for key, value in data.get("iaqi", {}).items():
+        col = IAQI_COLUMNS.get(key)
+        if col is not None and isinstance(value, dict):
+            row[col] = value.get("v")
+    row.update({
+        "City": city_name(city),
+        "ts": ts.strftime("%Y-%m-%d %H:%M:%S"),
+        "Date": ts.strftime("%Y-%m-%d"),
+        "Year": ts.year,
+        TARGET: aqi,
+        "AQI Level": str(classify([aqi])[0]),
+        "fetched_at": fetched_at or time.time(),
+    })
+    return row
+
+
+# --------------- Store ---------------
+def _migrate(conn):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+    pollutant_cols = ",\n".join(f'"{c}" REAL' for c in FEATURES)
+    with conn:
+        conn.execute(f'''CREATE TABLE IF NOT EXISTS readings (
+                            City TEXT NOT NULL,
+                            ts TEXT NOT NULL,
+                            Date TEXT NOT NULL,
+                            Year INTEGER NOT NULL,
+                            {pollutant_cols},
+                            "{TARGET}" REAL,
+                            "AQI Level" TEXT,
+                            fetched_at REAL,
+                            PRIMARY KEY (City, ts)
+                        ) WITHOUT ROWID''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_readings_date ON readings (Date)")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+class LiveStore:
+    """Pooled SQLite access to the live readings table.
+
+    Same connection handling as auth_store.AuthStore: WAL mode, so the
+    poller's batch inserts never block dashboard range queries.
+    """
+
+    def __init__(self, db_path=LIVE_DB_PATH, pool_size=2):
+        self.db_path = db_path
+        self._pool = queue.LifoQueue()
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+        with self.connection() as conn:
+            _migrate(conn)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def append(self, rows):
+        """Insert a batch of normalized rows in one transaction. Returns how many were new.
+
+        A reading already stored for the same (City, ts) is kept, so re-polling
+        before the feed updates is harmless.
+        """
+        rows = [r for r in rows if r is not None]
+        if not rows:
+            return 0
+        placeholders = ", ".join("?" * len(COLUMNS))
+        names = ", ".join(f'"{c}"' for c in COLUMNS)
+        with self.connection() as conn, conn:
+            before = conn.total_changes
+            conn.executemany(f"INSERT OR IGNORE INTO readings ({names}) VALUES ({placeholders})",
+                             [tuple(r.get(c) for c in COLUMNS) for r in rows])
+            return conn.total_changes - before
+
+    def query(self, city=None, start=None, end=None):
+        """Readings for ``city`` (or all cities) with ``start <= ts <= end``; bounds are date-like or None."""
+        clauses, params = [], []
+        if city is not None:
+            clauses.append("City = ?")
+            params.append(city_name(city))
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(pd.Timestamp(start).strftime("%Y-%m-%d %H:%M:%S"))
+        if end is not None:
+            end = pd.Timestamp(end)
+            if end == end.normalize():
+                # A bare date means the whole day
+                end += pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+            clauses.append("ts <= ?")
+            params.append(end.strftime("%Y-%m-%d %H:%M:%S"))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.connection() as conn:
+            df = pd.read_sql_query(f"SELECT * FROM readings {where} ORDER BY City, ts", conn, params=params)
+        df["ts"] = pd.to_datetime(df["ts"])
+        df["Date"] = pd.to_datetime(df["Date"])
+        return df
+
+    def daily(self, city, start=None, end=None):
+        """Per-day means for one city, in the shape of aqi_india.csv rows."""
+        readings = self.query(city, start, end)
+        if readings.empty:
+            return readings.drop(columns=["ts", "fetched_at"])
+        days = readings.groupby(["City", "Date"], as_index=False)[FEATURES + [TARGET]].mean()
+        days.insert(2, "Year", days["Date"].dt.year)
+        days["AQI Level"] = np.asarray(classify(days[TARGET]).astype(str))
+        return days
+
+    def coverage(self):
+        """(first Date, last Date) across all cities, or None while empty."""
+        # Separate subqueries so each is one seek at an end of the Date index, not a scan
+        with self.connection() as conn:
+            first, last = conn.execute("SELECT (SELECT MIN(Date) FROM readings), "
+                                       "(SELECT MAX(Date) FROM readings)").fetchone()
+        if first is None:
+            return None
+        return pd.Timestamp(first), pd.Timestamp(last)
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+# --------------- Ingestion ---------------
+def poll_once(store, client, cities=LIVE_CITIES):
+    """Fetch every city in parallel and append whatever came back as one batch.
+
+    Returns ``(inserted, missing)``.
+    """
+    fetched_at = time.time()
+    results = client.fetch_all(cities)
+    rows = [normalize(city, data, fetched_at) for city, data in results.items() if data]
+    rows = [r for r in rows if r is not None]
+    # Second value counts cities that were unreachable or reported no usable AQI
+    return store.append(rows), len(results) - len(rows)
+
+
+class Ingestor:
+    """Daemon thread that runs poll_once every ``interval`` seconds until stopped."""
+
+    def __init__(self, store, client, interval=INGEST_INTERVAL, cities=LIVE_CITIES):
+        self.store = store
+        self.client = client
+        self.interval = interval
+        self.cities = cities
+        self.stats = {"polls": 0, "inserted": 0, "failed": 0, "last_poll": None}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="aqi-ingest", daemon=True)
+            self._thread.start()
+        return self
+
+    def _loop(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                inserted, missing = poll_once(self.store, self.client, self.cities)
+                self.stats["inserted"] += inserted
+                self.stats["failed"] += missing
+            except Exception:
+                # Keep polling whatever went wrong; a locked database or bad payload is retried next tick
+                log.exception("Live AQI poll failed")
+                self.stats["failed"] += len(self.cities)
+            self.stats["polls"] += 1
+            self.stats["last_poll"] = time.time()
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+_store = None
+_ingestor = None
+_ingest_lock_file = None
+_lock = threading.Lock()
+
+
+def get_live_store():
+    """Process-wide store, shared by the dashboard and the in-process poller."""
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                _store = LiveStore()
+    return _store
+
+
+def acquire_ingest_lock(db_path=LIVE_DB_PATH):
+    """Take the host-wide poller lock for ``db_path`` without waiting. Returns the open lock file or None.
+
+    The lock is released when the file is closed or the process exits, so a
+    surviving process can take over from one that died.
+    """
+    f = open(db_path + ".ingest.lock", "a")
+    try:
+        try:
+            import fcntl
+        except ImportError:
+            # Windows: lock the file's first byte, which is also released on close
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def start_ingestor():
+    """Start the in-process poller if no other process on this host is polling.
+
+    Returns the running Ingestor, or None while another process holds the
+    lock; callers simply try again on a later rerun.
+    """
+    global _ingestor, _ingest_lock_file
+    with _lock:
+        if _ingestor is None:
+            _ingest_lock_file = acquire_ingest_lock()
+            if _ingest_lock_file is not None:
+                _ingestor = Ingestor(LiveStore(), get_live_client()).start()
+    return _ingestor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("action", choices=["run", "once", "query"])
+    parser.add_argument("city", nargs="?")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--interval", type=float, default=INGEST_INTERVAL)
+    parser.add_argument("--base-url", default=None, help="WAQI base URL, e.g. a waqi_replay.py server")
+    parser.add_argument("--db", default=LIVE_DB_PATH)
+    args = parser.parse_args()
+
+    store = LiveStore(args.db)
+    if args.action == "query":
+        print(store.query(args.city, args.start, args.end).to_string(index=False))
+    else:
+        client = LiveAQIClient(base_url=args.base_url) if args.base_url else get_live_client()
+        if args.action == "once":
+            inserted, missing = poll_once(store, client)
+            print(f"Inserted {inserted} readings ({missing} cities unavailable)")
+        else:
+            lock_file = acquire_ingest_lock(args.db)
+            if lock_file is None:
+                parser.exit(1, f"Another process is already polling into {args.db}\n")
+            print(f"Polling {len(LIVE_CITIES)} cities every {args.interval:.0f}s into {args.db}")
+            ingestor = Ingestor(store, client, args.interval).start()
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                ingestor.stop()
@@ -1,261 +1,366 @@
 import streamlit as st
-import pandas as pd
-import joblib
-import numpy as np
-import plotly.express as px
 import sqlite3
-import hashlib
-import base64
-import requests
-from fpdf import FPDF
-from io import BytesIO
-
-# --------------- Background Image Setup ---------------
-def set_background(image_file):
-    with open(image_file, "rb") as img:
-        encoded = base64.b64encode(img.read()).decode()
-    st.markdown(f"""
-        <style>
-        .stApp {{
-            background-image: url("data:image/png;base64,{encoded}");
-            background-size: cover;
-            background-attachment: fixed;
-            background-repeat: no-repeat;
-            background-position: center;
-            color: black !important;
-            font-weight: bold !important;
-        }}
-        .block-container {{
-            background: rgba(255, 255, 255, 0.85);
-            padding: 2rem;
-            border-radius: 12px;
-            box-shadow: 0 8px 32px 0 rgba(31, 38, 135, 0.37);
-        }}
-        /* Bold and black for all text */
-        h1, h2, h3, h4, h5, h6, p, span, label, div, input, button, .css-1cpxqw2 {{
-            color: black !important;
-            font-weight: bold !important;
-        }}
-        </style>
-        """, unsafe_allow_html=True)
-
-
-set_background("Pollution.png")
-
-# --------------- Auth: Database & Functions ---------------
-def create_connection():
-    return sqlite3.connect("users.db", check_same_thread=False)
-
-def create_user_table():
-    conn = create_connection()
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS userstable (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username TEXT NOT NULL,
-                    password TEXT NOT NULL
-                )''')
-    conn.commit()
-    conn.close()
-
-def add_user(username, password):
-    conn = create_connection()
-    c = conn.cursor()
-    c.execute('INSERT INTO userstable (username, password) VALUES (?, ?)', (username, password))
-    conn.commit()
-    conn.close()
-
-def login_user(username, password):
-    conn = create_connection()
-    c = conn.cursor()
-    try:
-        c.execute('SELECT * FROM userstable WHERE username = ? AND password = ?', (username, password))
-        data = c.fetchone()
-    except sqlite3.OperationalError as e:
-        st.error(f"Database error: {e}")
-        data = None
-    conn.close()
-    return data
-
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-# Ensure table is created
-create_user_table()
-
-# --------------- Login / Signup UI ---------------
-if "logged_in" not in st.session_state:
-    st.session_state.logged_in = False
-
-menu = ["Login", "Signup"]
-choice = st.sidebar.selectbox("Choose Action", menu)
-
-if not st.session_state.logged_in:
-    if choice == "Signup":
-        st.subheader("🔐 Create New Account / புதிதாக கணக்கு துவங்க")
-        new_user = st.text_input("Username")
-        new_pass = st.text_input("Password", type="password")
-        if st.button("Signup"):
-            add_user(new_user, hash_password(new_pass))
-            st.success("✅ Account created successfully. You can now log in.")
-    else:
-        st.subheader("🔑 Login to Your Account / கணக்கினை திறக்க")
-        username = st.text_input("Username")
-        password = st.text_input("Password", type="password")
-        if st.button("Login"):
-            if login_user(username, hash_password(password)):
-                st.session_state.logged_in = True
-                st.session_state.username = username
-                st.success(f"✅ Welcome, {username}!")
+import os
+import time
+
+# Only what the login/signup path needs is imported here. The dashboard's
+# dependencies (pandas, plotly, the model, the data) are imported after
+# authentication, or warmed up in the background while the login form is shown.
+from assets import background_css
+from auth_store import get_auth_store
+from settings import FEATURES, FORECAST_HORIZON, INGEST_IN_DASHBOARD, LIVE_CITIES, WARMUP
+from tracing import observe, rerun, span
+from warmup import start_warmup
+
+# Times every stage of this script run; see tracing.py for the metrics endpoint and profiling switches
+with rerun():
+    # --------------- Background Image Setup ---------------
+    def set_background(image_file):
+        # CSS is built once per process; the image itself is a static, cacheable asset
+        st.markdown(background_css(image_file), unsafe_allow_html=True)
+
+    set_background("Pollution.png")
+
+    # --------------- Auth: Database & Functions ---------------
+    # One pooled, WAL-mode store per process; the schema is migrated on first use
+    auth = get_auth_store()
+
+    # Hashing is slow on purpose and runs on the store's worker pool: a button click only
+    # submits the job, and a fragment polls it, so this script thread never waits on a hash
+    def submit_auth(kind, username, password):
+        submit = auth.signup_async if kind == "signup" else auth.login_async
+        started = time.perf_counter()
+        future = submit(username, password)
+        future.add_done_callback(lambda _: observe("auth", (time.perf_counter() - started) * 1000))
+        st.session_state.auth_job = {"kind": kind, "username": username, "future": future}
+
+    def finish_auth(job):
+        try:
+            result = job["future"].result()
+        except sqlite3.OperationalError as e:
+            st.error(f"Database error: {e}")
+            return
+        if job["kind"] == "signup":
+            if result:
+                st.success("✅ Account created successfully. You can now log in.")
             else:
-                st.error("❌ Invalid Username or Password")
-
-# --------------- AQI Dashboard ---------------
-if st.session_state.logged_in:
-    model = joblib.load("aqi_model.pkl")
-    scaler = joblib.load("aqi_scaler.pkl")
-
-    @st.cache_data
-    def load_data():
-        df = pd.read_csv("aqi_india.csv")
-        df["Date"] = pd.to_datetime(df["Date"])
-        df["Year"] = df["Date"].dt.year
-        return df
-
-    df = load_data()
-
-    st.title("🌍 AQI Prediction & Analysis")
-    st.subheader("Analyze the Air Quality level and download the Live fetch Data")
-
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        selected_year = st.selectbox("Year", sorted(df["Year"].unique()))
-    with col2:
-        selected_date = st.date_input("Date")
-    with col3:
-        selected_city = st.selectbox("City", sorted(df["City"].unique()))
-
-    selected_row = df[(df["Year"] == selected_year) & (df["Date"] == pd.to_datetime(selected_date)) & (df["City"] == selected_city)]
-
-    if not selected_row.empty:
-        row = selected_row.iloc[0]
-        st.subheader("📌 Selected Data Output")
-        output_cols = ["PM2.5", "PM10", "NO2", "CO", "O3"]
-        st.write(row[output_cols])
-
-        features = ['PM2.5', 'PM10', 'NO', 'NO2', 'NOx', 'NH3', 'CO', 'SO2', 'O3', 'Benzene', 'Toluene', 'Xylene']
-        input_data = np.array([row[features]])
-        scaled_input = scaler.transform(input_data)
-        predicted_aqi = model.predict(scaled_input)[0]
-
-        st.subheader("🥧 Pie Chart – Pollutant Distribution")
-        pie_features = ["PM2.5", "PM10", "NO2", "CO", "O3", "SO2", "Benzene", "Toluene", "Xylene"]
-        fig = px.pie(names=row[pie_features].index, values=row[pie_features].values, title="Pollutant Composition")
-        st.plotly_chart(fig)
-
-        st.subheader("🔢 Predicted AQI")
-        st.success(f"AQI Prediction: {predicted_aqi:.2f}")
-
-        st.subheader("📣 Air Quality Notification")
-        if predicted_aqi <= 50:
-            st.success("✅ Good – No worries.  / நல்ல காற்று மற்றும் மாசற்ற சூழல் உள்ளது.")
-        elif predicted_aqi <= 100:
-            st.info("😷 Satisfactory – Minor pollution, use mask if needed. / ஏற்றுக்கொள்ளக் கூடிய சுற்றுச்சூழல்.")
-        elif predicted_aqi <= 200:
-            st.warning("⚠️ Moderate – Harmful for sensitive groups./ சற்று அளவான சுற்றுச்சூழல் அமைப்பு - உடல்நலம் கெடுவதற்கு வாய்ப்புள்ளது.")
-        elif predicted_aqi <= 300:
-            st.error("❌ Poor – Harmful for sensitive and elderly./ சற்று மோசமான சுற்றுச்சூழல் - உடல்நலம் கெடுவதற்கு வாய்ப்புள்ளது.")
-        elif predicted_aqi <= 400:
-            st.error("🚨 Very Poor – Dangerous for health./ மோசமான சுற்றுச்சூழல் - வெளியில் செல்வதைத் தவிர்க்கவும்.")
-        else:
-            st.error("🛑 Severe – Seek medical help. / மிகவும் மோசமான சுற்றுச்சூழல் - மிகவும் உடல்நலம் பாதிக்கப்பட்டு சோர்வடையச் செய்யும்.")
-    else:
-        st.warning("⚠️ No data found for selected input.")
-
-    st.subheader("இந்தப் பிரிவானது கடந்த 2023 january இல் இருந்து 2025 may வரை இருக்கும் தகவல்கள் ஆகும். இது முற்றிலும் பயன்பாட்டாளர்களின் தகவல் பெறுவதற்கான பிரிவாகும். ஜூன் 2025 முதல் live data வை பெறும் படி இணையதளம் வடிவமைக்கப்பட்டுள்ளது. (குறிப்பு: ஜூன் 2025 மற்றும் அதற்கு படியான  தகவல்களை தினமும் பெற இயலாது. அன்றைய நாள் மட்டுமே பெறமுடியும்.) ")
-    st.subheader("This section contains information from January 2023 to May 2025. This is a section entirely for users to access information. The website is designed to provide live data from June 2025 onwards. (Note: Information from June 2025 and onwards cannot be accessed daily. It can only be accessed on that day.)")
-    st.markdown("---")
-    st.subheader("📬 Get AQI Health Advisory by Manual Input / கையேடு உள்ளீடு மூலம் AQI சுகாதார ஆலோசனையைப் பெறுங்கள்.")
-    user_aqi = st.number_input("Enter an AQI value manually / AQI மதிப்பைக் கொடுக்கவும்", min_value=0, max_value=999, step=1)
-    if st.button("Get Advisory"):
-        if user_aqi <= 50:
-            st.success("✅ Good – Air quality is considered satisfactory. / நல்ல காற்று மற்றும் மாசற்ற சூழல் உள்ளது.")
-        elif user_aqi <= 100:
-            st.info("😷 Satisfactory – Acceptable air quality. / ஏற்றுக்கொள்ளக் கூடிய சுற்றுச்சூழல்.")
-        elif user_aqi <= 200:
-            st.warning("⚠️ Moderate – May cause health issues. / சற்று அளவான சுற்றுச்சூழல் அமைப்பு - உடல்நலம் கெடுவதற்கு வாய்ப்புள்ளது.")
-        elif user_aqi <= 300:
-            st.error("❌ Poor – Health effects possible./ சற்று மோசமான சுற்றுச்சூழல் - உடல்நலம் கெடுவதற்கு வாய்ப்புள்ளது.")
-        elif user_aqi <= 400:
-            st.error("🚨 Very Poor – Avoid going outside./ மோசமான சுற்றுச்சூழல் - வெளியில் செல்வதைத் தவிர்க்கவும்.")
+                st.error("❌ Username already exists")
+        elif result:
+            st.session_state.logged_in = True
+            st.session_state.username = job["username"]
+            st.success(f"✅ Welcome, {job['username']}!")
         else:
-            st.error("🛑 Severe – Serious health effects. / மிகவும் மோசமான சுற்றுச்சூழல் - மிகவும் உடல்நலம் பாதிக்கப்பட்டு சோர்வடையச் செய்யும்.")
-
-    # --------------- LIVE AQI SECTION ----------------
-    st.markdown("---")
-    st.subheader("🌐 Real-Time AQI Data via AQICN / AQICN வழியாக நிகழ்நேர AQI தரவு")
-    live_city = st.selectbox("Select a city", ["chennai", "mumbai", "delhi", "kolkata", "ahmedabad", "hyderabad", "jaipur", "bangalore"])
-
-    def fetch_live_aqi(city):
-        url = f"https://api.waqi.info/feed/{city}/?token=78e9eadba5ec45b20b0963b3391f1dc58f7c7330"
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            if data["status"] == "ok":
-                return data["data"]
-        return None
-
-    if st.button("Fetch Live AQI"):
-        live_data = fetch_live_aqi(live_city)
-        if live_data:
-            iaqi = live_data.get("iaqi", {})
-            live_aqi = live_data.get("aqi", "N/A")
-            live_time = live_data.get("time", {}).get("s", "Unknown")
-            pollutants = {k: v['v'] for k, v in iaqi.items() if isinstance(v, dict)}
-
-            st.success(f"✅ Live AQI for {live_city.title()} at {live_time}: {live_aqi}")
-
-            if pollutants:
-                fig2 = px.pie(names=list(pollutants.keys()), values=list(pollutants.values()),
-                             title=f"Live Pollutant Composition for {live_city.title()}")
-                st.plotly_chart(fig2)
-
-            live_aqi_val = int(live_aqi) if str(live_aqi).isdigit() else -1
-            if 0 <= live_aqi_val <= 50:
-                st.success("✅ Good – No worries. / நல்ல காற்று மற்றும் மாசற்ற சூழல் உள்ளது.")
-            elif live_aqi_val <= 100:
-                st.info("😷 Satisfactory – Minor pollution. / ஏற்றுக்கொள்ளக் கூடிய சுற்றுச்சூழல்.")
-            elif live_aqi_val <= 200:
-                st.warning("⚠️ Moderate – Sensitive groups take care. / சற்று அளவான சுற்றுச்சூழல் அமைப்பு - உடல்நலம் கெடுவதற்கு வாய்ப்புள்ளது.")
-            elif live_aqi_val <= 300:
-                st.error("❌ Poor – Harmful for sensitive and elderly. / சற்று மோசமான சுற்றுச்சூழல் - உடல்நலம் கெடுவதற்கு வாய்ப்புள்ளது.")
-            elif live_aqi_val <= 400:
-                st.error("🚨 Very Poor – Dangerous air quality. / மோசமான சுற்றுச்சூழல் - வெளியில் செல்வதைத் தவிர்க்கவும்.")
-            elif live_aqi_val > 400:
-                st.error("🛑 Severe – Avoid going outside.  / மிகவும் மோசமான சுற்றுச்சூழல் - மிகவும் உடல்நலம் பாதிக்கப்பட்டு சோர்வடையச் செய்யும்.")
-
-            st.subheader("📄 Download Live AQI Report / பதிவிறக்கி AQI படிவம்")
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_font("Arial", size=12)
-            pdf.cell(200, 10, txt="Live AQI Report", ln=True, align="C")
-            pdf.cell(200, 10, txt=f"City: {live_city.title()}", ln=True)
-            pdf.cell(200, 10, txt=f"Time: {live_time}", ln=True)
-            pdf.cell(200, 10, txt=f"AQI: {live_aqi}", ln=True)
-
-            pdf.ln(5)
-            pdf.cell(200, 10, txt="Pollutants:", ln=True)
-            for pol, val in pollutants.items():
-                pdf.cell(200, 10, txt=f"{pol.upper()}: {val}", ln=True)
-
-            # ✅ Output PDF to memory and encode
-            pdf_bytes = pdf.output(dest="S").encode("latin-1")
-
-            st.download_button(
-                label="📥 Download AQI Report as PDF",
-                data=pdf_bytes,
-                file_name=f"{live_city}_aqi_report.pdf",
-                mime="application/pdf"
-            )
+            st.error("❌ Invalid Username or Password")
+
+    # --------------- Login / Signup UI ---------------
+    if "logged_in" not in st.session_state:
+        st.session_state.logged_in = False
+
+    menu = ["Login", "Signup"]
+    choice = st.sidebar.selectbox("Choose Action", menu)
+
+    if not st.session_state.logged_in:
+        if choice == "Signup":
+            st.subheader("🔐 Create New Account / புதிதாக கணக்கு துவங்க")
+            new_user = st.text_input("Username")
+            new_pass = st.text_input("Password", type="password")
+            if st.button("Signup"):
+                submit_auth("signup", new_user, new_pass)
         else:
-            st.error("❌ Failed to fetch live AQI data.")
+            st.subheader("🔑 Login to Your Account / கணக்கினை திறக்க")
+            username = st.text_input("Username")
+            password = st.text_input("Password", type="password")
+            if st.button("Login"):
+                submit_auth("login", username, password)
+
+        auth_job = st.session_state.get("auth_job")
+        if auth_job is not None:
+            polling = not auth_job["future"].done()
+
+            # Only the fragment reruns while the hash is computed; once it is done, one full rerun
+            # shows the result, and the dashboard below it after a successful login
+            @st.fragment(run_every=0.2 if polling else None)
+            def auth_status():
+                if not auth_job["future"].done():
+                    st.info("Checking your details...")
+                elif polling:
+                    st.rerun()
+                else:
+                    del st.session_state.auth_job
+                    finish_auth(auth_job)
+
+            auth_status()
+
+    # --------------- AQI Advisories ---------------
+    # One message per CPCB band, Good .. Severe; see aqi_bands.py for the band edges
+    PREDICTED_ADVISORY = (
+        "✅ Good – No worries.  / நல்ல காற்று மற்றும் மாசற்ற சூழல் உள்ளது.",
+        "😷 Satisfactory – Minor pollution, use mask if needed. / ஏற்றுக்கொள்ளக் கூடிய சுற்றுச்சூழல்.",
+        "⚠️ Moderate – Harmful for sensitive groups./ சற்று அளவான சுற்றுச்சூழல் அமைப்பு - உடல்நலம் கெடுவதற்கு வாய்ப்புள்ளது.",
+        "❌ Poor – Harmful for sensitive and elderly./ சற்று மோசமான சுற்றுச்சூழல் - உடல்நலம் கெடுவதற்கு வாய்ப்புள்ளது.",
+        "🚨 Very Poor – Dangerous for health./ மோசமான சுற்றுச்சூழல் - வெளியில் செல்வதைத் தவிர்க்கவும்.",
+        "🛑 Severe – Seek medical help. / மிகவும் மோசமான சுற்றுச்சூழல் - மிகவும் உடல்நலம் பாதிக்கப்பட்டு சோர்வடையச் செய்யும்.",
+    )
+    MANUAL_ADVISORY = (
+        "✅ Good – Air quality is considered satisfactory. / நல்ல காற்று மற்றும் மாசற்ற சூழல் உள்ளது.",
+        "😷 Satisfactory – Acceptable air quality. / ஏற்றுக்கொள்ளக் கூடிய சுற்றுச்சூழல்.",
+        "⚠️ Moderate – May cause health issues. / சற்று அளவான சுற்றுச்சூழல் அமைப்பு - உடல்நலம் கெடுவதற்கு வாய்ப்புள்ளது.",
+        "❌ Poor – Health effects possible./ சற்று மோசமான சுற்றுச்சூழல் - உடல்நலம் கெடுவதற்கு வாய்ப்புள்ளது.",
+        "🚨 Very Poor – Avoid going outside./ மோசமான சுற்றுச்சூழல் - வெளியில் செல்வதைத் தவிர்க்கவும்.",
+        "🛑 Severe – Serious health effects. / மிகவும் மோசமான சுற்றுச்சூழல் - மிகவும் உடல்நலம் பாதிக்கப்பட்டு சோர்வடையச் செய்யும்.",
+    )
+    LIVE_ADVISORY = (
+        "✅ Good – No worries. / நல்ல காற்று மற்றும் மாசற்ற சூழல் உள்ளது.",
+        "😷 Satisfactory – Minor pollution. / ஏற்றுக்கொள்ளக் கூடிய சுற்றுச்சூழல்.",
+        "⚠️ Moderate – Sensitive groups take care. / சற்று அளவான சுற்றுச்சூழல் அமைப்பு - உடல்நலம் கெடுவதற்கு வாய்ப்புள்ளது.",
+        "❌ Poor – Harmful for sensitive and elderly. / சற்று மோசமான சுற்றுச்சூழல் - உடல்நலம் கெடுவதற்கு வாய்ப்புள்ளது.",
+        "🚨 Very Poor – Dangerous air quality. / மோசமான சுற்றுச்சூழல் - வெளியில் செல்வதைத் தவிர்க்கவும்.",
+        "🛑 Severe – Avoid going outside.  / மிகவும் மோசமான சுற்றுச்சூழல் - மிகவும் உடல்நலம் பாதிக்கப்பட்டு சோர்வடையச் செய்யும்.",
+    )
+    BAND_NOTICE = (st.success, st.info, st.warning, st.error, st.error, st.error)
+
+    def show_advisory(aqi, messages):
+        from aqi_bands import band_index
+        band = int(band_index(aqi))
+        if band < 0:
+            st.info("No AQI reading is available for an advisory.")
+            return
+        BAND_NOTICE[band](messages[band])
+
+    # --------------- AQI Dashboard ---------------
+    if not st.session_state.logged_in and WARMUP:
+        # Load the dashboard's modules, data and model while the user is typing
+        start_warmup()
+
+    if st.session_state.logged_in:
+        with span("dashboard_imports"):
+            import pandas as pd
+            import plotly.express as px
+
+            from analytics_cube import extremes, get_cube, level_counts, mean_by
+            from aqi_bands import classify
+            from data_store import load_columns
+            from forecast import MODEL_NAMES, city_forecast, get_forecasts
+            from forecast import status as forecast_status
+            from live_client import get_live_client
+            from live_store import get_live_store, start_ingestor
+            from prediction_table import get_prediction_table, predict_rows
+            from reports import get_report_engine, live_report_pdf
+
+        @st.cache_resource
+        def load_data():
+            # Typed, read-only memory-mapped columns, rebuilt from aqi_india.csv only when the
+            # CSV changes. cache_resource hands every rerun the same frame; cache_data would
+            # unpickle a private copy per call, and the OS already shares the mapped pages
+            # between server processes.
+            return load_columns()
+
+        with span("load_data"):
+            df = load_data()
+        # Live readings recorded after the CSV ends (June 2025 onwards); see live_store.py
+        live_store = get_live_store()
+        if INGEST_IN_DASHBOARD:
+            start_ingestor()
+        live_coverage = live_store.coverage()
+
+        st.title("🌍 AQI Prediction & Analysis")
+        st.subheader("Analyze the Air Quality level and download the Live fetch Data")
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            years = {int(y) for y in df["Year"].unique()}
+            if live_coverage is not None:
+                years |= set(range(live_coverage[0].year, live_coverage[1].year + 1))
+            selected_year = st.selectbox("Year", sorted(years))
+        with col2:
+            selected_date = st.date_input("Date")
+        with col3:
+            selected_city = st.selectbox("City", sorted(df["City"].unique()))
+
+        # Predictions for every dataset row are precomputed; a lookup is a binary search, not a model call
+        with span("predict"):
+            table = get_prediction_table()
+        hit = None
+        with span("filter"):
+            if pd.Timestamp(selected_date).year == selected_year:
+                hit = table.lookup(selected_city, selected_date)
 
+        output_cols = ["PM2.5", "PM10", "NO2", "CO", "O3"]
+        live_day = None
+        if hit is None and live_coverage is not None and pd.Timestamp(selected_date).year == selected_year:
+            with span("live_history"):
+                live_day = live_store.daily(selected_city, selected_date, selected_date)
+
+        if hit is not None:
+            row, predicted_aqi = hit
+            st.subheader("📌 Selected Data Output")
+            st.write(row[output_cols])
+
+            st.subheader("🥧 Pie Chart – Pollutant Distribution")
+            pie_features = ["PM2.5", "PM10", "NO2", "CO", "O3", "SO2", "Benzene", "Toluene", "Xylene"]
+            with span("chart"):
+                fig = px.pie(names=row[pie_features].index, values=row[pie_features].values, title="Pollutant Composition")
+                st.plotly_chart(fig)
+
+            st.subheader("🔢 Predicted AQI")
+            st.success(f"AQI Prediction: {predicted_aqi:.2f}")
+
+            st.subheader("📣 Air Quality Notification")
+            show_advisory(predicted_aqi, PREDICTED_ADVISORY)
+        elif live_day is not None and not live_day.empty:
+            day = live_day.iloc[0]
+            st.subheader("📌 Recorded Live Readings (daily mean of WAQI sub-indices)")
+            st.write(day[output_cols])
+            st.success(f"Recorded AQI: {day['AQI']:.0f}")
+            show_advisory(day["AQI"], LIVE_ADVISORY)
+            with span("live_history"):
+                history = live_store.daily(selected_city, pd.Timestamp(selected_date) - pd.Timedelta(days=30), selected_date)
+            st.line_chart(history.set_index("Date")["AQI"].rename("Recorded AQI"))
+        else:
+            st.warning("⚠️ No data found for selected input.")
+
+        # --------------- City Summary (from the pre-aggregated cube) ---------------
+        st.subheader(f"📊 {selected_city} Summary – {selected_year}")
+        with span("summary"):
+            cube = get_cube()
+            monthly = mean_by(cube, "Month", city=selected_city, year=selected_year)
+            if not monthly.empty:
+                low, high = extremes(cube, city=selected_city, year=selected_year)
+                c1, c2, c3 = st.columns(3)
+                c1.metric("Average AQI", f"{mean_by(cube, 'City', city=selected_city, year=selected_year)['AQI'].iloc[0]:.1f}")
+                c2.metric("Lowest AQI", f"{low:.0f}")
+                c3.metric("Highest AQI", f"{high:.0f}")
+                st.bar_chart(monthly.rename(columns={"AQI": "Average AQI"}))
+                st.write(level_counts(cube, city=selected_city, year=selected_year).rename("Days"))
+
+        # --------------- Forecast (per-city models, see forecast.py) ---------------
+        st.subheader(f"🔮 {selected_city} AQI Forecast")
+        with span("forecast"):
+            # Read from aqi_forecast.pkl; new days are picked up by a background `forecast.py update`
+            forecasts = get_forecasts()
+        if forecast_status["state"] == "running":
+            st.caption("Updating the forecasts with newly recorded days in the background.")
+        result = None if forecasts is None else city_forecast(forecasts, selected_city, FORECAST_HORIZON)
+        if result is None:
+            st.info("No forecast is available for this city yet.")
+        else:
+            base_day = forecasts["last_day"]
+            forecast_days = st.slider(f"Days after {base_day:%d %b %Y}", 1, FORECAST_HORIZON, min(7, FORECAST_HORIZON),
+                                      key="forecast_days")
+            recent, ahead = result
+            ahead = ahead.iloc[:forecast_days]
+            if base_day < pd.Timestamp.today().normalize():
+                st.warning(f"The last recorded AQI is from {base_day:%d %b %Y}, so this forecast starts the day "
+                           "after it and may cover days that have already passed.")
+            st.caption(f"Model: {MODEL_NAMES[forecasts['method']]}, one per city.")
+            st.line_chart(pd.concat([recent, ahead], axis=1))
+            st.dataframe(pd.DataFrame({"Forecast AQI": ahead.round(1), "AQI Level": classify(ahead).astype(str)},
+                                      index=ahead.index.strftime("%d %b %Y")))
+
+        st.subheader("இந்தப் பிரிவானது கடந்த 2023 january இல் இருந்து 2025 may வரை இருக்கும் தகவல்கள் ஆகும். இது முற்றிலும் பயன்பாட்டாளர்களின் தகவல் பெறுவதற்கான பிரிவாகும். ஜூன் 2025 முதல் live data வை பெறும் படி இணையதளம் வடிவமைக்கப்பட்டுள்ளது. (குறிப்பு: ஜூன் 2025 மற்றும் அதற்கு படியான  தகவல்களை தினமும் பெற இயலாது. அன்றைய நாள் மட்டுமே பெறமுடியும்.) ")
+        st.subheader("This section contains information from January 2023 to May 2025. This is a section entirely for users to access information. The website is designed to provide live data from June 2025 onwards. (Note: Information from June 2025 and onwards cannot be accessed daily. It can only be accessed on that day.)")
+        if live_coverage is not None:
+            first, last = live_coverage
+            st.info(f"Recorded live readings are available from {first:%d %b %Y} to {last:%d %b %Y}.")
+        st.markdown("---")
+        st.subheader("📬 Get AQI Health Advisory by Manual Input / கையேடு உள்ளீடு மூலம் AQI சுகாதார ஆலோசனையைப் பெறுங்கள்.")
+        user_aqi = st.number_input("Enter an AQI value manually / AQI மதிப்பைக் கொடுக்கவும்", min_value=0, max_value=999, step=1)
+        if st.button("Get Advisory"):
+            show_advisory(user_aqi, MANUAL_ADVISORY)
+
+        # Readings that are not a dataset row have no precomputed prediction; these go to the model
+        st.subheader("🧪 Predict AQI from Your Own Readings")
+        with st.form("manual_prediction"):
+            reading_cols = st.columns(4)
+            readings = [reading_cols[i % 4].number_input(f, min_value=0.0, step=1.0, key=f"reading_{f}")
+                        for i, f in enumerate(FEATURES)]
+            if st.form_submit_button("Predict AQI"):
+                with span("predict_manual"):
+                    manual_aqi = float(predict_rows(readings)[0])
+                st.success(f"AQI Prediction: {manual_aqi:.2f}")
+                show_advisory(manual_aqi, PREDICTED_ADVISORY)
+
+        # --------------- LIVE AQI SECTION ----------------
+        st.markdown("---")
+        st.subheader("🌐 Real-Time AQI Data via AQICN / AQICN வழியாக நிகழ்நேர AQI தரவு")
+        live_city = st.selectbox("Select a city", LIVE_CITIES)
+
+        if st.button("Fetch Live AQI"):
+            # Shared pooled client: cached per city and coalesced across sessions
+            with span("live_fetch"):
+                live_data = get_live_client().fetch(live_city)
+            if live_data:
+                iaqi = live_data.get("iaqi", {})
+                live_aqi = live_data.get("aqi", "N/A")
+                live_time = live_data.get("time", {}).get("s", "Unknown")
+                pollutants = {k: v['v'] for k, v in iaqi.items() if isinstance(v, dict)}
+
+                st.success(f"✅ Live AQI for {live_city.title()} at {live_time}: {live_aqi}")
+
+                if pollutants:
+                    with span("chart"):
+                        fig2 = px.pie(names=list(pollutants.keys()), values=list(pollutants.values()),
+                                     title=f"Live Pollutant Composition for {live_city.title()}")
+                        st.plotly_chart(fig2)
+
+                live_aqi_val = int(live_aqi) if str(live_aqi).isdigit() else -1
+                if live_aqi_val >= 0:
+                    show_advisory(live_aqi_val, LIVE_ADVISORY)
+
+                st.subheader("📄 Download Live AQI Report / பதிவிறக்கி AQI படிவம்")
+                with span("pdf"):
+                    pdf_bytes = live_report_pdf(live_city, live_time, live_aqi, pollutants)
+
+                st.download_button(
+                    label="📥 Download AQI Report as PDF",
+                    data=pdf_bytes,
+                    file_name=f"{live_city}_aqi_report.pdf",
+                    mime="application/pdf"
+                )
+            else:
+                st.error("❌ Failed to fetch live AQI data.")
+
+        # --------------- BULK REPORTS ----------------
+        st.markdown("---")
+        st.subheader("📑 City Reports for a Date Range")
+        report_cities = st.multiselect("Cities", sorted(df["City"].unique()), default=[selected_city])
+        first_day = df["Date"].min().date()
+        last_day = (live_coverage[1] if live_coverage is not None else df["Date"].max()).date()
+        report_range = st.date_input("Report period", (first_day, last_day), min_value=first_day, max_value=last_day)
+
+        if st.button("Build Report") and report_cities and len(report_range) == 2:
+            # Built in a child process; unchanged city reports come straight from the cache. The job
+            # lives in session state and is checked on each rerun, so this script never waits on it.
+            job = {"cities": list(report_cities), "done": 0, "total": len(report_cities)}
+            with span("report"):
+                job["future"] = get_report_engine().submit(
+                    report_cities, *report_range, progress=lambda done, total: job.update(done=done, total=total))
+            st.session_state.report_job = job
+
+        report_job = st.session_state.get("report_job")
+        if report_job is not None:
+            polling = not report_job["future"].done()
+
+            # Only the fragment reruns while the job is going; once it finishes, one full rerun stops the polling
+            @st.fragment(run_every=1.0 if polling else None)
+            def report_status():
+                future = report_job["future"]
+                if not future.done():
+                    st.progress(report_job["done"] / report_job["total"],
+                                text=f"{report_job['done']}/{report_job['total']} cities")
+                elif polling:
+                    st.rerun()
+                elif future.exception() is not None:
+                    st.error(f"❌ {future.exception()}")
+                else:
+                    report_path = future.result()
+                    single = len(report_job["cities"]) == 1
+                    with open(report_path, "rb") as report_file:
+                        st.download_button(
+                            label="📥 Download Report",
+                            data=report_file,
+                            file_name=os.path.basename(report_path) if single else "aqi_city_reports.zip",
+                            mime="application/pdf" if single else "application/zip"
+                        )
+
+            report_status()
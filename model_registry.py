@@ -0,0 +1,173 @@
+import json
+import os
+import threading
+import time
+
+import joblib
+
+from settings import FOREST_PATH, MODEL_BACKEND, MODEL_MANIFEST_PATH, MODEL_PATH, MODEL_RELOAD_INTERVAL, SCALER_PATH
+
+
+# --------------- Memory Helpers ---------------
+def _rss_bytes():
+    # Resident set size of this process, or None where /proc is not available
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _file_stamp(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+# --------------- Model Registry ---------------
+class ModelRegistry:
+    """Loads the AQI model and scaler once per process and shares them.
+
+    When ``train.py --publish`` has written a manifest, only the manifest is
+    watched and the files it names are loaded; otherwise the top-level
+    pickles are. A daemon thread polls for changes and loads the new pair
+    off to the side before swapping it in, so callers never see a
+    half-loaded model or a model/scaler mismatch.
+    """
+
+    def __init__(self, model_path=MODEL_PATH, scaler_path=SCALER_PATH,
+                 reload_interval=MODEL_RELOAD_INTERVAL, compact_path=None, manifest_path=MODEL_MANIFEST_PATH):
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        # When set, serve the exported flat-array forest instead of the sklearn pickles
+        self.compact_path = compact_path
+        self.manifest_path = manifest_path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._current = None  # (model, scaler, stamps)
+        self._stats = {}
+        self._version = 0
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def paths(self):
+        if self.manifest_path and os.path.exists(self.manifest_path):
+            return (self.manifest_path,)
+        if self.compact_path:
+            return (self.compact_path,)
+        return (self.model_path, self.scaler_path)
+
+    def _stamps(self):
+        return tuple(_file_stamp(p) for p in self.paths())
+
+    def _artifacts(self):
+        # (model, scaler, forest) paths to load right now
+        if not (self.manifest_path and os.path.exists(self.manifest_path)):
+            return self.model_path, self.scaler_path, self.compact_path
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+        base = os.path.dirname(os.path.abspath(self.manifest_path))
+        model_path, scaler_path, forest_path = (
+            os.path.join(base, manifest[key]) if manifest.get(key) else None
+            for key in ("model", "scaler", "forest"))
+        if self.compact_path and forest_path is None:
+            raise ValueError(f"Published version {manifest['version']} has no compact forest export")
+        return model_path, scaler_path, forest_path
+
+    def _load(self):
+        # Stamp before reading the manifest: if it is replaced in between, the next poll reloads
+        stamps = self._stamps()
+        model_path, scaler_path, forest_path = self._artifacts()
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        if self.compact_path:
+            from forest_engine import load_forest
+            model, scaler = load_forest(forest_path).as_model_pair()
+        else:
+            scaler = joblib.load(scaler_path)
+            model = joblib.load(model_path)
+        elapsed = time.perf_counter() - start
+        rss_after = _rss_bytes()
+
+        stats = {
+            "backend": "compact" if self.compact_path else "sklearn",
+            "load_seconds": elapsed,
+            "file_bytes": sum(os.path.getsize(p) for p in
+                              ((forest_path,) if self.compact_path else (model_path, scaler_path))),
+            "rss_delta_bytes": (rss_after - rss_before) if rss_before is not None and rss_after is not None else None,
+            "loaded_at": time.time(),
+        }
+        return (model, scaler, stamps), stats
+
+    def _swap(self, current, stats):
+        with self._lock:
+            self._current = current
+            self._version += 1
+            self._stats = dict(stats, version=self._version)
+
+    def snapshot(self):
+        """``(model, scaler, stamps)``: the current pair and the file stamps it was loaded from."""
+        current = self._current
+        if current is None:
+            with self._load_lock:
+                if self._current is None:
+                    self._swap(*self._load())
+                    self._start_watcher()
+            current = self._current
+        return current
+
+    def get(self):
+        """Return the current ``(model, scaler)`` pair, loading it on first use."""
+        current = self.snapshot()
+        return current[0], current[1]
+
+    def reload_if_changed(self):
+        """Reload the artifacts if the manifest or the files changed on disk. Returns True on reload."""
+        current = self._current
+        try:
+            stamps = self._stamps()
+        except OSError:
+            # Mid-write or temporarily removed; keep serving the old pair
+            return False
+        if current is not None and stamps == current[2]:
+            return False
+        with self._load_lock:
+            try:
+                loaded, stats = self._load()
+            except Exception:
+                # A partially written pickle fails to load; try again next poll
+                return False
+            self._swap(loaded, stats)
+        return True
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _start_watcher(self):
+        if self.reload_interval <= 0 or self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, name="aqi-model-watcher", daemon=True)
+        self._watcher.start()
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_interval):
+            self.reload_if_changed()
+
+    def close(self):
+        self._stop.set()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Process-wide registry shared by every Streamlit session."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry(compact_path=FOREST_PATH if MODEL_BACKEND == "compact" else None)
+    return _registry
@@ -0,0 +1,426 @@
+"""Local HTTP prediction service with request micro-batching.
+
+    python predict_service.py --port 8600
+    AQI_PREDICT_URL=http://127.0.0.1:8600 streamlit run main.py
+
+POST /predict takes the 12 pollutant features as
+  - JSON: one object {"PM2.5": .., ...}, a list of such objects, or
+    {"rows": [[12 values], ...]} in FEATURES order
+  - CSV (Content-Type: text/csv) with a header row naming the features
+and answers {"predictions": [...], "version": N}, or CSV when the request
+sends "Accept: text/csv". GET /health reports the model version and queue.
+
+Requests that arrive within a few milliseconds of each other are answered by
+one scaler.transform + model.predict call on a small worker pool. When more
+rows are queued than the service is configured to hold, it answers 503 with
+Retry-After instead of queueing without bound.
+"""
+import argparse
+import asyncio
+import io
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from model_registry import get_registry
+from settings import (FEATURES, PREDICT_BATCH_WINDOW_MS, PREDICT_MAX_BATCH, PREDICT_MAX_PENDING,
+                      PREDICT_PORT, PREDICT_URL, PREDICT_VERSION_TTL, PREDICT_WORKERS)
+
+MAX_BODY_BYTES = 64 * 1024 * 1024
+# Bodies above this are parsed off the event loop so one bulk upload does not stall small requests
+INLINE_PARSE_BYTES = 64 * 1024
+
+
+class Overloaded(Exception):
+    pass
+
+
+# --------------- Payloads ---------------
+def parse_payload(body, content_type=""):
+    """Request body -> float64 array of shape (rows, len(FEATURES))."""
+    if "csv" in content_type:
+        frame = pd.read_csv(io.BytesIO(body))
+    else:
+        data = json.loads(body)
+        if isinstance(data, dict) and "rows" in data:
+            data = data["rows"]
+        if isinstance(data, dict):
+            data = [data]
+        if not isinstance(data, list):
+            raise ValueError("expected an object, a list of objects or {\"rows\": [...]}")
+        if data and isinstance(data[0], (list, tuple)):
+            frame = pd.DataFrame(data, columns=FEATURES)
+        else:
+            frame = pd.DataFrame(data)
+    missing = [c for c in FEATURES if c not in frame]
+    if missing:
+        raise ValueError(f"missing features: {', '.join(missing)}")
+    X = frame[FEATURES].to_numpy(np.float64)
+    # NaN (null or an empty cell) is a missing reading the forest can route; the scaler rejects infinities
+    if np.isinf(X).any():
+        raise ValueError("feature values must be finite")
+    return X
+
+
+def format_predictions(preds, version, as_csv=False):
+    if as_csv:
+        return ("Predicted AQI\n" + "\n".join(map(str, preds.tolist())) + "\n").encode(), "text/csv"
+    return json.dumps({"predictions": preds.tolist(), "version": version}).encode(), "application/json"
+
+
+# --------------- Micro-batching ---------------
+class MicroBatcher:
+    """Gathers concurrent submissions into one model call.
+
+    The first queued request opens a ``window_ms`` window; everything queued
+    before it closes (up to ``max_batch`` rows) is predicted together. At
+    most ``workers`` batches run at once, and while they do, new requests
+    keep queueing and go out as the next, larger batch.
+    """
+
+    def __init__(self, predict, window_ms=PREDICT_BATCH_WINDOW_MS, max_batch=PREDICT_MAX_BATCH,
+                 workers=PREDICT_WORKERS, max_pending=PREDICT_MAX_PENDING):
+        self.predict = predict
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.stats = {"requests": 0, "rows": 0, "batches": 0, "rejected": 0}
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aqi-predict")
+        self._queue = None
+        self._slots = None
+        self._task = None
+
+    def start(self):
+        # Must run on the event loop that will call submit()
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, X):
+        if self.pending + len(X) > self.max_pending:
+            self.stats["rejected"] += 1
+            raise Overloaded()
+        self.pending += len(X)
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((X, future))
+        try:
+            return await future
+        finally:
+            self.pending -= len(X)
+
+    def _take_ready(self, batch, rows):
+        while rows < self.max_batch and not self._queue.empty():
+            item = self._queue.get_nowait()
+            batch.append(item)
+            rows += len(item[0])
+        return rows
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            rows = len(batch[0][0])
+            deadline = loop.time() + self.window
+            while rows < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                rows += len(item[0])
+            await self._slots.acquire()
+            # Whatever queued while waiting for a free worker rides along
+            self._take_ready(batch, rows)
+            loop.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        try:
+            X = np.concatenate([x for x, _ in batch])
+            preds = await asyncio.get_running_loop().run_in_executor(self._pool, self.predict, X)
+        except Exception as e:
+            if len(batch) > 1:
+                # Don't let one request's rows fail the others it was batched with
+                await self._predict_each(batch)
+            elif not batch[0][1].done():
+                batch[0][1].set_exception(e)
+        else:
+            self.stats["requests"] += len(batch)
+            self.stats["rows"] += len(X)
+            self.stats["batches"] += 1
+            offsets = np.cumsum([len(x) for x, _ in batch])[:-1]
+            for (_, future), part in zip(batch, np.split(preds, offsets)):
+                if not future.done():
+                    future.set_result(part)
+        finally:
+            self._slots.release()
+
+    async def _predict_each(self, batch):
+        loop = asyncio.get_running_loop()
+        for x, future in batch:
+            try:
+                part = await loop.run_in_executor(self._pool, self.predict, x)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(part)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        self._pool.shutdown(wait=False)
+
+
+# --------------- HTTP Service ---------------
+class PredictService:
+    def __init__(self, registry=None, **batch_options):
+        self.registry = registry or get_registry()
+        self.batcher = MicroBatcher(self._predict, **batch_options)
+        self.server = None
+        self.port = None
+        self._connections = set()
+
+    def _predict(self, X):
+        model, scaler = self.registry.get()
+        return np.asarray(model.predict(scaler.transform(pd.DataFrame(X, columns=FEATURES))), dtype=np.float64)
+
+    async def start(self, host="127.0.0.1", port=PREDICT_PORT):
+        self.batcher.start()
+        self.server = await asyncio.start_server(self._handle, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        self.server.close()
+        # Idle keep-alive connections would otherwise outlive the server
+        for writer in list(self._connections):
+            writer.close()
+        await self.server.wait_closed()
+        await self.batcher.close()
+
+    async def _handle(self, reader, writer):
+        self._connections.add(writer)
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                status, payload, ctype, extra = await self._route(method, target, headers, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                _write_response(writer, status, payload, ctype, extra, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _route(self, method, target, headers, body):
+        url = urlsplit(target)
+        if url.path == "/health" and method == "GET":
+            health = {"status": "ok", "version": self.registry.stats().get("version"),
+                      "pending_rows": self.batcher.pending, **self.batcher.stats}
+            return 200, json.dumps(health).encode(), "application/json", {}
+        if url.path != "/predict":
+            return 404, _error("not found"), "application/json", {}
+        if method != "POST":
+            return 405, _error("use POST"), "application/json", {}
+        if body is None:
+            return 413, _error(f"body over {MAX_BODY_BYTES} bytes"), "application/json", {}
+
+        content_type = headers.get("content-type", "")
+        try:
+            if len(body) > INLINE_PARSE_BYTES:
+                X = await asyncio.get_running_loop().run_in_executor(None, parse_payload, body, content_type)
+            else:
+                X = parse_payload(body, content_type)
+        except (ValueError, pd.errors.ParserError) as e:
+            return 400, _error(str(e)), "application/json", {}
+        if len(X) > self.batcher.max_pending:
+            return 413, _error(f"at most {self.batcher.max_pending} rows per request"), "application/json", {}
+        if not len(X):
+            return 400, _error("no rows"), "application/json", {}
+
+        try:
+            preds = await self.batcher.submit(X)
+        except Overloaded:
+            return 503, _error("busy, retry shortly"), "application/json", {"Retry-After": "1"}
+        except Exception as e:
+            return 500, _error(str(e)), "application/json", {}
+        as_csv = "text/csv" in headers.get("accept", "") or parse_qs(url.query).get("format") == ["csv"]
+        payload, ctype = format_predictions(preds, self.registry.stats().get("version"), as_csv)
+        return 200, payload, ctype, {}
+
+
+def _error(message):
+    return json.dumps({"error": message}).encode()
+
+
+async def _read_request(reader):
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    method, target, _ = line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        raw = await reader.readline()
+        if raw in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = raw.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", "0"))
+    if length > MAX_BODY_BYTES:
+        # Answer 413 without reading the body, then drop the connection
+        headers["connection"] = "close"
+        return method, target, headers, None
+    body = await reader.readexactly(length) if length else b""
+    return method, target, headers, body
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+def _write_response(writer, status, payload, ctype, extra, keep_alive):
+    head = [f"HTTP/1.1 {status} {_REASONS[status]}", f"Content-Type: {ctype}",
+            f"Content-Length: {len(payload)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    head += [f"{k}: {v}" for k, v in extra.items()]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
+
+
+def start_service(host="127.0.0.1", port=0, **options):
+    """Run the service on a background event loop. The result has ``.url`` and ``.stop()``."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="aqi-predict-service", daemon=True).start()
+    service = asyncio.run_coroutine_threadsafe(PredictService(**options).start(host, port), loop).result()
+    service.url = f"http://{host}:{service.port}"
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(service.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+    service.stop = stop
+    return service
+
+
+# --------------- Client ---------------
+class _Passthrough:
+    # The service scales inputs itself; this keeps the (model, scaler) call shape
+    def transform(self, X):
+        return X
+
+
+class PredictClient:
+    """Client for a running service that can stand in for the local (model, scaler) pair."""
+
+    def __init__(self, url=PREDICT_URL, timeout=(1, 30), chunk_rows=PREDICT_MAX_BATCH, retries=3, backoff=0.2,
+                 version_ttl=PREDICT_VERSION_TTL):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.chunk_rows = chunk_rows
+        self.version_ttl = version_ttl
+        self._version_lock = threading.Lock()
+        self._version = None  # (expires_at, version or None, error or None)
+        # Predictions are idempotent, so a 503 from backpressure is retried after Retry-After;
+        # a refused connection fails at once so callers fall back to the local model quickly
+        retry = Retry(total=retries, connect=0, backoff_factor=backoff, status_forcelist=(503,),
+                      allowed_methods=("GET", "POST"), respect_retry_after_header=True)
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=16, max_retries=retry))
+
+    def predict(self, X):
+        frame = X[FEATURES] if isinstance(X, pd.DataFrame) else pd.DataFrame(np.atleast_2d(X), columns=FEATURES)
+        parts = []
+        for start in range(0, len(frame), self.chunk_rows):
+            chunk = frame.iloc[start:start + self.chunk_rows]
+            if len(chunk) == 1:
+                body, ctype = json.dumps({"rows": chunk.to_numpy(np.float64).tolist()}), "application/json"
+            else:
+                body, ctype = chunk.to_csv(index=False), "text/csv"
+            response = self.session.post(f"{self.url}/predict", data=body.encode(),
+                                         headers={"Content-Type": ctype}, timeout=self.timeout)
+            response.raise_for_status()
+            parts.append(np.asarray(response.json()["predictions"], dtype=np.float64))
+        return np.concatenate(parts) if parts else np.empty(0)
+
+    def version(self):
+        response = self.session.get(f"{self.url}/health", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["version"]
+
+    def cached_version(self):
+        """``version()``, reused for ``version_ttl`` seconds; a failed check is reused too.
+
+        Callers ask on every dashboard rerun, so only one of them per TTL
+        pays for the round trip, or for the connect timeout if the service is down.
+        """
+        with self._version_lock:
+            cached = self._version
+            if cached is None or cached[0] <= time.monotonic():
+                try:
+                    cached = (time.monotonic() + self.version_ttl, self.version(), None)
+                except requests.RequestException as e:
+                    cached = (time.monotonic() + self.version_ttl, None, e)
+                self._version = cached
+        if cached[2] is not None:
+            raise cached[2].with_traceback(None)
+        return cached[1]
+
+    def as_model_pair(self):
+        return self, _Passthrough()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_predict_client():
+    """Process-wide client for AQI_PREDICT_URL, or None when the service is not configured."""
+    global _client
+    if not PREDICT_URL:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PredictClient(PREDICT_URL)
+    return _client
+
+
+async def _serve(host, port, options):
+    service = await PredictService(**options).start(host, port)
+    print(f"Serving predictions on http://{host}:{service.port}")
+    async with service.server:
+        await service.server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PREDICT_PORT)
+    parser.add_argument("--window-ms", type=float, default=PREDICT_BATCH_WINDOW_MS)
+    parser.add_argument("--max-batch", type=int, default=PREDICT_MAX_BATCH)
+    parser.add_argument("--workers", type=int, default=PREDICT_WORKERS)
+    parser.add_argument("--max-pending", type=int, default=PREDICT_MAX_PENDING)
+    args = parser.parse_args()
+    options = {"window_ms": args.window_ms, "max_batch": args.max_batch,
+               "workers": args.workers, "max_pending": args.max_pending}
+    try:
+        asyncio.run(_serve(args.host, args.port, options))
+    except KeyboardInterrupt:
+        pass
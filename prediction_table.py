@@ -0,0 +1,198 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import requests
+
+from data_store import load_columns, resolve_dir, swap_dir
+from model_registry import get_registry
+from predict_service import get_predict_client
+from settings import BASE_DIR, DATA_PATH, FEATURES
+
+TABLE_DIR = os.path.join(BASE_DIR, "aqi_predictions_store")
+TABLE_FORMAT = 2
+
+
+def _day(value):
+    # Normalise anything date-like to an integer day number for the index key
+    return int(np.datetime64(pd.Timestamp(value).normalize(), "D").astype(np.int64))
+
+
+def _stamps(*paths):
+    return tuple((os.stat(p).st_mtime_ns, os.stat(p).st_size) for p in paths)
+
+
+def _row_keys(codes, days):
+    # City code in the high 32 bits, day number (offset to stay positive) in the low 32
+    return (np.asarray(codes, dtype=np.int64) << 32) | (np.asarray(days, dtype=np.int64) + 2 ** 31)
+
+
+# --------------- Batch Prediction Table ---------------
+class PredictionTable:
+    """Predicted AQI for every dataset row, keyed by (City, Date).
+
+    ``keys`` holds one (City, Date) key per row in sorted order and
+    ``order`` the matching row positions in ``frame``, so a lookup is a
+    binary search and never touches the model. Saved tables are .npy
+    files that ``load`` memory-maps read-only next to the columnar store,
+    so every dashboard process on the host shares one copy of them.
+    """
+
+    def __init__(self, frame, stamps=None, keys=None, order=None):
+        self.frame = frame
+        self.stamps = stamps
+        city = frame["City"]
+        if not isinstance(city.dtype, pd.CategoricalDtype):
+            city = city.astype("category")
+        self.city_codes = {c: i for i, c in enumerate(city.cat.categories)}
+        if keys is None:
+            days = frame["Date"].values.astype("datetime64[D]").astype(np.int64)
+            keys = _row_keys(city.cat.codes.to_numpy(), days)
+            order = np.argsort(keys, kind="stable").astype(np.int32)
+            keys = keys[order]
+        self.keys = keys
+        self.order = order
+
+    @classmethod
+    def build(cls, model, scaler, data_path=DATA_PATH, stamps=None):
+        df = load_columns(csv_path=data_path)
+        # One vectorized pass over every row instead of one predict per rerun
+        df["Predicted AQI"] = model.predict(scaler.transform(df[FEATURES])).astype(np.float32)
+        return cls(df, stamps)
+
+    def lookup(self, city, date):
+        """Return ``(row, predicted_aqi)`` for a dataset row, or None if it is not in the table."""
+        code = self.city_codes.get(city)
+        if code is None:
+            return None
+        key = _row_keys(code, _day(date))
+        pos = int(np.searchsorted(self.keys, key))
+        if pos == len(self.keys) or self.keys[pos] != key:
+            return None
+        row = self.frame.iloc[int(self.order[pos])]
+        return row, float(row["Predicted AQI"])
+
+    def save(self, path=TABLE_DIR):
+        tmp_dir = f"{path}.tmp-{os.getpid()}"
+        version_dir = f"{path}.v{time.time_ns()}-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, "keys.npy"), np.asarray(self.keys))
+        np.save(os.path.join(tmp_dir, "order.npy"), np.asarray(self.order))
+        np.save(os.path.join(tmp_dir, "predicted.npy"), self.frame["Predicted AQI"].to_numpy(np.float32))
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump({"format": TABLE_FORMAT, "stamps": self.stamps}, f)
+        # Same versioned directory and symlink swap as data_store.convert: the table path
+        # always names a complete table, even while another process is saving one
+        os.rename(tmp_dir, version_dir)
+        swap_dir(version_dir, path)
+
+    @classmethod
+    def load(cls, path=TABLE_DIR, data_path=DATA_PATH):
+        # Resolve once so every file comes from the same version even if it is swapped meanwhile
+        path = resolve_dir(path)
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("format") != TABLE_FORMAT:
+            raise ValueError(f"unsupported prediction table format in {path}")
+        frame = load_columns(csv_path=data_path)
+        frame["Predicted AQI"] = np.load(os.path.join(path, "predicted.npy"), mmap_mode="r")
+        stamps = tuple(tuple(s) for s in meta["stamps"]) if meta["stamps"] is not None else None
+        return cls(frame, stamps,
+                   keys=np.load(os.path.join(path, "keys.npy"), mmap_mode="r"),
+                   order=np.load(os.path.join(path, "order.npy"), mmap_mode="r"))
+
+
+def _model_pair():
+    """(model, scaler) from the prediction service when AQI_PREDICT_URL is set and up, else the local registry."""
+    client = get_predict_client()
+    if client is not None:
+        try:
+            client.cached_version()
+            return client.as_model_pair()
+        except requests.RequestException:
+            # Service down or unreachable: load the model here instead
+            pass
+    return get_registry().get()
+
+
+def predict_rows(values):
+    """Model predictions for readings that are not dataset rows, e.g. the dashboard's manual input."""
+    model, scaler = _model_pair()
+    X = pd.DataFrame(np.atleast_2d(np.asarray(values, dtype=float)), columns=FEATURES)
+    try:
+        return model.predict(scaler.transform(X))
+    except requests.RequestException:
+        model, scaler = get_registry().get()
+        return model.predict(scaler.transform(X))
+
+
+# --------------- Process-wide Table ---------------
+_table = None
+_table_lock = threading.Lock()
+
+
+def _source_stamps():
+    """What the table's predictions depend on, read without loading the model: the CSV plus
+    the prediction service's model version, or the stamps of the files the registry loads."""
+    client = get_predict_client()
+    if client is not None:
+        try:
+            return (("service", str(client.cached_version())),) + _stamps(DATA_PATH)
+        except requests.RequestException:
+            pass
+    return _stamps(DATA_PATH, *get_registry().paths())
+
+
+def _build_table(stamps):
+    if stamps[0][0] == "service":
+        try:
+            return PredictionTable.build(*get_predict_client().as_model_pair(), stamps=stamps)
+        except requests.RequestException:
+            pass
+    # The files may have changed since the watcher last looked; stamp the table with what was loaded
+    registry = get_registry()
+    registry.reload_if_changed()
+    model, scaler, model_stamps = registry.snapshot()
+    return PredictionTable.build(model, scaler, stamps=_stamps(DATA_PATH) + model_stamps)
+
+
+def get_prediction_table():
+    """Shared table, rebuilt when the CSV or the model changes.
+
+    Processes that find an up-to-date table on disk memory-map it and never
+    load the model at all.
+    """
+    global _table
+    stamps = _source_stamps()
+    if _table is not None and _table.stamps == stamps:
+        return _table
+    with _table_lock:
+        if _table is not None and _table.stamps == stamps:
+            return _table
+        table = None
+        if os.path.exists(TABLE_DIR):
+            try:
+                table = PredictionTable.load()
+            except Exception:
+                table = None
+            if table is not None and table.stamps != stamps:
+                table = None
+        if table is None:
+            table = _build_table(stamps)
+            try:
+                table.save()
+            except OSError:
+                pass
+        _table = table
+    return _table
+
+
+if __name__ == "__main__":
+    table = _build_table(_source_stamps())
+    table.save()
+    print(f"Wrote {len(table.frame)} predictions to {TABLE_DIR}")
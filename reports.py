@@ -0,0 +1,333 @@
+"""PDF reports: the single live-reading report and bulk city/date-range reports.
+
+    python reports.py Delhi Mumbai --start 2024-01-01 --end 2024-12-31
+
+Bulk reports render one PDF per city on a process pool, writing each
+straight to reports/ rather than returning it as bytes. A multi-city
+request is bundled into a ZIP that is written one city file at a time.
+Each city PDF is cached under a hash of its input rows, so a report whose
+data has not changed is never rendered twice; the cache is trimmed by age
+and size after every build.
+
+The dashboard never forks its own server process: a job runs this script
+as a child process, whose pool starts its workers with spawn.
+"""
+import argparse
+import hashlib
+import inspect
+import multiprocessing
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import pandas as pd
+from fpdf import FPDF
+
+from settings import (BASE_DIR, LIVE_DB_PATH, REPORT_CACHE_MAX_AGE_DAYS, REPORT_CACHE_MAX_MB, REPORT_WORKERS,
+                      TARGET)
+
+REPORTS_DIR = os.path.join(BASE_DIR, "reports")
+TABLE_COLUMNS = ["Date", "PM2.5", "PM10", "NO2", "CO", "O3", TARGET, "AQI Level", "Source"]
+TABLE_WIDTHS = [26, 18, 18, 18, 16, 18, 18, 30, 24]
+
+
+# --------------- Layout ---------------
+class AQIReport(FPDF):
+    """FPDF with the report title, fonts and page furniture set up once.
+
+    ``header``/``footer`` run on every page break, so long tables repeat
+    their column heading without the caller tracking page positions.
+    """
+
+    def __init__(self, title, subtitle=""):
+        super().__init__()
+        self.title_text = title
+        self.subtitle = subtitle
+        self.table_columns = None
+        self.alias_nb_pages()
+        self.set_auto_page_break(auto=True, margin=15)
+        self.add_page()
+
+    def header(self):
+        self.set_font("Arial", "B", 14)
+        self.cell(0, 10, self.title_text, ln=True, align="C")
+        if self.subtitle:
+            self.set_font("Arial", size=10)
+            self.cell(0, 6, self.subtitle, ln=True, align="C")
+        self.ln(2)
+        if self.table_columns is not None:
+            self._table_heading()
+        self.set_font("Arial", size=12)
+
+    def footer(self):
+        self.set_y(-12)
+        self.set_font("Arial", "I", 8)
+        self.cell(0, 8, f"Page {self.page_no()}/{{nb}}", align="C")
+
+    def line_item(self, text):
+        self.cell(200, 10, txt=text, ln=True)
+
+    def _table_heading(self):
+        self.set_font("Arial", "B", 9)
+        for name, width in self.table_columns:
+            self.cell(width, 7, name, border=1, align="C")
+        self.ln()
+
+    def table(self, columns, widths, rows):
+        """Rows of already formatted strings, repeating the heading on each new page."""
+        self.table_columns = list(zip(columns, widths))
+        self._table_heading()
+        self.set_font("Arial", size=9)
+        for row in rows:
+            for value, width in zip(row, widths):
+                self.cell(width, 6, value, border=1, align="C")
+            self.ln()
+        self.table_columns = None
+
+
+# --------------- Live AQI Report ---------------
+def live_report_pdf(city, live_time, live_aqi, pollutants):
+    """Single-page PDF for one live reading. Returns the document as bytes."""
+    pdf = AQIReport("Live AQI Report")
+    pdf.line_item(f"City: {city.title()}")
+    pdf.line_item(f"Time: {live_time}")
+    pdf.line_item(f"AQI: {live_aqi}")
+
+    pdf.ln(5)
+    pdf.line_item("Pollutants:")
+    for pol, val in pollutants.items():
+        pdf.line_item(f"{pol.upper()}: {val}")
+
+    return pdf.output(dest="S").encode("latin-1")
+
+
+# --------------- City Reports ---------------
+def city_rows(city, start, end, live_db=LIVE_DB_PATH):
+    """Daily rows for one city: aqi_india.csv for its span, recorded live readings after it."""
+    from data_store import load_columns
+
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    df = load_columns(TABLE_COLUMNS[:-1] + ["City"])
+    rows = df[(df["City"] == city) & (df["Date"] >= start) & (df["Date"] <= end)].drop(columns="City")
+    rows = rows.assign(Source="dataset")
+    if os.path.exists(live_db) and end > df["Date"].max():
+        from live_store import LiveStore
+        store = LiveStore(live_db, pool_size=1)
+        live = store.daily(city, max(start, df["Date"].max() + pd.Timedelta(days=1)), end)
+        store.close()
+        if not live.empty:
+            rows = pd.concat([rows, live[TABLE_COLUMNS[:-1]].assign(Source="live")], ignore_index=True)
+    return rows.sort_values("Date", kind="mergesort").reset_index(drop=True)
+
+
+def rows_digest(city, start, end, rows):
+    """Cache key for a city report: its inputs plus the layout code, like app.py's chart cache."""
+    h = hashlib.sha256(f"{city}|{pd.Timestamp(start):%Y-%m-%d}|{pd.Timestamp(end):%Y-%m-%d}".encode())
+    h.update(inspect.getsource(AQIReport).encode())
+    h.update(inspect.getsource(render_city_report).encode())
+    h.update(pd.util.hash_pandas_object(rows, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def render_city_report(city, start, end, rows, path):
+    """Write one city's report to ``path``. Runs in a worker process."""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    pdf = AQIReport(f"AQI Report - {city}", f"{start:%d %b %Y} to {end:%d %b %Y}")
+    if rows.empty:
+        pdf.line_item("No readings in this period.")
+    else:
+        aqi = rows[TARGET]
+        pdf.line_item(f"Days with data: {len(rows)}")
+        pdf.line_item(f"Average AQI: {aqi.mean():.1f}   Lowest: {aqi.min():.0f}   Highest: {aqi.max():.0f}")
+        for level, days in rows["AQI Level"].value_counts().items():
+            pdf.line_item(f"{level}: {days} days")
+        pdf.ln(4)
+        formatted = zip(rows["Date"].dt.strftime("%Y-%m-%d"),
+                        *(rows[c].map(lambda v: "" if pd.isna(v) else f"{v:.1f}") for c in TABLE_COLUMNS[1:7]),
+                        rows["AQI Level"].astype(str), rows["Source"])
+        pdf.table(TABLE_COLUMNS, TABLE_WIDTHS, formatted)
+    tmp = path + ".tmp"
+    pdf.output(tmp, "F")
+    os.replace(tmp, path)
+    return path
+
+
+# --------------- Cache ---------------
+def prune_cache(out_dir=REPORTS_DIR, max_bytes=REPORT_CACHE_MAX_MB * 2**20,
+                max_age=REPORT_CACHE_MAX_AGE_DAYS * 86400, keep=()):
+    """Delete cached reports unused for ``max_age`` seconds, then the least recently used
+    until the directory fits in ``max_bytes``. Paths in ``keep`` are never removed."""
+    keep = {os.path.abspath(p) for p in keep}
+    entries = []
+    now = time.time()
+    for entry in os.scandir(out_dir):
+        path = os.path.abspath(entry.path)
+        if not entry.is_file() or path in keep:
+            continue
+        try:
+            st = entry.stat()
+        except FileNotFoundError:
+            continue
+        if entry.name.endswith(".tmp") and now - st.st_mtime <= max_age:
+            # Another build is still writing it
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries) + sum(os.path.getsize(p) for p in keep if os.path.exists(p))
+    removed = 0
+    for mtime, size, path in sorted(entries):
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+
+def _touch(path):
+    # A cache hit counts as a use, so pruning evicts the least recently used reports first
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+
+# --------------- Engine ---------------
+PROGRESS_LINE = re.compile(r"^(\d+)/(\d+) cities$")
+
+
+class ReportEngine:
+    """Builds city reports off the caller's thread.
+
+    ``build`` renders on a spawn-context process pool in this process.
+    ``submit`` is for the dashboard: it runs ``python reports.py`` as a
+    child process and returns a Future right away; the optional
+    ``progress`` callback receives ``(done, total)`` as each city finishes.
+    """
+
+    def __init__(self, out_dir=REPORTS_DIR, workers=REPORT_WORKERS):
+        self.out_dir = out_dir
+        self.workers = workers
+        self._pool = None
+        self._coordinator = ThreadPoolExecutor(max_workers=1, thread_name_prefix="aqi-reports")
+        self._lock = threading.Lock()
+
+    def _process_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def submit(self, cities, start, end, progress=None):
+        return self._coordinator.submit(self._run_child, cities, start, end, progress)
+
+    def _run_child(self, cities, start, end, progress=None):
+        # Streamlit runs the page as __main__, so a pool started in the server would have its
+        # workers re-run the page (spawn) or inherit its threads' locks (fork). A fresh
+        # interpreter running this file has neither problem.
+        cmd = [sys.executable, os.path.abspath(__file__), *cities,
+               "--start", f"{pd.Timestamp(start):%Y-%m-%d}", "--end", f"{pd.Timestamp(end):%Y-%m-%d}",
+               "--workers", str(self.workers), "--out-dir", self.out_dir]
+        child = subprocess.Popen(cmd, cwd=BASE_DIR, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        # stderr is drained alongside stdout: a child that fills one pipe while this reads the
+        # other would otherwise block both processes
+        errors = []
+        drain = threading.Thread(target=lambda: errors.append(child.stderr.read()), daemon=True)
+        drain.start()
+        path = None
+        for line in child.stdout:
+            line = line.strip()
+            match = PROGRESS_LINE.match(line)
+            if match and progress:
+                progress(int(match.group(1)), int(match.group(2)))
+            elif line:
+                path = line
+        drain.join()
+        stderr = errors[0] if errors else ""
+        if child.wait() != 0 or path is None:
+            raise RuntimeError(f"Report build failed: {stderr.strip().splitlines()[-1] if stderr.strip() else cmd}")
+        return path
+
+    def build(self, cities, start, end, progress=None):
+        """Path of the finished PDF (one city) or ZIP (several)."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        paths, pending = {}, {}
+        for city in cities:
+            rows = city_rows(city, start, end)
+            path = os.path.join(self.out_dir, f"{city}_{rows_digest(city, start, end, rows)}.pdf")
+            paths[city] = path
+            if os.path.exists(path):
+                _touch(path)
+            else:
+                pending[city] = (rows, path)
+
+        done = len(cities) - len(pending)
+        if progress:
+            progress(done, len(cities))
+        if pending:
+            pool = self._process_pool()
+            futures = [pool.submit(render_city_report, city, start, end, rows, path)
+                       for city, (rows, path) in pending.items()]
+            for future in as_completed(futures):
+                future.result()
+                done += 1
+                if progress:
+                    progress(done, len(cities))
+
+        if len(cities) == 1:
+            result = paths[cities[0]]
+        else:
+            result = os.path.join(self.out_dir, "bundle_" + hashlib.sha256(
+                "|".join(os.path.basename(paths[c]) for c in cities).encode()).hexdigest()[:16] + ".zip")
+            if os.path.exists(result):
+                _touch(result)
+            else:
+                # ZipFile.write copies each PDF in chunks, so the bundle never sits in memory
+                with zipfile.ZipFile(result + ".tmp", "w", zipfile.ZIP_DEFLATED) as zf:
+                    for city in cities:
+                        zf.write(paths[city], arcname=f"{city}_aqi_report.pdf")
+                os.replace(result + ".tmp", result)
+        prune_cache(self.out_dir, keep=[result, *paths.values()])
+        return result
+
+    def close(self):
+        self._coordinator.shutdown(wait=False)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_report_engine():
+    """Process-wide engine so every Streamlit session shares one job queue and cache."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = ReportEngine()
+    return _engine
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cities", nargs="+")
+    parser.add_argument("--start", required=True)
+    parser.add_argument("--end", required=True)
+    parser.add_argument("--workers", type=int, default=REPORT_WORKERS)
+    parser.add_argument("--out-dir", default=REPORTS_DIR)
+    args = parser.parse_args()
+    engine = ReportEngine(out_dir=args.out_dir, workers=args.workers)
+    path = engine.build(args.cities, args.start, args.end,
+                        progress=lambda done, total: print(f"{done}/{total} cities", flush=True))
+    print(path)
+    engine.close()
@@ -0,0 +1,86 @@
+import os
+
+# --------------- Paths ---------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MODEL_PATH = os.path.join(BASE_DIR, "aqi_model.pkl")
+SCALER_PATH = os.path.join(BASE_DIR, "aqi_scaler.pkl")
+DATA_PATH = os.path.join(BASE_DIR, "aqi_india.csv")
+
+# --------------- Model Inputs ---------------
+FEATURES = ['PM2.5', 'PM10', 'NO', 'NO2', 'NOx', 'NH3', 'CO', 'SO2', 'O3', 'Benzene', 'Toluene', 'Xylene']
+TARGET = 'AQI'
+
+# "sklearn" unpickles aqi_model.pkl; "compact" memory-maps aqi_forest.bin (see forest_engine.py)
+MODEL_BACKEND = os.environ.get("AQI_MODEL_BACKEND", "sklearn")
+FOREST_PATH = os.path.join(BASE_DIR, "aqi_forest.bin")
+# Written last by `train.py --publish`: names the models/<version>/ files the registry serves
+MODEL_MANIFEST_PATH = os.path.join(BASE_DIR, "aqi_model.json")
+
+# How often (seconds) the model registry checks the pickles on disk for changes
+MODEL_RELOAD_INTERVAL = float(os.environ.get("AQI_MODEL_RELOAD_INTERVAL", "5"))
+
+# --------------- Live Feed (WAQI / AQICN) ---------------
+LIVE_CITIES = ["chennai", "mumbai", "delhi", "kolkata", "ahmedabad", "hyderabad", "jaipur", "bangalore"]
+WAQI_BASE_URL = os.environ.get("AQI_WAQI_URL", "https://api.waqi.info")
+WAQI_TOKEN = os.environ.get("AQI_WAQI_TOKEN", "78e9eadba5ec45b20b0963b3391f1dc58f7c7330")
+# Readings on the feed update hourly, so a few minutes of reuse is safe
+LIVE_CACHE_TTL = float(os.environ.get("AQI_LIVE_CACHE_TTL", "300"))
+
+# --------------- Auth Store ---------------
+USERS_DB_PATH = os.path.join(BASE_DIR, "users.db")
+AUTH_POOL_SIZE = int(os.environ.get("AQI_AUTH_POOL_SIZE", "4"))
+# Passwords are salted PBKDF2-SHA256; each hash is deliberately slow (~0.3 s at the default),
+# so at most AUTH_HASH_WORKERS run at once, on threads off the Streamlit script thread
+AUTH_HASH_ITERATIONS = int(os.environ.get("AQI_AUTH_HASH_ITERATIONS", "600000"))
+AUTH_HASH_WORKERS = int(os.environ.get("AQI_AUTH_HASH_WORKERS", "2"))
+
+# --------------- Prediction Service ---------------
+# When set (e.g. http://127.0.0.1:8600), the dashboard asks predict_service.py
+# for predictions instead of loading the model itself, falling back to the
+# local model if the service is unreachable.
+PREDICT_URL = os.environ.get("AQI_PREDICT_URL", "")
+PREDICT_PORT = int(os.environ.get("AQI_PREDICT_PORT", "8600"))
+# Requests arriving within this window are answered by one model call
+PREDICT_BATCH_WINDOW_MS = float(os.environ.get("AQI_PREDICT_BATCH_WINDOW_MS", "5"))
+PREDICT_MAX_BATCH = int(os.environ.get("AQI_PREDICT_MAX_BATCH", "4096"))
+PREDICT_WORKERS = int(os.environ.get("AQI_PREDICT_WORKERS", "2"))
+# Rows queued beyond this are refused with 503 instead of piling up
+PREDICT_MAX_PENDING = int(os.environ.get("AQI_PREDICT_MAX_PENDING", "20000"))
+# Seconds the dashboard trusts the service's model version (or its being down) before asking again
+PREDICT_VERSION_TTL = float(os.environ.get("AQI_PREDICT_VERSION_TTL", "30"))
+
+# --------------- Live Readings Store ---------------
+LIVE_DB_PATH = os.environ.get("AQI_LIVE_DB", os.path.join(BASE_DIR, "live_readings.db"))
+# Seconds between polls of LIVE_CITIES; the feed updates hourly
+INGEST_INTERVAL = float(os.environ.get("AQI_INGEST_INTERVAL", "1800"))
+# Run the poller inside the Streamlit process instead of as `python live_store.py run`;
+# a file lock next to the database keeps it to one polling process per host
+INGEST_IN_DASHBOARD = os.environ.get("AQI_INGEST_IN_DASHBOARD", "") == "1"
+
+# --------------- Startup ---------------
+# Import the dashboard's modules and load its data and model on a background
+# thread while the login form is shown (set AQI_WARMUP=0 to load on first login instead)
+WARMUP = os.environ.get("AQI_WARMUP", "1") != "0"
+
+# --------------- Forecasting ---------------
+# Days ahead that forecast.py predicts for every city
+FORECAST_HORIZON = int(os.environ.get("AQI_FORECAST_HORIZON", "14"))
+# A city's model is retrained once this many new days have arrived; forecasts refresh on every new day
+FORECAST_RETRAIN_DAYS = int(os.environ.get("AQI_FORECAST_RETRAIN_DAYS", "7"))
+# Each city's model: "mean" (its trailing 30-day mean) or "forest" (a random forest on lag and
+# window features). The AQI series in aqi_india.csv have no day-to-day signal and the forest's
+# 14-day MAE is worse than the mean's; `python forecast.py check` compares them
+FORECAST_MODEL = os.environ.get("AQI_FORECAST_MODEL", "mean")
+# Worker processes that retrain city models during `python forecast.py update`
+FORECAST_WORKERS = int(os.environ.get("AQI_FORECAST_WORKERS", str(max(1, min(4, os.cpu_count() or 1)))))
+# Seconds between the dashboard's checks for new days; an update runs as a separate process
+FORECAST_CHECK_INTERVAL = float(os.environ.get("AQI_FORECAST_CHECK_INTERVAL", "300"))
+
+# --------------- Reports ---------------
+# Worker processes that render city PDFs for one report job
+REPORT_WORKERS = int(os.environ.get("AQI_REPORT_WORKERS", str(max(1, min(4, os.cpu_count() or 1)))))
+# reports/ is trimmed after every build: files unused for this many days go first, then the
+# least recently used until the directory fits the size cap
+REPORT_CACHE_MAX_MB = float(os.environ.get("AQI_REPORT_CACHE_MAX_MB", "500"))
+REPORT_CACHE_MAX_AGE_DAYS = float(os.environ.get("AQI_REPORT_CACHE_MAX_AGE_DAYS", "30"))
@@ -0,0 +1,281 @@
+"""Out-of-core training and aggregation for inputs too big to load at once.
+
+    python streaming.py train --data big.csv                  # sampled forest, versioned like train.py
+    python streaming.py train --model sgd --epochs 5 --publish
+    python streaming.py cube --data big.csv                   # City x Year x Month cube, chunk by chunk
+    python streaming.py check                                 # parity with the in-memory path
+
+Rows are read in fixed-size chunks, from the columnar store when it is up
+to date and from the CSV otherwise. The scaler is fitted with partial_fit.
+The regressor is either an SGDRegressor updated chunk by chunk or a
+RandomForest fitted on a fixed-size uniform sample of the training rows.
+Aggregates are per-chunk cubes merged as they arrive. Peak memory follows
+the chunk and sample sizes, not the number of rows.
+"""
+import argparse
+import os
+import resource
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import SGDRegressor
+from sklearn.preprocessing import StandardScaler
+
+from analytics_cube import KEYS, MEASURES, build_cube, merge_cubes
+from data_store import FLOAT_COLUMNS, columns_frame, is_fresh, load_columns, open_columns
+from settings import DATA_PATH, FEATURES, MODEL_BACKEND, TARGET
+from train import MODELS_DIR, evaluate, fit_forest, holdout_mask, publish, save_version
+
+CHUNK_ROWS = 250_000
+SAMPLE_ROWS = 500_000
+READ_COLUMNS = ["City", "Date", "AQI Level"] + FEATURES + [TARGET]
+
+
+# --------------- Chunked Reading ---------------
+def iter_chunks(data_path=DATA_PATH, columns=READ_COLUMNS, chunk_rows=CHUNK_ROWS):
+    """Yield DataFrames of at most ``chunk_rows`` rows with ``columns``.
+
+    An up-to-date columnar store is mapped once and read slice by slice
+    (building one would load the whole CSV, so a stale store is never
+    rebuilt here); otherwise the CSV is parsed ``chunk_rows`` lines at a
+    time. Mapped pages already read are clean page cache the OS can drop,
+    so only the current chunk is held in this process's own memory.
+    """
+    if is_fresh(data_path):
+        arrays, meta = open_columns(columns, csv_path=data_path)
+        for start in range(0, meta["rows"], chunk_rows):
+            yield columns_frame(arrays, meta, slice(start, start + chunk_rows), copy=True)
+        return
+    reader = pd.read_csv(data_path, usecols=columns, chunksize=chunk_rows,
+                         dtype={c: np.float32 for c in FLOAT_COLUMNS if c in columns})
+    for chunk in reader:
+        if "Date" in chunk:
+            chunk["Date"] = pd.to_datetime(chunk["Date"], format="%m/%d/%Y")
+        yield chunk[columns]
+
+
+def _split(chunk):
+    # holdout_mask hashes (City, Date) per row, so each chunk splits exactly as the full frame would
+    test = holdout_mask(chunk)
+    return chunk[~test], chunk[test]
+
+
+# --------------- Aggregates ---------------
+def stream_cube(data_path=DATA_PATH, chunk_rows=CHUNK_ROWS):
+    """Same cells as analytics_cube.build_cube over the whole file, folded in one chunk at a time."""
+    cube = None
+    for chunk in iter_chunks(data_path, ["City", "Date", "AQI Level"] + MEASURES, chunk_rows):
+        part = build_cube(chunk)
+        cube = part if cube is None else merge_cubes(cube, part)
+    return cube
+
+
+# --------------- Training ---------------
+class Reservoir:
+    """Uniform sample of at most ``size`` rows from a stream of chunks.
+
+    Every row gets a random priority and the ``size`` lowest are kept, so
+    the sample does not depend on how the stream was chunked beyond the
+    order rows arrive in.
+    """
+
+    def __init__(self, size, seed=42):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.X = np.empty((0, len(FEATURES)))
+        self.y = np.empty(0)
+        self.keys = np.empty(0)
+        self.seen = 0
+
+    def add(self, X, y):
+        self.seen += len(X)
+        X = np.concatenate([self.X, np.asarray(X, dtype=np.float64)])
+        y = np.concatenate([self.y, np.asarray(y, dtype=np.float64)])
+        keys = np.concatenate([self.keys, self.rng.random(len(X) - len(self.X))])
+        if len(keys) > self.size:
+            keep = np.argpartition(keys, self.size)[:self.size]
+            keep.sort()
+            X, y, keys = X[keep], y[keep], keys[keep]
+        self.X, self.y, self.keys = X, y, keys
+
+
+def fit_scaler(data_path=DATA_PATH, chunk_rows=CHUNK_ROWS, sample_rows=0, seed=42):
+    """One pass: StandardScaler.partial_fit over the training rows, plus an optional Reservoir."""
+    scaler = StandardScaler()
+    reservoir = Reservoir(sample_rows, seed) if sample_rows else None
+    for chunk in iter_chunks(data_path, ["City", "Date"] + FEATURES + [TARGET], chunk_rows):
+        train, _ = _split(chunk)
+        if train.empty:
+            continue
+        scaler.partial_fit(train[FEATURES])
+        if reservoir is not None:
+            reservoir.add(train[FEATURES], train[TARGET])
+    return scaler, reservoir
+
+
+def fit_sgd(scaler, data_path=DATA_PATH, chunk_rows=CHUNK_ROWS, epochs=5, seed=42):
+    """Linear model trained by partial_fit, one shuffled chunk at a time, ``epochs`` passes."""
+    model = SGDRegressor(random_state=seed)
+    rng = np.random.default_rng(seed)
+    for _ in range(epochs):
+        for chunk in iter_chunks(data_path, ["City", "Date"] + FEATURES + [TARGET], chunk_rows):
+            train, _ = _split(chunk)
+            if train.empty:
+                continue
+            order = rng.permutation(len(train))
+            X = scaler.transform(train[FEATURES])[order]
+            model.partial_fit(X, train[TARGET].to_numpy(np.float64)[order])
+    return model
+
+
+def fit_sampled_forest(scaler, reservoir, n_estimators=100, n_jobs=-1, random_state=42):
+    """RandomForest on the reservoir sample, in the streamed scaler's space."""
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=random_state, n_jobs=n_jobs)
+    model.fit(scaler.transform(pd.DataFrame(reservoir.X, columns=FEATURES)), reservoir.y)
+    return model
+
+
+def evaluate_stream(model, scaler, data_path=DATA_PATH, chunk_rows=CHUNK_ROWS):
+    """train.evaluate's metrics over the held-out rows, from running sums; NaN if there are none."""
+    n = sse = sae = sum_y = sum_y2 = 0.0
+    for chunk in iter_chunks(data_path, ["City", "Date"] + FEATURES + [TARGET], chunk_rows):
+        _, test = _split(chunk)
+        if test.empty:
+            continue
+        y = test[TARGET].to_numpy(np.float64)
+        err = y - model.predict(scaler.transform(test[FEATURES]))
+        n += len(y)
+        sse += float(err @ err)
+        sae += float(np.abs(err).sum())
+        sum_y += float(y.sum())
+        sum_y2 += float(y @ y)
+    if n == 0:
+        return {"mse": float("nan"), "mae": float("nan"), "r2": float("nan")}, 0
+    total = sum_y2 - sum_y * sum_y / n
+    return {"mse": sse / n, "mae": sae / n, "r2": 1 - sse / total if total > 0 else float("nan")}, int(n)
+
+
+def train_streaming(data_path=DATA_PATH, model_kind="forest", chunk_rows=CHUNK_ROWS, sample_rows=SAMPLE_ROWS,
+                    epochs=5, n_estimators=100, n_jobs=-1, random_state=42, models_dir=MODELS_DIR):
+    """train.train for inputs that do not fit in memory. Writes a version the registry can load."""
+    if model_kind not in ("forest", "sgd"):
+        raise ValueError(f"unknown model kind {model_kind!r}")
+    if chunk_rows <= 0:
+        raise ValueError("chunk_rows must be positive")
+    if model_kind == "forest" and sample_rows <= 0:
+        raise ValueError("a streamed forest needs a positive sample_rows")
+    if model_kind == "sgd" and epochs <= 0:
+        raise ValueError("SGD needs at least one epoch")
+    start = time.perf_counter()
+    scaler, reservoir = fit_scaler(data_path, chunk_rows, sample_rows if model_kind == "forest" else 0,
+                                   random_state)
+    if model_kind == "forest":
+        model = fit_sampled_forest(scaler, reservoir, n_estimators, n_jobs, random_state)
+    else:
+        model = fit_sgd(scaler, data_path, chunk_rows, epochs, random_state)
+    fit_seconds = time.perf_counter() - start
+
+    metrics, test_rows = evaluate_stream(model, scaler, data_path, chunk_rows)
+    train_rows = int(scaler.n_samples_seen_ if np.ndim(scaler.n_samples_seen_) == 0 else scaler.n_samples_seen_[0])
+    info = dict(metrics, model=model_kind, streaming=True, chunk_rows=chunk_rows, train_rows=train_rows,
+                test_rows=test_rows, fit_seconds=fit_seconds, parent=None, data_rows=train_rows + test_rows,
+                features=FEATURES)
+    if model_kind == "forest":
+        info.update(n_estimators=model.n_estimators, sample_rows=len(reservoir.y))
+    else:
+        info.update(epochs=epochs)
+    os.makedirs(models_dir, exist_ok=True)
+    return save_version(model, scaler, info, models_dir), info
+
+
+# --------------- Parity ---------------
+def _peak_rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def check(data_path=DATA_PATH, chunk_rows=1000):
+    """Streamed scaler, models and cube against the in-memory ones on the same file."""
+    df = load_columns(csv_path=data_path)
+    test = holdout_mask(df)
+    X_train, y_train = df.loc[~test, FEATURES], df.loc[~test, TARGET]
+    X_test, y_test = df.loc[test, FEATURES], df.loc[test, TARGET]
+    print(f"{len(df):,} rows in chunks of {chunk_rows:,}")
+
+    model, scaler = fit_forest(X_train, y_train)
+    baseline, _ = evaluate(model, scaler, X_test, y_test)
+
+    s_scaler, reservoir = fit_scaler(data_path, chunk_rows, sample_rows=len(X_train) // 2)
+    print(f"scaler: max |mean diff| {np.abs(s_scaler.mean_ - scaler.mean_).max():.2e}, "
+          f"max |scale diff| {np.abs(s_scaler.scale_ - scaler.scale_).max():.2e}")
+
+    streamed_metrics, _ = evaluate_stream(model, scaler, data_path, chunk_rows)
+    print(f"{'in-memory forest':<26} r2 {baseline['r2']:.4f}  mae {baseline['mae']:7.2f}  "
+          f"(streamed evaluation: r2 {streamed_metrics['r2']:.4f}, mae {streamed_metrics['mae']:.2f})")
+    forest = fit_sampled_forest(s_scaler, reservoir)
+    sampled, _ = evaluate_stream(forest, s_scaler, data_path, chunk_rows)
+    print(f"{'forest on 50% sample':<26} r2 {sampled['r2']:.4f}  mae {sampled['mae']:7.2f}")
+    # AQI is close to the worst pollutant, so a linear fit is judged against in-memory least squares
+    from sklearn.linear_model import LinearRegression
+    ols = LinearRegression().fit(scaler.transform(X_train), y_train)
+    ols_metrics, _ = evaluate(ols, scaler, X_test, y_test)
+    sgd = fit_sgd(s_scaler, data_path, chunk_rows)
+    linear, _ = evaluate_stream(sgd, s_scaler, data_path, chunk_rows)
+    print(f"{'in-memory least squares':<26} r2 {ols_metrics['r2']:.4f}  mae {ols_metrics['mae']:7.2f}")
+    print(f"{'SGD, chunk partial_fit':<26} r2 {linear['r2']:.4f}  mae {linear['mae']:7.2f}")
+
+    expected = build_cube(df).sort_values(KEYS, ignore_index=True)
+    streamed = stream_cube(data_path, chunk_rows).sort_values(KEYS, ignore_index=True)
+    same_cells = expected[KEYS].astype(str).equals(streamed[KEYS].astype(str))
+    values = [c for c in expected.columns if c not in KEYS]
+    worst = (np.abs(expected[values].to_numpy(np.float64) - streamed[values].to_numpy(np.float64)).max()
+             if same_cells else float("nan"))
+    print(f"cube: {len(streamed)} cells, same cells {same_cells}, max |value diff| {worst:.2e}")
+
+
+def peak_memory(data_path, chunk_rows=CHUNK_ROWS):
+    """Peak RSS of a streamed cube build, to compare across input sizes."""
+    start = time.perf_counter()
+    cube = stream_cube(data_path, chunk_rows)
+    print(f"{os.path.basename(data_path)}: {int(cube['count'].sum()):,} rows, {len(cube)} cells in "
+          f"{time.perf_counter() - start:.1f}s, peak RSS {_peak_rss_mib():.0f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("action", choices=["train", "cube", "check"])
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--chunk-rows", type=int, default=None)
+    parser.add_argument("--model", choices=["forest", "sgd"], default="forest")
+    parser.add_argument("--sample-rows", type=int, default=SAMPLE_ROWS, help="forest training sample size")
+    parser.add_argument("--epochs", type=int, default=5, help="SGD passes over the data")
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--publish", action="store_true", help="install the new version for the dashboard")
+    args = parser.parse_args()
+    if args.chunk_rows is not None and args.chunk_rows <= 0:
+        parser.error("--chunk-rows must be positive")
+    if args.action == "train" and args.model == "forest" and args.sample_rows <= 0:
+        parser.error("--sample-rows must be positive for --model forest")
+    if args.action == "train" and args.model == "sgd" and args.epochs <= 0:
+        parser.error("--epochs must be positive for --model sgd")
+    if args.action == "train" and args.publish and args.model != "forest" and MODEL_BACKEND == "compact":
+        parser.error("the compact backend can only serve forests; publish --model forest or unset AQI_MODEL_BACKEND")
+
+    if args.action == "check":
+        check(args.data, args.chunk_rows or 1000)
+    elif args.action == "cube":
+        peak_memory(args.data, args.chunk_rows or CHUNK_ROWS)
+    else:
+        version, info = train_streaming(args.data, args.model, args.chunk_rows or CHUNK_ROWS, args.sample_rows,
+                                        args.epochs, args.n_estimators, models_dir=args.models_dir)
+        print(f"Version {version}: {args.model} in {info['fit_seconds']:.1f}s, peak RSS {_peak_rss_mib():.0f} MiB")
+        print(f"Mean Squared Error: {info['mse']:.2f}")
+        print(f"Mean Absolute Error: {info['mae']:.2f}")
+        print(f"R2 Score: {info['r2']:.4f}")
+        if not info["test_rows"]:
+            print("No held-out rows in this input, so the scores above are undefined")
+        if args.publish:
+            publish(version, args.models_dir)
+            print(f"Published {version}")
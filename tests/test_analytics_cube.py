@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from analytics_cube import MEASURES, build_cube, extremes, mean_by, merge_cubes
+
+
+def _rows(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.uniform(0, 300, (n, len(MEASURES))), columns=MEASURES)
+    df = df.mask(rng.random(df.shape) < 0.2)
+    # One pollutant missing for a whole city
+    df.loc[:99, "Xylene"] = np.nan
+    df["City"] = ["Delhi"] * 100 + list(rng.choice(["Mumbai", "Chennai"], n - 100))
+    df["Date"] = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 700, n), unit="D")
+    df["AQI Level"] = rng.choice(["Good", "Poor"], n)
+    df["Year"], df["Month"] = df["Date"].dt.year, df["Date"].dt.month
+    return df
+
+
+def test_means_and_extremes_skip_missing_readings():
+    df = _rows()
+    cube = build_cube(df)
+    assert int(cube["count"].sum()) == len(df)
+
+    expected = df.groupby("City")[MEASURES].mean()
+    got = mean_by(cube, "City", MEASURES)
+    pd.testing.assert_frame_equal(got.sort_index(), expected.sort_index(), check_names=False)
+    assert np.isnan(got.loc["Delhi", "Xylene"])
+
+    monthly = mean_by(cube, "Month", city="Mumbai", year=2023)
+    mumbai = df[(df["City"] == "Mumbai") & (df["Year"] == 2023)]
+    pd.testing.assert_series_equal(monthly["AQI"], mumbai.groupby("Month")["AQI"].mean(), check_names=False,
+                                   check_index_type=False)
+
+    chennai = df.loc[df["City"] == "Chennai", "PM2.5"]
+    assert extremes(cube, "PM2.5", city="Chennai") == (chennai.min(), chennai.max())
+
+
+def test_merged_parts_match_one_build():
+    df = _rows()
+    keys = ["City", "Year", "Month", "AQI Level"]
+    whole = build_cube(df).sort_values(keys, ignore_index=True)
+    merged = merge_cubes(build_cube(df.iloc[:250]), build_cube(df.iloc[250:])).sort_values(keys, ignore_index=True)
+    pd.testing.assert_frame_equal(merged[whole.columns], whole, check_dtype=False)
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from aqi_bands import LEVELS, band_index, classify, level_of
+from data_store import load_columns
+
+
+def _reference_level(aqi):
+    # Straight transcription of the CPCB bands, one value at a time
+    if aqi != aqi:
+        return None
+    for upper, level in zip((50, 100, 200, 300, 400), LEVELS):
+        if aqi <= upper:
+            return level
+    return "Severe"
+
+
+def test_matches_reference_at_band_edges():
+    values = np.array([0, 49.9, 50, 50.01, 100, 100.5, 200, 200.0001, 300, 301, 400, 400.5, 500, 999, np.nan])
+    expected = [_reference_level(v) for v in values]
+    assert [level_of(v) for v in values] == expected
+    assert [None if pd.isna(level) else level for level in classify(values)] == expected
+
+
+def test_missing_aqi_has_no_band():
+    assert int(band_index(np.nan)) == -1
+    assert level_of(float("nan")) is None
+    assert list(band_index([np.nan, 10, 450])) == [-1, 0, 5]
+    assert pd.isna(classify([np.nan])[0])
+
+
+def test_dataset_levels():
+    df = load_columns(["AQI", "AQI Level"])
+    assert (classify(df["AQI"]).astype(str) == df["AQI Level"].astype(str)).all()
@@ -0,0 +1,75 @@
+import sqlite3
+
+import pytest
+
+from auth_store import AuthStore, MigrationError, hash_password, legacy_hash, verify_password
+
+
+def test_signup_and_login(tmp_path):
+    store = AuthStore(str(tmp_path / "users.db"), pool_size=2)
+    assert store.add_user("a@example.com", "secret")
+    assert not store.add_user("a@example.com", "other")
+    assert store.login_user("a@example.com", "secret")[0] == "a@example.com"
+    assert store.login_user("a@example.com", "wrong") is None
+    assert store.login_user("nobody@example.com", "secret") is None
+    store.close()
+
+
+def test_hashes_are_salted():
+    first, second = hash_password("secret", iterations=1000), hash_password("secret", iterations=1000)
+    assert first != second and first.startswith("pbkdf2_sha256$1000$")
+    assert verify_password("secret", first) and verify_password("secret", second)
+    assert not verify_password("Secret", first)
+
+
+def test_login_runs_off_the_calling_thread(tmp_path):
+    store = AuthStore(str(tmp_path / "users.db"), pool_size=1, hash_workers=1)
+    assert store.signup_async("a@example.com", "secret").result(timeout=30)
+    future = store.login_async("a@example.com", "secret")
+    assert future.result(timeout=30)[0] == "a@example.com"
+    store.close()
+
+
+def test_legacy_hash_is_upgraded_on_login(tmp_path):
+    path = str(tmp_path / "users.db")
+    _legacy_db(path, [("a@example.com", legacy_hash("secret"))])
+    store = AuthStore(path, pool_size=1)
+    assert store.login_user("a@example.com", "wrong") is None
+    assert store.login_user("a@example.com", "secret") is not None
+    with store.connection() as conn:
+        stored = conn.execute("SELECT password FROM userstable").fetchone()[0]
+    assert stored.startswith("pbkdf2_sha256$") and verify_password("secret", stored)
+    assert store.login_user("a@example.com", "secret") is not None
+    store.close()
+
+
+def _legacy_db(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE userstable (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL, "
+                 "password TEXT NOT NULL)")
+    conn.executemany("INSERT INTO userstable (username, password) VALUES (?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def test_migration_merges_identical_repeats(tmp_path):
+    path = str(tmp_path / "users.db")
+    _legacy_db(path, [("a@example.com", legacy_hash("secret"))] * 3 + [("b@example.com", "y")])
+    store = AuthStore(path, pool_size=1)
+    assert store.login_user("a@example.com", "secret") is not None
+    with store.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM userstable").fetchone()[0] == 2
+    store.close()
+
+
+def test_migration_refuses_conflicting_passwords(tmp_path):
+    path = str(tmp_path / "users.db")
+    _legacy_db(path, [("a@example.com", "x"), ("b@example.com", "y"), ("a@example.com", "z")])
+
+    with pytest.raises(MigrationError, match="a@example.com"):
+        AuthStore(path, pool_size=1)
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT COUNT(*) FROM userstable").fetchone()[0] == 3
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 0
+    conn.close()
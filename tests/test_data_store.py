@@ -0,0 +1,51 @@
+import os
+
+import pandas as pd
+import pytest
+
+import data_store
+from data_store import POINTER_FILE, convert, load_columns, resolve_dir
+from settings import DATA_PATH
+
+
+def _refuse_symlink(*args, **kwargs):
+    # As on Windows without Developer Mode
+    raise OSError(1314, "A required privilege is not held by the client")
+
+
+@pytest.fixture
+def no_symlinks(monkeypatch):
+    monkeypatch.setattr(data_store.os, "symlink", _refuse_symlink)
+
+
+def _copy(tmp_path, nrows=None):
+    csv = tmp_path / "aqi.csv"
+    pd.read_csv(DATA_PATH, dtype=str, nrows=nrows).to_csv(csv, index=False)
+    return str(csv)
+
+
+def test_store_without_symlinks(tmp_path, no_symlinks):
+    csv = _copy(tmp_path, nrows=100)
+    store = str(tmp_path / "aqi_store")
+    assert len(load_columns(["City", "AQI"], csv_path=csv, store_dir=store)) == 100
+    assert os.path.isdir(store) and not os.path.islink(store)
+    first = resolve_dir(store)
+    assert os.path.exists(os.path.join(store, POINTER_FILE))
+
+    # A changed CSV moves the pointer to a new version; the old one stays for readers still using it
+    csv = _copy(tmp_path, nrows=200)
+    os.utime(csv, ns=(1, 1))
+    assert len(load_columns(["City", "AQI"], csv_path=csv, store_dir=store)) == 200
+    assert resolve_dir(store) != first and os.path.isdir(first)
+
+
+def test_pointer_directory_becomes_a_symlink(tmp_path, monkeypatch):
+    csv = _copy(tmp_path, nrows=50)
+    store = str(tmp_path / "aqi_store")
+    with monkeypatch.context() as m:
+        m.setattr(data_store.os, "symlink", _refuse_symlink)
+        convert(csv, store)
+    csv = _copy(tmp_path, nrows=60)
+    os.utime(csv, ns=(1, 1))
+    assert len(load_columns(["AQI"], csv_path=csv, store_dir=store)) == 60
+    assert os.path.islink(store)
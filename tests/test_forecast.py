@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast import (LOOKBACK, Baseline, _fit_and_forecast, daily_grid, forecast_city, grid_features,
+                      series_features, update_forecasts)
+from settings import DATA_PATH
+
+
+def _csv_until(tmp_path, name, last_day):
+    # The dataset's own rows up to last_day, with the CSV's text untouched
+    df = pd.read_csv(DATA_PATH, dtype=str)
+    path = tmp_path / name
+    df[pd.to_datetime(df["Date"], format="%m/%d/%Y") <= last_day].to_csv(path, index=False)
+    return str(path)
+
+
+def test_incremental_features_match_full_build():
+    rng = np.random.default_rng(0)
+    days = pd.date_range("2024-01-01", periods=120, freq="D")
+    Y = rng.normal(150, 40, (3, len(days)))
+    Y[rng.random(Y.shape) < 0.1] = np.nan
+    full = grid_features(Y, days)
+    for cut in (1, 20, 31, 100, 119):
+        for c in range(len(Y)):
+            # The cached last day is recomputed along with the new ones, from LOOKBACK days of context
+            keep = cut - 1
+            start = max(0, keep - LOOKBACK)
+            head = series_features(Y[c, :cut], days[:cut])[:keep]
+            tail = series_features(Y[c, start:], days[start:])[keep - start:]
+            np.testing.assert_array_equal(np.concatenate([head, tail]), full[c])
+
+
+def test_incremental_update_matches_full_rebuild(tmp_path):
+    _, days, _ = daily_grid(live_db=None)
+    older = _csv_until(tmp_path, "older.csv", days[-10])
+    newer = _csv_until(tmp_path, "newer.csv", days[-1])
+    cache = str(tmp_path / "forecast.pkl")
+
+    update_forecasts(older, None, cache, method="mean", workers=1)
+    incremental = update_forecasts(newer, None, cache, method="mean", workers=1)
+    assert incremental["updated"]["retrained"] + incremental["updated"]["reforecast"] > 0
+    full = update_forecasts(newer, None, str(tmp_path / "full.pkl"), method="mean", workers=1)
+
+    assert incremental["last_day"] == full["last_day"] == days[-1]
+    for city, entry in full["cities"].items():
+        np.testing.assert_array_equal(incremental["cities"][city]["X"], entry["X"])
+        pd.testing.assert_series_equal(incremental["cities"][city]["forecast"], entry["forecast"])
+    assert update_forecasts(newer, None, cache, method="mean", workers=1)["updated"] == {"retrained": 0,
+                                                                                      "reforecast": 0}
+
+
+def test_baseline_forecasts_the_trailing_mean():
+    days = pd.date_range("2024-01-01", periods=60, freq="D")
+    y = np.arange(60, dtype=np.float64)
+    forecast = forecast_city(Baseline(), y, days[-1], horizon=3)
+    assert forecast.index[0] == days[-1] + pd.Timedelta(days=1)
+    assert forecast.iloc[0] == pytest.approx(y[-30:].mean())
+    assert forecast.iloc[1] == pytest.approx(np.append(y, forecast.iloc[0])[-30:].mean())
+
+
+def test_shipped_model_is_no_worse_than_the_forest():
+    cities, days, Y = daily_grid(live_db=None)
+    X = grid_features(Y, days)
+    holdout = 14
+    train_days = len(days) - holdout
+    errors = {}
+    for method in ("mean", "forest"):
+        errors[method] = np.nanmean([np.abs(_fit_and_forecast(X[c, :train_days], Y[c, :train_days],
+                                                              days[train_days - 1], holdout, method)[1].to_numpy()
+                                            - Y[c, train_days:]) for c in range(len(cities))])
+    assert errors["mean"] <= errors["forest"]
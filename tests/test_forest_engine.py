@@ -0,0 +1,66 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from forest_engine import export_forest, load_forest
+from settings import DATA_PATH, FEATURES, MODEL_PATH, SCALER_PATH
+from train import fit_forest
+
+
+def _synthetic(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.gamma(2.0, 40.0, (n, len(FEATURES))), columns=FEATURES)
+    # Coarse values so many rows sit exactly on split thresholds
+    X = X.round(1)
+    y = 1.2 * X["PM2.5"] + 0.4 * X["PM10"] + 3 * X["CO"] + rng.normal(0, 5, n)
+    return X, y
+
+
+def test_compact_matches_sklearn(tmp_path):
+    X, y = _synthetic()
+    model, scaler = fit_forest(X, y, n_estimators=20, n_jobs=1)
+    forest = load_forest(export_forest(model, scaler, str(tmp_path / "forest.bin")))
+    assert forest.n_estimators == 20
+    X_new, _ = _synthetic(500, seed=1)
+    for frame in (X, X_new):
+        np.testing.assert_allclose(forest.predict(frame), model.predict(scaler.transform(frame)), rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize("train_with_gaps", [False, True])
+def test_missing_readings_follow_sklearn(tmp_path, train_with_gaps):
+    X, y = _synthetic()
+    rng = np.random.default_rng(2)
+    if train_with_gaps:
+        X = X.mask(rng.random(X.shape) < 0.1)
+    model, scaler = fit_forest(X, y, n_estimators=10, n_jobs=1)
+    forest = load_forest(export_forest(model, scaler, str(tmp_path / "forest.bin")))
+    X_new, _ = _synthetic(500, seed=1)
+    X_new = X_new.mask(rng.random(X_new.shape) < 0.2)
+    X_new["PM2.5"] = np.nan
+    np.testing.assert_allclose(forest.predict(X_new), model.predict(scaler.transform(X_new)), rtol=0, atol=1e-9)
+
+    X_new.iloc[0, 0] = np.inf
+    with pytest.raises(ValueError):
+        forest.predict(X_new)
+
+
+def test_single_row_and_chunking(tmp_path):
+    X, y = _synthetic(500)
+    model, scaler = fit_forest(X, y, n_estimators=5, n_jobs=1)
+    forest = load_forest(export_forest(model, scaler, str(tmp_path / "forest.bin")))
+    expected = model.predict(scaler.transform(X))
+    np.testing.assert_allclose(forest.predict(X.values[0]), expected[:1])
+    np.testing.assert_allclose(forest.predict(X, chunk_rows=37), expected)
+
+
+@pytest.mark.skipif(not os.path.exists(MODEL_PATH), reason="no trained aqi_model.pkl")
+def test_compact_matches_shipped_model(tmp_path):
+    model, scaler = joblib.load(MODEL_PATH), joblib.load(SCALER_PATH)
+    forest = load_forest(export_forest(model, scaler, str(tmp_path / "forest.bin")))
+    X = pd.read_csv(DATA_PATH, usecols=FEATURES)[FEATURES].head(5000)
+    np.testing.assert_allclose(forest.predict(X), model.predict(scaler.transform(X)), rtol=0, atol=1e-9)
+    X["PM2.5"] = np.nan
+    np.testing.assert_allclose(forest.predict(X), model.predict(scaler.transform(X)), rtol=0, atol=1e-9)
@@ -0,0 +1,63 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from live_client import LiveAQIClient
+from live_store import normalize
+from waqi_replay import start_replay_server
+
+FEED_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "waqi")
+
+
+@pytest.fixture
+def server():
+    server = start_replay_server(FEED_DIR)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(server):
+    client = LiveAQIClient(base_url=server.url, token="test", retries=0)
+    yield client
+    client.close()
+
+
+def test_fetch_returns_recorded_feed(client):
+    data = client.fetch("Delhi")
+    assert data["aqi"] == 187
+    assert data["iaqi"]["pm25"]["v"] == 187
+
+
+def test_unknown_city_is_none(client):
+    assert client.fetch("atlantis") is None
+
+
+def test_fetch_is_cached(client, server):
+    client.fetch("mumbai")
+    client.fetch("mumbai")
+    assert server.hits == 1
+
+
+def test_concurrent_fetches_share_one_request(client, server):
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(client.fetch, ["delhi"] * 8))
+    assert all(r is results[0] for r in results)
+    assert server.hits == 1
+
+
+def test_fetch_all(client, server):
+    feeds = client.fetch_all(["delhi", "mumbai", "bangalore", "atlantis"])
+    assert {c: d["aqi"] for c, d in feeds.items() if d} == {"delhi": 187, "mumbai": 96, "bangalore": 74}
+    assert feeds["atlantis"] is None
+    assert server.hits == 4
+
+
+def test_feed_normalizes_to_store_row(client):
+    row = normalize("bangalore", client.fetch("bangalore"), fetched_at=0)
+    assert row["City"] == "Bengaluru"
+    assert row["Date"] == "2025-06-14"
+    assert row["PM2.5"] == 74
+    assert row["NH3"] is None
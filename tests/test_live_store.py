@@ -0,0 +1,67 @@
+import os
+
+from live_store import Ingestor, LiveStore, acquire_ingest_lock, normalize
+from live_client import LiveAQIClient
+from waqi_replay import start_replay_server
+
+FEED_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "waqi")
+
+
+def _reading(city, ts, aqi):
+    return normalize(city, {"aqi": aqi, "time": {"s": ts}, "iaqi": {"pm25": {"v": aqi}}}, fetched_at=0)
+
+
+def test_coverage_and_daily(tmp_path):
+    store = LiveStore(str(tmp_path / "live.db"))
+    assert store.coverage() is None
+    assert store.append([_reading("delhi", "2025-06-02 09:00:00", 180), _reading("delhi", "2025-06-02 15:00:00", 220),
+                         _reading("mumbai", "2025-06-05 09:00:00", 90), None]) == 3
+    assert store.append([_reading("delhi", "2025-06-02 09:00:00", 999)]) == 0
+    first, last = store.coverage()
+    assert (str(first.date()), str(last.date())) == ("2025-06-02", "2025-06-05")
+    day = store.daily("delhi", "2025-06-02", "2025-06-02")
+    assert day["AQI"].tolist() == [200.0]
+    assert day["AQI Level"].tolist() == ["Moderate"]
+    store.close()
+
+
+class FlakyClient:
+    def __init__(self, client):
+        self.client = client
+        self.calls = 0
+
+    def fetch_all(self, cities):
+        self.calls += 1
+        if self.calls == 1:
+            raise ValueError("malformed feed")
+        return self.client.fetch_all(cities)
+
+
+def test_ingestor_survives_unexpected_errors(tmp_path):
+    server = start_replay_server(FEED_DIR)
+    store = LiveStore(str(tmp_path / "live.db"))
+    client = FlakyClient(LiveAQIClient(base_url=server.url, retries=0))
+    ingestor = Ingestor(store, client, interval=0.05, cities=["delhi", "mumbai"]).start()
+    try:
+        for _ in range(100):
+            if ingestor.stats["inserted"]:
+                break
+            ingestor._stop.wait(0.05)
+    finally:
+        ingestor.stop()
+        server.shutdown()
+        server.server_close()
+    assert client.calls >= 2
+    assert ingestor.stats["inserted"] == 2
+    store.close()
+
+
+def test_one_poller_per_database(tmp_path):
+    db_path = str(tmp_path / "live.db")
+    first = acquire_ingest_lock(db_path)
+    assert first is not None
+    assert acquire_ingest_lock(db_path) is None
+    first.close()
+    second = acquire_ingest_lock(db_path)
+    assert second is not None
+    second.close()
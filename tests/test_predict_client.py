@@ -0,0 +1,86 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+import requests
+
+from predict_service import MicroBatcher, PredictClient, parse_payload
+from settings import FEATURES
+
+
+class HealthHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.hits += 1
+        body = json.dumps({"status": "ok", "version": self.server.hits}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), HealthHandler)
+    server.hits = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_version_is_cached_for_ttl(server):
+    client = PredictClient(f"http://127.0.0.1:{server.server_address[1]}", version_ttl=0.5)
+    assert [client.cached_version() for _ in range(5)] == [1] * 5
+    assert server.hits == 1
+    time.sleep(0.6)
+    assert client.cached_version() == 2
+
+
+def test_unreachable_service_is_cached_too():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    client = PredictClient(f"http://127.0.0.1:{port}", version_ttl=60)
+    with pytest.raises(requests.RequestException):
+        client.cached_version()
+    calls = []
+    client.version = lambda: calls.append(1)
+    with pytest.raises(requests.RequestException):
+        client.cached_version()
+    assert calls == []
+
+
+@pytest.mark.parametrize("value", ["Infinity", "-Infinity", "1e400"])
+def test_non_finite_features_are_rejected(value):
+    row = ", ".join(["1.0"] * (len(FEATURES) - 1) + [value])
+    with pytest.raises(ValueError):
+        parse_payload(f'{{"rows": [[{row}]]}}'.encode())
+    assert np.isnan(parse_payload(json.dumps({"rows": [[1.0] * (len(FEATURES) - 1) + [None]]}).encode())).any()
+
+
+def test_a_failing_request_does_not_fail_its_batch():
+    def predict(X):
+        if (X < 0).any():
+            raise ValueError("bad rows")
+        return X.sum(axis=1)
+
+    async def run():
+        batcher = MicroBatcher(predict, window_ms=50, workers=1)
+        batcher.start()
+        good = [batcher.submit(np.full((1, 3), float(i))) for i in range(3)]
+        results = await asyncio.gather(*good, batcher.submit(-np.ones((1, 3))), return_exceptions=True)
+        await batcher.close()
+        return results
+
+    *good, bad = asyncio.run(run())
+    assert [float(r[0]) for r in good] == [0.0, 3.0, 6.0]
+    assert isinstance(bad, ValueError)
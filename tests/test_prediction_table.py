@@ -0,0 +1,28 @@
+import os
+
+import numpy as np
+
+from data_store import load_columns
+from prediction_table import PredictionTable
+from settings import FEATURES, TARGET
+from train import fit_forest
+
+
+def test_saved_table_matches_model(tmp_path):
+    df = load_columns()
+    model, scaler = fit_forest(df[FEATURES], df[TARGET], n_estimators=3, n_jobs=1)
+    path = str(tmp_path / "aqi_predictions_store")
+    table = PredictionTable.build(model, scaler, stamps=((1, 2),))
+    table.save(path)
+    table.save(path)
+    assert os.path.islink(path)
+
+    loaded = PredictionTable.load(path)
+    assert loaded.stamps == ((1, 2),)
+    expected = model.predict(scaler.transform(df[FEATURES]))
+    for i in np.random.default_rng(0).choice(len(df), 50, replace=False):
+        row, predicted = loaded.lookup(df["City"].iloc[i], df["Date"].iloc[i])
+        assert row["City"] == df["City"].iloc[i]
+        assert np.isclose(predicted, expected[i], rtol=1e-6)
+    assert loaded.lookup("Atlantis", "2024-01-01") is None
+    assert loaded.lookup(df["City"].iloc[0], "1990-01-01") is None
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from model_registry import ModelRegistry
+from settings import FEATURES
+from train import fit_forest, publish, save_version
+
+
+def _data(seed, n=300):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.uniform(0, 200, (n, len(FEATURES))), columns=FEATURES)
+    return X, X["PM2.5"] * (1 + seed) + rng.normal(0, 5, n)
+
+
+def _version(models_dir, seed):
+    model, scaler = fit_forest(*_data(seed), n_estimators=5, n_jobs=1)
+    return save_version(model, scaler, {"seed": seed}, str(models_dir))
+
+
+def _registry(tmp_path, compact=False):
+    return ModelRegistry(model_path=str(tmp_path / "aqi_model.pkl"), scaler_path=str(tmp_path / "aqi_scaler.pkl"),
+                         reload_interval=0, manifest_path=str(tmp_path / "aqi_model.json"),
+                         compact_path=str(tmp_path / "aqi_forest.bin") if compact else None)
+
+
+def _publish(tmp_path, version):
+    publish(version, str(tmp_path / "models"), str(tmp_path / "aqi_model.pkl"), str(tmp_path / "aqi_scaler.pkl"),
+            str(tmp_path / "aqi_forest.bin"), str(tmp_path / "aqi_model.json"))
+
+
+def test_registry_follows_the_manifest(tmp_path):
+    X, _ = _data(0, 20)
+    first = _version(tmp_path / "models", 0)
+    _publish(tmp_path, first)
+    registry, compact = _registry(tmp_path), _registry(tmp_path, compact=True)
+    assert registry.paths() == (str(tmp_path / "aqi_model.json"),)
+
+    model, scaler = registry.get()
+    before = model.predict(scaler.transform(X))
+    cmodel, cscaler = compact.get()
+    assert np.allclose(cmodel.predict(cscaler.transform(X)), before)
+
+    second = _version(tmp_path / "models", 1)
+    assert not registry.reload_if_changed()
+    _publish(tmp_path, second)
+    assert registry.reload_if_changed()
+    assert compact.reload_if_changed()
+    model, scaler = registry.get()
+    after = model.predict(scaler.transform(X))
+    assert not np.allclose(after, before)
+    cmodel, cscaler = compact.get()
+    assert np.allclose(cmodel.predict(cscaler.transform(X)), after)
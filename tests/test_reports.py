@@ -0,0 +1,35 @@
+import os
+import time
+
+from reports import ReportEngine, prune_cache
+
+
+def _file(path, size, age):
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return str(path)
+
+
+def test_prune_drops_old_then_least_recently_used(tmp_path):
+    old = _file(tmp_path / "old.pdf", 10, 40 * 86400)
+    used_long_ago = _file(tmp_path / "a.pdf", 400, 3000)
+    used_recently = _file(tmp_path / "b.pdf", 400, 100)
+    kept = _file(tmp_path / "c.pdf", 400, 5000)
+    assert prune_cache(str(tmp_path), max_bytes=1000, max_age=30 * 86400, keep=[kept]) == 2
+    assert sorted(os.listdir(tmp_path)) == ["b.pdf", "c.pdf"]
+    assert not os.path.exists(old) and not os.path.exists(used_long_ago) and os.path.exists(used_recently)
+
+
+def test_child_process_build_matches_in_process(tmp_path):
+    engine = ReportEngine(out_dir=str(tmp_path), workers=1)
+    updates = []
+    path = engine.submit(["Delhi", "Mumbai"], "2024-01-01", "2024-01-31",
+                         progress=lambda done, total: updates.append((done, total))).result(timeout=300)
+    assert path.endswith(".zip") and os.path.exists(path)
+    assert updates[-1] == (2, 2)
+    # Second build is served from the cache, in this process
+    assert engine.build(["Delhi", "Mumbai"], "2024-01-01", "2024-01-31") == path
+    assert len([n for n in os.listdir(tmp_path) if n.endswith(".pdf")]) == 2
+    engine.close()
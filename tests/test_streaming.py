@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics_cube import KEYS, build_cube
+from data_store import load_columns
+from settings import DATA_PATH, FEATURES, TARGET
+from streaming import evaluate_stream, iter_chunks, stream_cube, train_streaming
+from train import fit_forest, publish
+
+
+def _sorted(cube):
+    return cube.assign(**{k: cube[k].astype(str) for k in KEYS}).sort_values(KEYS, ignore_index=True)
+
+
+@pytest.mark.parametrize("chunk_rows", [997, 4000, 100_000])
+def test_streamed_cube_matches_in_memory(chunk_rows):
+    expected = _sorted(build_cube(load_columns()))
+    streamed = _sorted(stream_cube(DATA_PATH, chunk_rows))
+    pd.testing.assert_frame_equal(streamed[expected.columns], expected, check_dtype=False)
+
+
+def test_chunks_cover_every_row_in_order():
+    df = load_columns(["City", "Date", "AQI"])
+    chunks = list(iter_chunks(DATA_PATH, ["City", "Date", "AQI"], 1000))
+    assert [len(c) for c in chunks[:-1]] == [1000] * (len(chunks) - 1)
+    joined = pd.concat(chunks, ignore_index=True)
+    pd.testing.assert_frame_equal(joined.astype({"City": str}), df.astype({"City": str}))
+
+
+def test_csv_chunks_match_store(tmp_path):
+    # A copy without a columnar store is parsed from the CSV instead
+    csv = tmp_path / "copy.csv"
+    with open(DATA_PATH, "rb") as src:
+        csv.write_bytes(src.read())
+    expected = _sorted(build_cube(load_columns()))
+    streamed = _sorted(stream_cube(str(csv), 3000))
+    assert not os.path.exists(tmp_path / "copy_store")
+    np.testing.assert_allclose(streamed[expected.columns[len(KEYS):]].to_numpy(np.float64),
+                               expected[expected.columns[len(KEYS):]].to_numpy(np.float64), rtol=1e-6)
+
+
+def test_evaluate_with_no_held_out_rows(tmp_path):
+    df = load_columns()
+    model, scaler = fit_forest(df[FEATURES], df[TARGET], n_estimators=2, n_jobs=1)
+    csv = tmp_path / "empty.csv"
+    pd.read_csv(DATA_PATH, nrows=0).to_csv(csv, index=False)
+    metrics, n = evaluate_stream(model, scaler, str(csv))
+    assert n == 0 and all(np.isnan(v) for v in metrics.values())
+
+
+def test_forest_needs_a_sample():
+    with pytest.raises(ValueError):
+        train_streaming(model_kind="forest", sample_rows=0)
+
+
+def test_publishing_a_linear_model_drops_the_forest_export(tmp_path):
+    models_dir = str(tmp_path / "models")
+    version, _ = train_streaming(model_kind="sgd", chunk_rows=4000, epochs=1, models_dir=models_dir)
+    paths = {name: str(tmp_path / name) for name in ("aqi_model.pkl", "aqi_scaler.pkl", "aqi_forest.bin",
+                                                      "aqi_model.json")}
+    with open(paths["aqi_forest.bin"], "wb") as f:
+        f.write(b"previous forest")
+    with pytest.raises(ValueError):
+        publish(version, models_dir, *paths.values(), backend="compact")
+    assert os.path.exists(paths["aqi_forest.bin"]) and not os.path.exists(paths["aqi_model.json"])
+
+    publish(version, models_dir, *paths.values(), backend="sklearn")
+    assert not os.path.exists(paths["aqi_forest.bin"])
+    assert os.path.exists(paths["aqi_model.pkl"]) and os.path.exists(paths["aqi_model.json"])
@@ -0,0 +1,57 @@
+import sys
+import threading
+
+import pytest
+
+import tracing
+
+
+class StopException(Exception):
+    # Stands in for streamlit's st.stop() / st.rerun() control-flow exceptions
+    pass
+
+
+def test_interrupted_rerun_is_closed(monkeypatch, tmp_path):
+    monkeypatch.setattr(tracing, "PROFILE_SAMPLE", 1.0)
+    monkeypatch.setattr(tracing, "PROFILE_SLOW_MS", 0.0)
+    monkeypatch.setattr(tracing, "PROFILE_DIR", str(tmp_path))
+    before = tracing.snapshot().get("rerun", {}).get("count", 0)
+
+    with pytest.raises(StopException):
+        with tracing.rerun():
+            with tracing.span("stage"):
+                pass
+            raise StopException()
+
+    assert tracing._local.rerun is None
+    assert sys.getprofile() is None
+    assert tracing.snapshot()["rerun"]["count"] == before + 1
+    assert len(list(tmp_path.glob("rerun-*.prof"))) == 1
+
+
+def test_overlapping_sampled_reruns(monkeypatch, tmp_path):
+    monkeypatch.setattr(tracing, "PROFILE_SAMPLE", 1.0)
+    monkeypatch.setattr(tracing, "PROFILE_SLOW_MS", 0.0)
+    monkeypatch.setattr(tracing, "PROFILE_DIR", str(tmp_path))
+    started, finish, errors = threading.Event(), threading.Event(), []
+
+    def first():
+        with tracing.rerun():
+            started.set()
+            finish.wait(5)
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    started.wait(5)
+    try:
+        # Only one rerun holds the profiler; this one runs unprofiled instead of failing
+        with tracing.rerun():
+            assert tracing._local.rerun[1] is None
+    except Exception as e:
+        errors.append(e)
+    finish.set()
+    thread.join()
+
+    assert errors == []
+    assert not tracing._profile_lock.locked()
+    assert len(list(tmp_path.glob("rerun-*.prof"))) == 1
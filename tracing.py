@@ -0,0 +1,209 @@
+"""Lightweight timing spans for dashboard reruns.
+
+    with rerun():                 # the whole script body
+        with span("load_data"):
+            df = load_data()
+
+Span durations go into in-process histograms. Optional outputs, all off by
+default and configured through environment variables:
+
+    AQI_METRICS_PORT=9464         serve /metrics (Prometheus text) and /metrics.json on localhost
+    AQI_TRACE_LOG=trace.log       append one JSON line per rerun to a rotating log
+    AQI_PROFILE_SAMPLE=0.05       cProfile this fraction of reruns ...
+    AQI_PROFILE_SLOW_MS=1000      ... and keep the profile only if the rerun was this slow
+    AQI_PROFILE_DIR=profiles      where kept .prof files go
+"""
+import bisect
+import cProfile
+import json
+import logging
+import logging.handlers
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from settings import BASE_DIR
+
+METRICS_PORT = int(os.environ.get("AQI_METRICS_PORT", "0"))
+TRACE_LOG = os.environ.get("AQI_TRACE_LOG", "")
+PROFILE_SAMPLE = float(os.environ.get("AQI_PROFILE_SAMPLE", "0"))
+PROFILE_SLOW_MS = float(os.environ.get("AQI_PROFILE_SLOW_MS", "1000"))
+PROFILE_DIR = os.environ.get("AQI_PROFILE_DIR", os.path.join(BASE_DIR, "profiles"))
+
+# Upper bounds in milliseconds; the last bucket catches everything slower
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+# --------------- Histograms ---------------
+class Histogram:
+    def __init__(self, buckets=BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def snapshot(self):
+        return {"count": self.count, "sum_ms": self.sum_ms, "max_ms": self.max_ms,
+                "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts))}
+
+
+_lock = threading.Lock()
+_histograms = {}
+_local = threading.local()
+
+
+def observe(name, ms):
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = Histogram()
+        hist.observe(ms)
+    spans = getattr(_local, "spans", None)
+    if spans is not None:
+        spans.append((name, ms))
+
+
+def snapshot():
+    with _lock:
+        return {name: hist.snapshot() for name, hist in _histograms.items()}
+
+
+@contextmanager
+def span(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, (time.perf_counter() - start) * 1000)
+
+
+# --------------- Reruns ---------------
+_log = None
+_profile_lock = threading.Lock()
+
+
+def _trace_log():
+    global _log
+    if _log is None and TRACE_LOG:
+        _log = logging.getLogger("aqi.trace")
+        _log.propagate = False
+        _log.setLevel(logging.INFO)
+        handler = logging.handlers.RotatingFileHandler(TRACE_LOG, maxBytes=5_000_000, backupCount=3)
+        _log.addHandler(handler)
+    return _log
+
+
+def begin_rerun():
+    """Start timing one script run on this thread; a sampled run also gets a profiler."""
+    _ensure_metrics_server()
+    profiler = None
+    # One profiled rerun per process: since Python 3.12 a second enable() raises while one is active.
+    # A sampled rerun that finds the profiler busy simply isn't profiled.
+    if PROFILE_SAMPLE > 0 and random.random() < PROFILE_SAMPLE and _profile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool (a debugger, coverage) already holds the hook
+            profiler = None
+            _profile_lock.release()
+    _local.spans = []
+    _local.rerun = (time.perf_counter(), profiler)
+
+
+def end_rerun():
+    state = getattr(_local, "rerun", None)
+    if state is None:
+        return None
+    start, profiler = state
+    ms = (time.perf_counter() - start) * 1000
+    spans = _local.spans
+    _local.rerun = _local.spans = None
+    observe("rerun", ms)
+
+    if profiler is not None:
+        profiler.disable()
+        _profile_lock.release()
+        if ms >= PROFILE_SLOW_MS:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(os.path.join(PROFILE_DIR, f"rerun-{time.strftime('%Y%m%dT%H%M%S')}-{int(ms)}ms.prof"))
+
+    log = _trace_log()
+    if log is not None:
+        log.info(json.dumps({"ts": time.time(), "rerun_ms": ms, "spans": spans}))
+    return ms
+
+
+@contextmanager
+def rerun():
+    """Time the enclosed script run, including runs cut short by st.stop() or st.rerun()."""
+    begin_rerun()
+    try:
+        yield
+    finally:
+        end_rerun()
+
+
+# --------------- Metrics Endpoint ---------------
+def _prometheus_text():
+    lines = ["# TYPE aqi_span_ms histogram"]
+    for name, snap in sorted(snapshot().items()):
+        cumulative = 0
+        for le, count in snap["buckets"].items():
+            cumulative += count
+            lines.append(f'aqi_span_ms_bucket{{span="{name}",le="{le}"}} {cumulative}')
+        lines.append(f'aqi_span_ms_sum{{span="{name}"}} {snap["sum_ms"]}')
+        lines.append(f'aqi_span_ms_count{{span="{name}"}} {snap["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, ctype = _prometheus_text().encode(), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, ctype = json.dumps(snapshot()).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="aqi-metrics", daemon=True).start()
+    return _server
+
+
+def _ensure_metrics_server():
+    if METRICS_PORT and _server is None:
+        try:
+            start_metrics_server(METRICS_PORT)
+        except OSError:
+            # Another worker on this host already owns the port
+            pass
@@ -0,0 +1,198 @@
+"""Train the AQI model headlessly and write versioned artifacts.
+
+    python train.py                       # fresh forest on all cores
+    python train.py --warm-start 20       # add 20 trees to the latest version
+    python train.py --publish             # also point aqi_model.json at the new version
+
+Each run writes models/<version>/ with aqi_model.pkl, aqi_scaler.pkl and
+metrics.json. Published versions are picked up by the dashboard's model
+registry without a restart.
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+
+import joblib
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+from sklearn.preprocessing import StandardScaler
+
+from data_store import load_columns
+from forest_engine import export_forest, is_current
+from settings import (BASE_DIR, DATA_PATH, FEATURES, FOREST_PATH, MODEL_BACKEND, MODEL_MANIFEST_PATH, MODEL_PATH,
+                      SCALER_PATH, TARGET)
+
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+
+
+# --------------- Data Split ---------------
+def holdout_mask(df, test_fraction=0.2):
+    """Stable test split keyed on (City, Date).
+
+    Rows keep their side of the split when new months are appended, so a
+    warm-started model is never scored on rows its older trees trained on.
+    """
+    keys = df["City"].astype(str) + "|" + df["Date"].astype("datetime64[ns]").astype(str)
+    buckets = pd.util.hash_pandas_object(keys, index=False).values % 1000
+    return buckets < int(test_fraction * 1000)
+
+
+# --------------- Fitting ---------------
+def fit_forest(X, y, n_estimators=100, n_jobs=-1, random_state=42):
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=random_state, n_jobs=n_jobs)
+    model.fit(X_scaled, y)
+    return model, scaler
+
+
+def add_trees(model, scaler, X, y, extra, n_jobs=-1):
+    """Grow ``extra`` new trees on (X, y) and keep the existing ones.
+
+    The scaler is reused as-is: the old trees' split thresholds live in its
+    scaled space, so refitting it would silently invalidate them.
+    """
+    model.set_params(warm_start=True, n_estimators=model.n_estimators + extra, n_jobs=n_jobs)
+    model.fit(scaler.transform(X), y)
+    model.set_params(warm_start=False)
+    return model
+
+
+def evaluate(model, scaler, X, y):
+    y_pred = model.predict(scaler.transform(X))
+    metrics = {
+        "mse": float(mean_squared_error(y, y_pred)),
+        "mae": float(mean_absolute_error(y, y_pred)),
+        "r2": float(r2_score(y, y_pred)),
+    }
+    return metrics, y_pred
+
+
+# --------------- Versioned Artifacts ---------------
+def list_versions(models_dir=MODELS_DIR):
+    if not os.path.isdir(models_dir):
+        return []
+    return sorted(d for d in os.listdir(models_dir)
+                  if not d.startswith(".") and os.path.isfile(os.path.join(models_dir, d, "metrics.json")))
+
+
+def load_version(version, models_dir=MODELS_DIR):
+    path = os.path.join(models_dir, version)
+    with open(os.path.join(path, "metrics.json")) as f:
+        info = json.load(f)
+    return joblib.load(os.path.join(path, "aqi_model.pkl")), joblib.load(os.path.join(path, "aqi_scaler.pkl")), info
+
+
+def save_version(model, scaler, info, models_dir=MODELS_DIR):
+    version = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+    while os.path.exists(os.path.join(models_dir, version)):
+        version += "_"
+    tmp = os.path.join(models_dir, f".{version}.tmp")
+    os.makedirs(tmp)
+    joblib.dump(model, os.path.join(tmp, "aqi_model.pkl"))
+    joblib.dump(scaler, os.path.join(tmp, "aqi_scaler.pkl"))
+    with open(os.path.join(tmp, "metrics.json"), "w") as f:
+        json.dump(dict(info, version=version), f, indent=2)
+    os.rename(tmp, os.path.join(models_dir, version))
+    return version
+
+
+def publish(version, models_dir=MODELS_DIR, model_path=MODEL_PATH, scaler_path=SCALER_PATH,
+            forest_path=FOREST_PATH, manifest_path=MODEL_MANIFEST_PATH, backend=MODEL_BACKEND):
+    """Make a version the one the dashboard serves.
+
+    The registry loads whatever the manifest names inside models/<version>/,
+    which never changes once written. The manifest is replaced in a single
+    rename after the version's files are complete, so a reload always sees a
+    matching model, scaler and forest export. The top-level copies are kept
+    up to date for tools that read them directly.
+
+    Only forests have a compact export: other models are refused while the
+    compact backend is configured, and otherwise remove the old export so
+    nothing keeps serving the previous forest.
+    """
+    src = os.path.join(models_dir, version)
+    model, scaler, _ = load_version(version, models_dir)
+    is_forest = hasattr(model, "estimators_")
+    if not is_forest and backend == "compact":
+        raise ValueError(f"{version} is a {type(model).__name__}, which the compact backend cannot serve; "
+                         "publish a forest or set AQI_MODEL_BACKEND=sklearn")
+    files = {"model": "aqi_model.pkl", "scaler": "aqi_scaler.pkl"}
+    if is_forest:
+        if not is_current(os.path.join(src, "aqi_forest.bin")):
+            export_forest(model, scaler, os.path.join(src, "aqi_forest.bin"))
+        files["forest"] = "aqi_forest.bin"
+
+    manifest = {"version": version}
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    for key, name in files.items():
+        manifest[key] = os.path.relpath(os.path.join(os.path.abspath(src), name), base)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+    for key, dst in (("scaler", scaler_path), ("model", model_path), ("forest", forest_path)):
+        if key in files:
+            shutil.copyfile(os.path.join(src, files[key]), dst + ".tmp")
+            os.replace(dst + ".tmp", dst)
+        elif os.path.exists(dst):
+            os.remove(dst)
+
+
+# --------------- Training Run ---------------
+def train(data_path=DATA_PATH, n_estimators=100, warm_start=0, n_jobs=-1, random_state=42,
+          models_dir=MODELS_DIR):
+    df = load_columns(["City", "Date"] + FEATURES + [TARGET], csv_path=data_path)
+    test = holdout_mask(df)
+    X_train, y_train = df.loc[~test, FEATURES], df.loc[~test, TARGET]
+    X_test, y_test = df.loc[test, FEATURES], df.loc[test, TARGET]
+
+    start = time.perf_counter()
+    versions = list_versions(models_dir)
+    parent = None
+    if warm_start and versions:
+        parent = versions[-1]
+        model, scaler, parent_info = load_version(parent, models_dir)
+        if parent_info.get("train_rows") == len(X_train):
+            print(f"No new rows since {parent}; adding {warm_start} trees anyway")
+        model = add_trees(model, scaler, X_train, y_train, warm_start, n_jobs=n_jobs)
+    else:
+        if warm_start:
+            print("No previous version to warm-start from; training from scratch")
+        model, scaler = fit_forest(X_train, y_train, n_estimators=n_estimators, n_jobs=n_jobs,
+                                   random_state=random_state)
+    fit_seconds = time.perf_counter() - start
+
+    metrics, _ = evaluate(model, scaler, X_test, y_test)
+    info = dict(metrics, n_estimators=model.n_estimators, train_rows=int(len(X_train)),
+                test_rows=int(len(X_test)), fit_seconds=fit_seconds, parent=parent,
+                data_rows=int(len(df)), features=FEATURES)
+    os.makedirs(models_dir, exist_ok=True)
+    version = save_version(model, scaler, info, models_dir)
+    return version, info
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--warm-start", type=int, default=0, metavar="TREES",
+                        help="add this many trees to the latest saved version instead of retraining")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--random-state", type=int, default=42)
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--publish", action="store_true", help="install the new version for the dashboard")
+    args = parser.parse_args()
+
+    version, info = train(args.data, args.n_estimators, args.warm_start, args.n_jobs,
+                          args.random_state, args.models_dir)
+    print(f"Version {version}: {info['n_estimators']} trees in {info['fit_seconds']:.1f}s")
+    print(f"Mean Squared Error: {info['mse']:.2f}")
+    print(f"Mean Absolute Error: {info['mae']:.2f}")
+    print(f"R2 Score: {info['r2']:.4f}")
+    if args.publish:
+        publish(version, args.models_dir)
+        print(f"Published {version} to {MODEL_MANIFEST_PATH}")
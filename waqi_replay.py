@@ -0,0 +1,98 @@
+"""Local stand-in for the WAQI feed that replays recorded JSON.
+
+Record real responses once (needs network)::
+
+    python waqi_replay.py record feeds/
+
+then point the dashboard or the live client at the replay server::
+
+    python waqi_replay.py serve feeds/ --port 8765
+    AQI_WAQI_URL=http://127.0.0.1:8765 streamlit run main.py
+
+A recorded set lives in ``tests/fixtures/waqi`` and backs the live client tests.
+"""
+import argparse
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from settings import LIVE_CITIES, WAQI_BASE_URL, WAQI_TOKEN
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """Threaded server that counts the requests it has served."""
+
+    daemon_threads = True
+
+    def __init__(self, address, feed_dir):
+        super().__init__(address, _make_handler(feed_dir))
+        self.hits = 0
+        self._hits_lock = threading.Lock()
+
+    def count_hit(self):
+        # Handlers run on their own threads, so ``hits += 1`` would race
+        with self._hits_lock:
+            self.hits += 1
+
+
+def _make_handler(feed_dir):
+    class ReplayHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            # /feed/<city>/?token=...  ->  <feed_dir>/<city>.json
+            parts = [p for p in self.path.split("?")[0].split("/") if p]
+            body = None
+            if len(parts) == 2 and parts[0] == "feed":
+                path = os.path.join(feed_dir, f"{parts[1].lower()}.json")
+                if os.path.isfile(path):
+                    with open(path, "rb") as f:
+                        body = f.read()
+            self.server.count_hit()
+            if body is None:
+                body = json.dumps({"status": "error", "data": "Unknown station"}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ReplayHandler
+
+
+def start_replay_server(feed_dir, host="127.0.0.1", port=0):
+    """Serve ``feed_dir`` on a background thread. ``server.hits`` counts requests served."""
+    server = ReplayServer((host, port), feed_dir)
+    thread = threading.Thread(target=server.serve_forever, name="waqi-replay", daemon=True)
+    thread.start()
+    server.url = f"http://{host}:{server.server_address[1]}"
+    return server
+
+
+def record(feed_dir, cities=LIVE_CITIES):
+    os.makedirs(feed_dir, exist_ok=True)
+    for city in cities:
+        response = requests.get(f"{WAQI_BASE_URL}/feed/{city}/", params={"token": WAQI_TOKEN}, timeout=10)
+        with open(os.path.join(feed_dir, f"{city}.json"), "w") as f:
+            json.dump(response.json(), f, indent=2)
+        print(f"Recorded {city}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("action", choices=["serve", "record"])
+    parser.add_argument("feed_dir")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.action == "record":
+        record(args.feed_dir)
+    else:
+        server = ReplayServer((args.host, args.port), args.feed_dir)
+        print(f"Replaying {args.feed_dir} on http://{args.host}:{args.port}")
+        server.serve_forever()